@@ -75,6 +75,11 @@ def create_canvas(
     title=None,
     fullscreen=None,
     show_vars=False,
+    tile_size=None,
+    jobs=None,
+    pipeline_depth=0,
+    png_writers=0,
+    png_compression=None,
 ):
     """
     Create canvas and sink for attachment to a bot
@@ -89,6 +94,15 @@ def create_canvas(
     :param outputfile: CairoImageSink output filename e.g. "hello.svg"
     :param multifile: CairoImageSink if True,
 
+    :param tile_size: TiledImageSink - render png output in tiles of this size
+    :param jobs: TiledImageSink - number of threads to render tiles with
+
+    :param pipeline_depth: CairoCanvas - if set, render on a separate thread
+                           with up to this many frames queued.
+
+    :param png_writers: CairoImageSink - write png files using this many threads
+    :param png_compression: CairoImageSink - zlib compression level of png files
+
     :param title: ShoebotWindow - set window title
     :param fullscreen: ShoebotWindow - set window title
     :param show_vars: ShoebotWindow - display variable window
@@ -103,11 +117,19 @@ def create_canvas(
     CairoImageSink
 
     Output to a filename (or files if multifile is set), or a buffer object.
+
+
+    VideoSink
+
+    Output filenames with a video extension such as .mp4 are encoded by ffmpeg.
     """
     from shoebot.core import (
         CairoCanvas,
         CairoImageSink,
-    )  # https://github.com/shoebot/shoebot/issues/206
+        CommandDrawQueue,
+        DrawQueue,
+    )
+    from shoebot.core.video_sink import VIDEO_EXTENSIONS  # https://github.com/shoebot/shoebot/issues/206
 
     if window or show_vars:
         from shoebot.gui import ShoebotWindow
@@ -120,8 +142,25 @@ def create_canvas(
         sink = ShoebotWindow(
             title, show_vars, fullscreen=fullscreen, outputfile=outputfile
         )
+    elif outputfile and os.path.splitext(outputfile)[1].lower() in VIDEO_EXTENSIONS:
+        from shoebot.core import VideoSink
+
+        sink = VideoSink(outputfile)
+    elif outputfile and tile_size:
+        from shoebot.core import TiledImageSink
+
+        sink = TiledImageSink(
+            outputfile, format, multifile, buff, tile_size=tile_size, jobs=jobs
+        )
     elif outputfile:
-        sink = CairoImageSink(outputfile, format, multifile, buff)
+        sink = CairoImageSink(
+            outputfile,
+            format,
+            multifile,
+            buff,
+            png_writers=png_writers,
+            png_compression=png_compression,
+        )
     else:
         if src and isinstance(src, cairo.Surface):
             outputfile = src
@@ -133,7 +172,19 @@ def create_canvas(
         else:
             outputfile = "output.svg"
         sink = CairoImageSink(outputfile, format, multifile, buff)
-    canvas = CairoCanvas(sink)
+    # In a window only the areas that changed each frame are repainted.
+    retained = bool(window or show_vars)
+    if pipeline_depth:
+        # Record draw commands as they are issued, so paths changed
+        # by the bot while a frame is rendering are drawn correctly.
+        canvas = CairoCanvas(
+            sink,
+            drawqueue_class=CommandDrawQueue,
+            retained=retained,
+            pipeline_depth=pipeline_depth,
+        )
+    else:
+        canvas = CairoCanvas(sink, drawqueue_class=DrawQueue, retained=retained)
 
     return canvas
 
@@ -152,12 +203,20 @@ def create_bot(
     show_vars=False,
     vars=None,
     namespace=None,
+    tile_size=None,
+    jobs=None,
+    pipeline_depth=0,
+    png_writers=0,
+    png_compression=None,
+    profile=None,
 ):
     """
     Create a canvas and a bot with the same canvas attached to it
 
     bot parameters
     :param vars: preset dictionary of vars from the called
+    :param profile: Time the stages of each frame and write a JSON report
+                    to this filename, see FrameProfiler.
 
     canvas parameters:
     ... everything else ...
@@ -176,8 +235,18 @@ def create_bot(
         title=title,
         fullscreen=fullscreen,
         show_vars=show_vars,
+        tile_size=tile_size,
+        jobs=jobs,
+        pipeline_depth=pipeline_depth,
+        png_writers=png_writers,
+        png_compression=png_compression,
     )
 
+    if profile:
+        from shoebot.core import FrameProfiler
+
+        canvas.set_profiler(FrameProfiler(profile))
+
     bot = NodeBot(canvas, namespace=namespace, vars=vars)
 
     if server:
@@ -248,6 +317,199 @@ class ShoebotThread(threading.Thread):
         return self._sbot
 
 
+def _frame_slices(first_frame, iterations, jobs):
+    """
+    Split iterations frames, starting at first_frame, into at most
+    jobs contiguous slices.
+
+    :return: list of (first_frame, iterations) for each slice.
+    """
+    jobs = min(jobs, iterations)
+    slices = []
+    for job in range(jobs):
+        start = iterations * job // jobs
+        end = iterations * (job + 1) // jobs
+        slices.append((first_frame + start, end - start))
+    return slices
+
+
+def _render_frames(
+    src,
+    format,
+    outputfile,
+    total_iterations,
+    first_frame,
+    iterations,
+    vars,
+    namespace,
+    verbose,
+    pipeline_depth=0,
+    png_writers=0,
+    png_compression=None,
+):
+    """
+    Worker for run_parallel, render a contiguous slice of frames.
+
+    The bot is created with FRAME set to first_frame, so setup() runs once
+    and output files are numbered as they would be in a serial run.
+    """
+    namespace = dict(namespace or {})
+    namespace["FRAME"] = first_frame
+    # total_iterations is passed so the sink outputs numbered files
+    # even if this slice is a single frame.
+    sbot = create_bot(
+        src,
+        format,
+        outputfile,
+        total_iterations,
+        vars=vars,
+        namespace=namespace,
+        pipeline_depth=pipeline_depth,
+        png_writers=png_writers,
+        png_compression=png_compression,
+    )
+    return sbot.run(
+        src,
+        max_iterations=iterations,
+        frame_limiter=False,
+        verbose=verbose,
+        run_forever=False,
+    )
+
+
+def run_parallel(
+    src,
+    format=None,
+    outputfile=None,
+    max_iterations=1,
+    jobs=None,
+    vars=None,
+    namespace=None,
+    verbose=False,
+    pipeline_depth=0,
+    png_writers=0,
+    png_compression=None,
+):
+    """
+    Render frames of a bot to numbered files using a pool of processes.
+
+    The frame range is split into one contiguous slice per process,
+    each process runs the bot setup then renders its slice of frames.
+
+    Only bots that draw each frame using FRAME (and seeded random
+    numbers) will output the same images as a serial run, state kept
+    between frames is not shared between processes.
+
+    :param jobs: Number of processes, defaults to the number of CPUs.
+    :param pipeline_depth, png_writers, png_compression: Passed to
+                           create_bot in each process.
+    :return: True if every frame rendered successfully.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = jobs or os.cpu_count() or 1
+    first_frame = int((namespace or {}).get("FRAME", 1))
+    slices = _frame_slices(first_frame, max_iterations, jobs)
+    with ProcessPoolExecutor(max_workers=len(slices)) as executor:
+        futures = [
+            executor.submit(
+                _render_frames,
+                src,
+                format,
+                outputfile,
+                max_iterations,
+                slice_first_frame,
+                slice_iterations,
+                vars,
+                namespace,
+                verbose,
+                pipeline_depth,
+                png_writers,
+                png_compression,
+            )
+            for slice_first_frame, slice_iterations in slices
+        ]
+        return all([future.result() for future in futures])
+
+
+# Bot a render_batch worker process renders with, see _init_batch_worker.
+_batch_bot = None
+
+
+def _init_batch_worker(bot):
+    """
+    Initializer of render_batch worker processes, bot is inherited when
+    the worker is forked.
+    """
+    global _batch_bot
+    _batch_bot = bot
+
+
+def _render_batch_item(index, vars, outputfile, bot=None):
+    """
+    Worker for render_batch, render one set of variables.
+
+    :param bot: WarmBot to render with, defaults to the bot of this
+                worker process.
+    :return: (index, outputfile)
+    """
+    (bot or _batch_bot).render(vars=vars, outputfile=outputfile, restart=True)
+    return index, outputfile
+
+
+def render_batch(src, var_sets, outputfile_pattern, jobs=None):
+    """
+    Render a bot once for each set of variables, e.g. for parameter sweeps.
+
+    The source is compiled and the bot created once, then for each set
+    of variables only the variable values and canvas are reset before
+    the bot code, setup() and draw() run.
+
+    Workers are forked after the bot is created, where fork is not
+    available or jobs is 1 everything is rendered in this process.
+
+    :param var_sets: Iterable of dicts of variable values.
+    :param outputfile_pattern: Output filename, formatted with index, the
+                               position in var_sets, and the variables,
+                               e.g. "variant_{index:04}.png" or "size_{size}.svg"
+    :param jobs: Number of processes, defaults to the number of CPUs.
+    :return: Generator of (index, outputfile), in the order rendering finishes.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    from shoebot.sbio.render_server import WarmBot
+
+    if os.path.isfile(src):
+        filename = src
+        with open(src) as f:
+            src = f.read()
+    else:
+        filename = "<string>"
+
+    jobs = jobs or os.cpu_count() or 1
+    items = [
+        (index, vars, outputfile_pattern.format(**dict(vars, index=index)))
+        for index, vars in enumerate(var_sets)
+    ]
+
+    bot = WarmBot(src, filename)
+    if jobs == 1 or "fork" not in multiprocessing.get_all_start_methods():
+        for item in items:
+            yield _render_batch_item(*item, bot=bot)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_batch_worker,
+        initargs=(bot,),
+    ) as executor:
+        futures = [executor.submit(_render_batch_item, *item) for item in items]
+        for future in as_completed(futures):
+            yield future.result()
+
+
 def run(
     src,
     format=None,
@@ -267,12 +529,28 @@ def run(
     args=[],
     verbose=False,
     background_thread=True,
+    jobs=None,
+    tile_size=None,
+    pipeline_depth=0,
+    png_writers=0,
+    png_compression=None,
+    profile=None,
 ):
     """
     Create and run a bot, the arguments all correspond to sanitized
     commandline options.
 
     :param background_thread: If True then use a background thread.
+    :param jobs: If more than 1, render multiple frames to outputfile
+                 using this many processes, see run_parallel.
+    :param tile_size: If set, render png output in tiles using jobs processes,
+                      see TiledImageSink.
+    :param pipeline_depth: If set, run the bot and render frames on separate
+                           threads, see RenderPipeline.
+    :param png_writers: If set, write png files on this many threads,
+                        see PNGWriterPool.
+    :param png_compression: zlib compression level of png files.
+    :param profile: Write per frame timings of each stage to this JSON file.
 
 
     Other args are split into create_args and run_args
@@ -298,6 +576,34 @@ def run(
         sys.argv[0]
     ] + args  # Remove shoebot parameters so sbot can be used in place of the python interpreter (e.g. for sphinx).
 
+    from shoebot.core.video_sink import VIDEO_EXTENSIONS
+
+    if (
+        jobs
+        and jobs > 1
+        and outputfile
+        and os.path.splitext(outputfile)[1].lower() not in VIDEO_EXTENSIONS
+        and not tile_size
+        and not window
+        and not (server or run_shell)
+        and not profile
+        and max_iterations
+        and max_iterations > 1
+    ):
+        return run_parallel(
+            src,
+            format=format,
+            outputfile=outputfile,
+            max_iterations=max_iterations,
+            jobs=jobs,
+            vars=vars,
+            namespace=namespace,
+            verbose=verbose,
+            pipeline_depth=pipeline_depth,
+            png_writers=png_writers,
+            png_compression=png_compression,
+        )
+
     # arguments for create_bot
     create_args = [
         src,
@@ -312,7 +618,16 @@ def run(
         port,
         show_vars,
     ]
-    create_kwargs = dict(vars=vars, namespace=namespace)
+    create_kwargs = dict(
+        vars=vars,
+        namespace=namespace,
+        tile_size=tile_size,
+        jobs=jobs,
+        pipeline_depth=pipeline_depth,
+        png_writers=png_writers,
+        png_compression=png_compression,
+        profile=profile,
+    )
     run_args = [src]
     run_kwargs = dict(
         max_iterations=max_iterations,
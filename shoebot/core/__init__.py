@@ -34,12 +34,36 @@ This file uses code from Nodebox (http://www.nodebox.net).
 The relevant code parts are marked with a "Taken from Nodebox" comment.
 
 """
+import importlib
 
 from .canvas import Canvas
 from .cairo_canvas import CairoCanvas
 
 from .drawqueue import DrawQueue
+from .command_drawqueue import CommandDrawQueue
+from .retained_drawqueue import RetainedDrawQueue
 from .drawqueue_sink import DrawQueueSink
 from .cairo_sink import CairoImageSink
+from .surface_pool import SurfacePool
+from .surface_cache import ImageSurfaceCache
+from .render_pipeline import RenderPipeline
+from .profiler import FrameProfiler
+from .draw_stats import DrawStats
 
 from .input_device import InputDeviceMixin
+
+# Imported on first use, most runs don't need these or the modules they use
+# (multiprocessing, subprocess, shared memory).
+_LAZY_IMPORTS = {
+    "TiledImageSink": ".tiled_sink",
+    "VideoSink": ".video_sink",
+    "SharedMemorySink": ".shm_sink",
+    "SharedMemoryFrameReader": ".shm_sink",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
@@ -26,10 +26,34 @@ Check settings
 Use setup.py diagnose to output the current graphics settings.
 """
 
+import importlib
 import os
 import sys
 
 
+class LazyImport(object):
+    """
+    Stands in for a module that is only imported when one of its
+    attributes is first used, so startup doesn't pay for modules a bot
+    never uses.
+    """
+
+    def __init__(self, import_module):
+        """
+        :param import_module: function that imports and returns the module.
+        """
+        self._import_module = import_module
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            # Don't import the module when copy or pickle look for hooks.
+            raise AttributeError(name)
+        value = getattr(self._import_module(), name)
+        # Later lookups find the attribute without calling __getattr__.
+        setattr(self, name, value)
+        return value
+
+
 class BackendMixin(object):
     """
     Mixin to abstract different implementations of the same library.
@@ -37,24 +61,13 @@ class BackendMixin(object):
 
     def import_libs(self, module_names, impl_name):
         """
-        Loop through module_names,
-        add has_.... booleans to class
-        set ..._impl to first successful import
+        Import the first of module_names that is available, the rest are
+        not imported.
 
         :param module_names:  list of module names to try importing
         :param impl_name:  used in error output if no modules succeed
         :return: name, module from first successful implementation
         """
-        for name in module_names:
-            try:
-                module = __import__(name)
-                has_module = True
-            except ImportError:
-                module = None
-                has_module = False
-            setattr(self, name, module)
-            setattr(self, "has_%s" % name, has_module)
-
         for name in module_names:
             try:
                 return name, __import__(name)
@@ -89,25 +102,59 @@ class CairoGIBackend(BackendMixin):
     """
     Graphics backend using gi.repository or pgi
     PyCairo / CairoCFFI (+PyCairo needed if using Gtk Too)
+
+    gi is imported the first time it is used.
     """
 
     def __init__(self, options):
         cairo_pref = sort_by_preference(
             ["cairo", "cairocffi"], options.get("cairo", "").split(",")
         )
-        gi_pref = sort_by_preference(["gi", "pgi"], options.get("gi", "").split(","))
+        self.gi_pref = sort_by_preference(
+            ["gi", "pgi"], options.get("gi", "").split(",")
+        )
         self.cairo_lib, self.cairo_module = self.import_libs(cairo_pref, "Cairo")
-        self.gi_lib, self.gi_module = self.setup_gi(gi_pref)
+        self._gi = None
 
     def get_libs(self):
         return {"gi": self.gi_lib, "cairo": self.cairo_lib}
 
     def setup_gi(self, gi_pref):
-        name, gi_module = self.import_libs(["gi", "pgi"], "gi")
+        name, gi_module = self.import_libs(gi_pref, "gi")
         if name == "pgi":
             gi_module.install_as_gi()
         return name, gi_module
 
+    def _get_gi(self):
+        if self._gi is None:
+            self._gi = self.setup_gi(self.gi_pref)
+        return self._gi
+
+    @property
+    def gi_lib(self):
+        return self._get_gi()[0]
+
+    @property
+    def gi_module(self):
+        return self._get_gi()[1]
+
+    @property
+    def pycairo(self):
+        """
+        PyCairo, which GTK needs even when cairocffi is used to draw.
+        """
+        return importlib.import_module("cairo")
+
+    def gi_repository(self, name, version):
+        """
+        Import a module from gi.repository.
+
+        :raises ValueError: if version of the module is not available.
+        :return: module
+        """
+        self.gi_module.require_version(name, version)
+        return importlib.import_module(f"gi.repository.{name}")
+
     def ensure_pycairo_context(self, ctx):
         """
         If ctx is a cairocffi Context convert it to a PyCairo Context
@@ -116,7 +163,9 @@ class CairoGIBackend(BackendMixin):
         :param ctx:
         :return:
         """
-        if self.cairocffi and isinstance(ctx, self.cairocffi.Context):
+        # If cairocffi was never imported, ctx can't be one of its contexts.
+        cairocffi = sys.modules.get("cairocffi")
+        if cairocffi and isinstance(ctx, cairocffi.Context):
             from shoebot.util.cairocffi.cairocffi_to_pycairo import (
                 _UNSAFE_cairocffi_context_to_pycairo,
             )
@@ -147,5 +196,5 @@ def get_driver_options():
 
 
 driver = CairoGIBackend(get_driver_options())
-gi = driver.gi_module
+gi = LazyImport(lambda: driver.gi_module)
 cairo = driver.cairo_module
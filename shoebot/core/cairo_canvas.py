@@ -36,17 +36,60 @@ from .backend import cairo
 from .input_device import InputDeviceMixin
 from .canvas import Canvas
 from .drawqueue import DrawQueue
+from .retained_drawqueue import RetainedDrawQueue, RetainedFrame
+
+
+class FrameBackground(object):
+    """
+    Draws the background colour of one frame.
+
+    The colour is read from the canvas when rendering, unless it was
+    fixed with freeze because the frame is rendered on another thread.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.color = None
+
+    def freeze(self):
+        self.color = self.canvas.background
+
+    def get_color(self):
+        return self.canvas.background if self.color is None else self.color
+
+    def render(self, cairo_ctx):
+        cairo_ctx.set_source_rgba(*self.get_color())
+        cairo_ctx.paint()
+
+    def _render_key(self):
+        """
+        Key used by RetainedDrawQueue to tell if the background changed.
+        """
+        return "background", tuple(self.get_color())
 
 
 class CairoCanvas(Canvas):
     """ Cairo implementation of Canvas """
 
-    def __init__(self, sink):
-        Canvas.__init__(self, sink)
+    def __init__(
+        self, sink, drawqueue_class=DrawQueue, retained=False, pipeline_depth=0
+    ):
+        """
+        :param sink: DrawQueueSink to render frames to.
+        :param drawqueue_class: DrawQueue implementation to use, e.g. CommandDrawQueue.
+        :param retained: If True, use RetainedDrawQueue so that only the parts of
+                         a frame that changed since the last one are rasterized.
+        :param pipeline_depth: See Canvas.
+        """
+        self.drawqueue_class = drawqueue_class
+        self.retained_frame = RetainedFrame() if retained else None
+        Canvas.__init__(self, sink, pipeline_depth=pipeline_depth)
         self.size = None
 
     def initial_drawqueue(self):
-        return DrawQueue()
+        if self.retained_frame is not None:
+            return RetainedDrawQueue(self.retained_frame)
+        return self.drawqueue_class()
 
     def initial_transform(self):
         """
@@ -62,7 +105,15 @@ class CairoCanvas(Canvas):
 
     def reset_drawqueue(self):
         self._drawqueue = self.initial_drawqueue()
-        self._drawqueue.append(self.ctx_render_background)
+        self._frame_background = FrameBackground(self)
+        self._drawqueue.append(self._frame_background.render)
+
+    def flush(self, frame):
+        if self.pipeline is not None:
+            # The bot may set the background for the next frame before
+            # this one is rendered.
+            self._frame_background.freeze()
+        Canvas.flush(self, frame)
 
     def reset_transform(self):
         self.mode = self.DEFAULT_MODE
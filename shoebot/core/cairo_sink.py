@@ -31,6 +31,10 @@ import os
 
 from .backend import cairo
 from .drawqueue_sink import DrawQueueSink
+from .png import PNGWriterPool, write_surface_to_png
+from .surface_pool import DEFAULT_MAX_BYTES, SurfacePool
+
+VECTOR_FORMATS = ("pdf", "ps", "eps", "svg")
 
 
 class CairoImageSink(DrawQueueSink):
@@ -38,13 +42,29 @@ class CairoImageSink(DrawQueueSink):
     DrawQueueSink that uses cairo contexts as the render context.
     """
 
-    def __init__(self, target=None, format=None, multifile=False, buff=None):
+    def __init__(
+        self,
+        target=None,
+        format=None,
+        multifile=False,
+        buff=None,
+        png_writers=0,
+        png_queue_length=None,
+        png_compression=None,
+        surface_pool_bytes=DEFAULT_MAX_BYTES,
+    ):
         """
         :param target:  output filename (or cairo surface if format is 'surface')
         :param format:    if filename is specified this is not needed. Can be 'surface' for Cairo surfaces
         :param multifile: If used with filename, then numbered files will be output for each froam.
         :param buff:      optionally a file like object can be used instead of a filename
                           this is useful for streaming output.
+        :param png_writers: If set, png files are encoded and written by this many
+                            background threads, see PNGWriterPool.
+        :param png_queue_length: Maximum number of frames waiting to be written.
+        :param png_compression: zlib compression level for png output, 0-9.
+        :param surface_pool_bytes: Image surfaces up to this many bytes are kept
+                                   to be reused by later frames, 0 disables this.
 
         """
         DrawQueueSink.__init__(self)
@@ -61,6 +81,20 @@ class CairoImageSink(DrawQueueSink):
         self.format = format
         self.target = target
         self.multifile = multifile
+        self.png_compression = png_compression
+        if surface_pool_bytes and format not in VECTOR_FORMATS + ("surface",):
+            self.surface_pool = SurfacePool(surface_pool_bytes)
+        else:
+            self.surface_pool = None
+        if png_writers and format == "png" and buff is None:
+            self.png_writer_pool = PNGWriterPool(
+                png_writers,
+                png_queue_length,
+                png_compression,
+                release=self._release_surface,
+            )
+        else:
+            self.png_writer_pool = None
 
     def _output_file(self, frame):
         """
@@ -92,20 +126,50 @@ class CairoImageSink(DrawQueueSink):
             surface.restrict_to_version(cairo.SVGVersion.VERSION_1_2)
         elif self.format == "surface":
             surface = self.target
+        elif self.surface_pool is not None:
+            surface = self.surface_pool.acquire(cairo.FORMAT_ARGB32, size)
         else:
             surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, *size)
         return cairo.Context(surface)
 
+    def _release_surface(self, surface):
+        """
+        Called once nothing else will use surface.
+        """
+        if self.surface_pool is not None:
+            self.surface_pool.release(surface)
+        else:
+            surface.finish()
+
     def rendering_finished(self, size, frame, cairo_ctx):
         """
         Called when CairoCanvas has rendered a bot
         """
         surface = cairo_ctx.get_target()
         if self.format == "png":
-            surface.write_to_png(self._output_file(frame))
+            if self.png_writer_pool is not None:
+                # The pool releases the surface once it is written.
+                self.png_writer_pool.write(surface, self._output_file(frame))
+                return
+            elif self.png_compression is not None and not self.buff:
+                write_surface_to_png(
+                    surface, self._output_file(frame), self.png_compression
+                )
+            else:
+                surface.write_to_png(self._output_file(frame))
+        if self.surface_pool is not None:
+            self.surface_pool.release(surface)
+            return
         surface.finish()
         surface.flush()
 
+    def finish(self):
+        """
+        Wait for png files still being written.
+        """
+        if self.png_writer_pool is not None:
+            self.png_writer_pool.finish()
+
     def set_title(self, title):
         # Does nothing, only relevant to GUI
         pass
@@ -36,7 +36,10 @@ import locale
 import gettext
 from pathlib import Path
 
+from shoebot.core.draw_stats import DrawStats
 from shoebot.core.drawqueue import DrawQueue
+from shoebot.core.render_pipeline import RenderPipeline
+from shoebot.core.spatial_index import SpatialIndex
 
 APP = "shoebot"
 DIR = sys.prefix + "/share/shoebot/locale"
@@ -59,10 +62,21 @@ class Canvas(metaclass=abc.ABCMeta):
 
     """ Abstract canvas class """
 
-    def __init__(self, sink):
+    def __init__(self, sink, pipeline_depth=0):
+        """
+        :param sink: DrawQueueSink to render frames to.
+        :param pipeline_depth: If set, frames are rendered on a separate thread
+                               with up to this many frames waiting to render.
+        """
         # Construct sink class:
         self.sink = sink
+        self.pipeline = None
+        if pipeline_depth:
+            self.pipeline = RenderPipeline(sink, pipeline_depth)
 
+        self.profiler = None
+        self.draw_stats = DrawStats()
+        self.spatial_index = None
         self.finished = False
         self.color_range = 1
         self.color_mode = 1
@@ -75,6 +89,13 @@ class Canvas(metaclass=abc.ABCMeta):
         self.bot = bot
         self.sink.set_bot(bot)
 
+    def set_profiler(self, profiler):
+        """
+        Time the stages of rendering each frame with a FrameProfiler.
+        """
+        self.profiler = profiler
+        self.sink.profiler = profiler
+
     def get_input_device(self):
         """ Overrides can return actual input device """
         return None
@@ -168,12 +189,78 @@ class Canvas(metaclass=abc.ABCMeta):
         """
         Passes the drawqueue to the sink for rendering
         """
-        self.sink.render(self.size_or_default(), frame, self._drawqueue)
+        if self.pipeline is not None:
+            self.pipeline.submit(self.size_or_default(), frame, self._drawqueue)
+        else:
+            self.sink.render(self.size_or_default(), frame, self._drawqueue)
+        self.draw_stats.end_frame(frame)
+        if self.spatial_index is not None:
+            self.spatial_index.end_frame(frame)
         self.reset_drawqueue()
 
+    def finish_rendering(self):
+        """
+        Wait for frames passed to flush to finish rendering and
+        for the sink to finish outputting them.
+
+        The sink is finished even if rendering failed, so it can close
+        its output.
+        """
+        try:
+            if self.pipeline is not None:
+                self.pipeline.stop()
+        finally:
+            self.sink.finish()
+
+    def stats(self):
+        """
+        :return: dict with the number of grobs of each type drawn in the last
+                 frame, and counters of the work needed to render them,
+                 see DrawStats.
+        """
+        return self.draw_stats.stats()
+
+    def set_spatial_index(self, spatial_index):
+        """
+        Index where grobs are drawn in each frame with a SpatialIndex,
+        or stop indexing if spatial_index is None.
+        """
+        self.spatial_index = spatial_index
+
+    def picked(self, x, y):
+        """
+        :return: grobs drawn under the point x, y in the last frame, the
+                 topmost first.
+
+        Grobs are indexed from the first call of picked or query.
+        """
+        if self.spatial_index is None:
+            self.set_spatial_index(SpatialIndex())
+        return self.spatial_index.picked(x, y)
+
+    def query(self, x, y, width, height):
+        """
+        :return: grobs drawn in the last frame whose bounds overlap the
+                 rect, in the order they were drawn.
+
+        Grobs are indexed from the first call of picked or query.
+        """
+        if self.spatial_index is None:
+            self.set_spatial_index(SpatialIndex())
+        return self.spatial_index.query(x, y, width, height)
+
     def deferred_render(self, render_func):
         """Add a render function to the queue for rendering later"""
         self._drawqueue.append(render_func)
 
+    def get_recorder(self):
+        """
+        If the drawqueue records draw commands, return it so grobs can
+        issue their commands on it directly, otherwise return None.
+        """
+        if self._drawqueue.records_commands:
+            return self._drawqueue
+        return None
+
     width = property(get_width)
     height = property(get_height)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+DrawQueue that records draw commands into typed arrays.
+
+Instead of storing one closure per drawn shape, the commands grobs issue
+are recorded as opcodes, with their float arguments packed into a second
+array, and replayed by a single dispatch loop in render.
+"""
+from array import array
+
+from .backend import cairo
+from .drawqueue import DrawQueue
+
+# Opcodes, roughly in order of how often they are issued.
+LINE_TO = 0
+CURVE_TO = 1
+MOVE_TO = 2
+CLOSE_PATH = 3
+SET_MATRIX = 4
+SET_SOURCE_RGBA = 5
+FILL = 6
+FILL_PRESERVE = 7
+STROKE = 8
+SET_LINE_WIDTH = 9
+REL_LINE_TO = 10
+REL_MOVE_TO = 11
+REL_CURVE_TO = 12
+ARC = 13
+SAVE = 14
+RESTORE = 15
+TRANSLATE = 16
+SCALE = 17
+SET_FILL_RULE = 18
+SET_DASH = 19
+SET_LINE_CAP = 20
+SET_LINE_JOIN = 21
+SET_OPERATOR = 22
+CLIP = 23
+CALL = 24
+
+
+class CommandDrawQueue(DrawQueue):
+    """
+    DrawQueue that stores draw commands in compact arrays.
+
+    Opcodes are kept in an array of bytes and their float arguments in
+    an array of doubles, anything else (render functions, dash patterns,
+    cairo enums) is kept in a list of operands.
+
+    Grobs that support it issue their cairo calls directly on this queue
+    (see Canvas.get_recorder), which records them, so the drawqueue has
+    the same interface as the subset of cairo.Context used by shoebot.
+
+    Plain render functions are still supported through append, and are
+    called in order when the queue is rendered.
+
+    As commands are recorded when a grob is drawn, changes made to a grob
+    after draw() are not seen, unlike with DrawQueue.
+    """
+
+    records_commands = True
+
+    def __init__(self):
+        self.opcodes = array("B")
+        self.floats = array("d")
+        self.operands = []
+
+    def append(self, render_func):
+        """
+        Add a render function to the queue.
+        """
+        self.opcodes.append(CALL)
+        self.operands.append(render_func)
+
+    # Recording, these mirror the cairo.Context API.
+
+    def move_to(self, x, y):
+        self.opcodes.append(MOVE_TO)
+        self.floats.extend((x, y))
+
+    def rel_move_to(self, x, y):
+        self.opcodes.append(REL_MOVE_TO)
+        self.floats.extend((x, y))
+
+    def line_to(self, x, y):
+        self.opcodes.append(LINE_TO)
+        self.floats.extend((x, y))
+
+    def rel_line_to(self, x, y):
+        self.opcodes.append(REL_LINE_TO)
+        self.floats.extend((x, y))
+
+    def curve_to(self, x1, y1, x2, y2, x3, y3):
+        self.opcodes.append(CURVE_TO)
+        self.floats.extend((x1, y1, x2, y2, x3, y3))
+
+    def rel_curve_to(self, x1, y1, x2, y2, x3, y3):
+        self.opcodes.append(REL_CURVE_TO)
+        self.floats.extend((x1, y1, x2, y2, x3, y3))
+
+    def arc(self, x, y, radius, angle1, angle2):
+        self.opcodes.append(ARC)
+        self.floats.extend((x, y, radius, angle1, angle2))
+
+    def close_path(self):
+        self.opcodes.append(CLOSE_PATH)
+
+    def save(self):
+        self.opcodes.append(SAVE)
+
+    def restore(self):
+        self.opcodes.append(RESTORE)
+
+    def translate(self, tx, ty):
+        self.opcodes.append(TRANSLATE)
+        self.floats.extend((tx, ty))
+
+    def scale(self, sx, sy):
+        self.opcodes.append(SCALE)
+        self.floats.extend((sx, sy))
+
+    def set_matrix(self, matrix):
+        # Store a copy of the values, so later changes to matrix are not seen.
+        self.opcodes.append(SET_MATRIX)
+        self.floats.extend(tuple(matrix))
+
+    def set_source_rgba(self, red, green, blue, alpha=1.0):
+        self.opcodes.append(SET_SOURCE_RGBA)
+        self.floats.extend((red, green, blue, alpha))
+
+    def set_line_width(self, width):
+        self.opcodes.append(SET_LINE_WIDTH)
+        self.floats.append(width)
+
+    def set_fill_rule(self, fill_rule):
+        self.opcodes.append(SET_FILL_RULE)
+        self.operands.append(fill_rule)
+
+    def set_dash(self, dashes, offset=0):
+        self.opcodes.append(SET_DASH)
+        self.operands.append((list(dashes), offset))
+
+    def set_line_cap(self, line_cap):
+        self.opcodes.append(SET_LINE_CAP)
+        self.operands.append(line_cap)
+
+    def set_line_join(self, line_join):
+        self.opcodes.append(SET_LINE_JOIN)
+        self.operands.append(line_join)
+
+    def set_operator(self, op):
+        self.opcodes.append(SET_OPERATOR)
+        self.operands.append(op)
+
+    def fill(self):
+        self.opcodes.append(FILL)
+
+    def fill_preserve(self):
+        self.opcodes.append(FILL_PRESERVE)
+
+    def stroke(self):
+        self.opcodes.append(STROKE)
+
+    def clip(self):
+        self.opcodes.append(CLIP)
+
+    def render(self, r_context):
+        """
+        Replay the recorded commands onto r_context, a cairo Context.
+        """
+        self._replay(r_context, 0, len(self.opcodes), 0, 0)
+        return r_context
+
+    def _replay(self, ctx, start, end, f, o):
+        """
+        Replay opcodes[start:end] onto ctx.
+
+        :param f: index of the first float argument used by the opcodes.
+        :param o: index of the first operand used by the opcodes.
+        """
+        floats = self.floats
+        operands = self.operands
+        for opcode in self.opcodes[start:end]:
+            if opcode == LINE_TO:
+                ctx.line_to(floats[f], floats[f + 1])
+                f += 2
+            elif opcode == CURVE_TO:
+                ctx.curve_to(
+                    floats[f],
+                    floats[f + 1],
+                    floats[f + 2],
+                    floats[f + 3],
+                    floats[f + 4],
+                    floats[f + 5],
+                )
+                f += 6
+            elif opcode == MOVE_TO:
+                ctx.move_to(floats[f], floats[f + 1])
+                f += 2
+            elif opcode == CLOSE_PATH:
+                ctx.close_path()
+            elif opcode == SET_MATRIX:
+                ctx.set_matrix(
+                    cairo.Matrix(
+                        floats[f],
+                        floats[f + 1],
+                        floats[f + 2],
+                        floats[f + 3],
+                        floats[f + 4],
+                        floats[f + 5],
+                    )
+                )
+                f += 6
+            elif opcode == SET_SOURCE_RGBA:
+                ctx.set_source_rgba(
+                    floats[f], floats[f + 1], floats[f + 2], floats[f + 3]
+                )
+                f += 4
+            elif opcode == FILL:
+                ctx.fill()
+            elif opcode == FILL_PRESERVE:
+                ctx.fill_preserve()
+            elif opcode == STROKE:
+                ctx.stroke()
+            elif opcode == SET_LINE_WIDTH:
+                ctx.set_line_width(floats[f])
+                f += 1
+            elif opcode == REL_LINE_TO:
+                ctx.rel_line_to(floats[f], floats[f + 1])
+                f += 2
+            elif opcode == REL_MOVE_TO:
+                ctx.rel_move_to(floats[f], floats[f + 1])
+                f += 2
+            elif opcode == REL_CURVE_TO:
+                ctx.rel_curve_to(
+                    floats[f],
+                    floats[f + 1],
+                    floats[f + 2],
+                    floats[f + 3],
+                    floats[f + 4],
+                    floats[f + 5],
+                )
+                f += 6
+            elif opcode == ARC:
+                ctx.arc(
+                    floats[f], floats[f + 1], floats[f + 2], floats[f + 3], floats[f + 4]
+                )
+                f += 5
+            elif opcode == SAVE:
+                ctx.save()
+            elif opcode == RESTORE:
+                ctx.restore()
+            elif opcode == TRANSLATE:
+                ctx.translate(floats[f], floats[f + 1])
+                f += 2
+            elif opcode == SCALE:
+                ctx.scale(floats[f], floats[f + 1])
+                f += 2
+            elif opcode == SET_FILL_RULE:
+                ctx.set_fill_rule(operands[o])
+                o += 1
+            elif opcode == SET_DASH:
+                ctx.set_dash(*operands[o])
+                o += 1
+            elif opcode == SET_LINE_CAP:
+                ctx.set_line_cap(operands[o])
+                o += 1
+            elif opcode == SET_LINE_JOIN:
+                ctx.set_line_join(operands[o])
+                o += 1
+            elif opcode == SET_OPERATOR:
+                ctx.set_operator(operands[o])
+                o += 1
+            elif opcode == CLIP:
+                ctx.clip()
+            elif opcode == CALL:
+                operands[o](ctx)
+                o += 1
+
+    def __str__(self):
+        return (
+            f"<CommandDrawQueue commands={len(self.opcodes)} "
+            f"floats={len(self.floats)} operands={len(self.operands)}>"
+        )
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Counters of what the bot drew, to find out what makes a bot slow to render.
+"""
+from collections import Counter
+
+# Counters reported alongside the number of grobs of each type.
+COUNTERS = (
+    "path_elements",  # Elements of the paths drawn, see ESTIMATED.
+    "pango_layouts",  # Pango layouts created by Text._pre_render
+    "image_paints",
+    "image_pixels",  # Total area of painted images, in pixels.
+    "set_matrix",
+    "set_source",
+)
+
+# Counters worked out from what was drawn rather than counted as it is
+# rendered.  Paths drawn again are appended from a cached cairo path
+# instead of traversing their elements, and the calls recorded by the
+# drawqueue may differ.
+ESTIMATED = ("path_elements", "set_matrix")
+
+
+class DrawStats(object):
+    """
+    Counts grobs and the work needed to render them, for each frame.
+
+    Counts are made as grobs are drawn into the frame, so they are the
+    same whichever drawqueue or sink renders the frame.  The frame is
+    complete when the canvas is flushed.
+
+    The counters listed in stats()["estimated"] are the work rendering
+    the grobs would do without caching, not a count of the cairo calls made.
+    """
+
+    def __init__(self):
+        self.grobs = Counter()
+        self.counts = Counter()
+        self.last_frame = None
+        self.last_stats = None
+
+    def add(self, grob, **counts):
+        """
+        Count a grob being drawn and the counters it adds to.
+        """
+        self.grobs[grob.__class__.__name__] += 1
+        self.counts.update(counts)
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def end_frame(self, frame):
+        """
+        Keep the counts of frame, and start counting the next frame.
+        """
+        self.last_frame = frame
+        self.last_stats = self._as_dict(frame, self.grobs, self.counts)
+        self.grobs = Counter()
+        self.counts = Counter()
+
+    @staticmethod
+    def _as_dict(frame, grobs, counts):
+        stats = {"frame": frame, "grobs": dict(grobs)}
+        for name in COUNTERS:
+            stats[name] = counts.get(name, 0)
+        stats["estimated"] = list(ESTIMATED)
+        return stats
+
+    def stats(self):
+        """
+        :return: dict of counters for the last frame that was flushed, or
+                 of the frame being drawn if no frame was flushed yet.
+        """
+        if self.last_stats is None:
+            return self._as_dict(None, self.grobs, self.counts)
+        return self.last_stats
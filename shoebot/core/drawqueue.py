@@ -38,6 +38,10 @@ class DrawQueue(object):
     implementation.
     """
 
+    # Set by implementations that record draw commands as they are
+    # issued, instead of storing render functions for later.
+    records_commands = False
+
     def __init__(self, render_funcs=None):
         self.render_funcs = render_funcs or deque()
 
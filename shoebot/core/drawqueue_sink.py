@@ -8,6 +8,9 @@ class DrawQueueSink:
     canvas, and sink.
     """
 
+    # FrameProfiler, set by Canvas.set_profiler.
+    profiler = None
+
     def set_bot(self, bot):
         self.bot = bot
 
@@ -17,9 +20,16 @@ class DrawQueueSink:
         passes it to the drawqueues render function
         then calls self.rendering_finished
         """
+        profiler = self.profiler
         r_context = self.create_rcontext(size, frame)
-        drawqueue.render(r_context)
-        self.rendering_finished(size, frame, r_context)
+        if profiler is None:
+            drawqueue.render(r_context)
+            self.rendering_finished(size, frame, r_context)
+        else:
+            with profiler.timer(frame, "render"):
+                drawqueue.render(r_context)
+            with profiler.timer(frame, "output"):
+                self.rendering_finished(size, frame, r_context)
         return r_context
 
     def create_rcontext(self, size, frame):
@@ -32,6 +42,13 @@ class DrawQueueSink:
     def rendering_finished(self, size, frame, cairo_ctx):
         pass
 
+    def finish(self):
+        """
+        Called when the bot has finished running, sinks that output
+        frames asynchronously should wait for them here.
+        """
+        pass
+
     def main_iteration(self):
         """
         Called from main loop, if your sink needs to handle GUI events
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+PNG encoding of cairo image data, with a selectable compression level.
+
+cairo's write_to_png always uses the default zlib level, these helpers
+are used where the level matters or the image is written in parts.
+"""
+import io
+import re
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from functools import lru_cache
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# zlib level cairo's write_to_png compresses with.
+CAIRO_COMPRESSION = 6
+
+# Pixels that need unpremultiplying, fully opaque and transparent pixels don't.
+_PARTIAL_ALPHA = re.compile(b"[\x01-\xfe]")
+
+# Byte offsets of each channel within a native endian ARGB32 pixel,
+# and of the high byte of a native endian 16 bit integer.
+if sys.byteorder == "little":
+    _B, _G, _R, _A = 0, 1, 2, 3
+    _HIGH = 1
+else:
+    _A, _R, _G, _B = 0, 1, 2, 3
+    _HIGH = 0
+
+
+@lru_cache(maxsize=None)
+def _unpremultiply_table():
+    """
+    :return: bytes of the straight value of each premultiplied value c
+             with alpha a, at index a << 8 | c.
+    """
+    table = bytearray(range(256)) * 256
+    for a in range(1, 255):
+        table[a << 8 : (a + 1) << 8] = bytes(
+            min(255, (c * 255 + a // 2) // a) for c in range(256)
+        )
+    return bytes(table)
+
+
+def argb32_to_rgba(data):
+    """
+    Convert cairo ARGB32 pixel data (premultiplied, native endian) to
+    straight alpha RGBA bytes as used by PNG.
+    """
+    rgba = bytearray(len(data))
+    rgba[0::4] = data[_R::4]
+    rgba[1::4] = data[_G::4]
+    rgba[2::4] = data[_B::4]
+    alpha = rgba[3::4] = data[_A::4]
+    partial = len(alpha.translate(None, b"\x00\xff"))
+    if partial * 8 < len(alpha):
+        # Few pixels are translucent, e.g. antialiased edges.
+        for match in _PARTIAL_ALPHA.finditer(alpha):
+            a = alpha[match.start()]
+            offset = match.start() * 4
+            for i in range(offset, offset + 3):
+                rgba[i] = min(255, (rgba[i] * 255 + a // 2) // a)
+    else:
+        # Look up every channel with its alpha in one pass, pairing them
+        # as 16 bit indexes into the table.
+        table = _unpremultiply_table()
+        pairs = bytearray(len(alpha) * 2)
+        pairs[_HIGH::2] = alpha
+        for channel in range(3):
+            pairs[1 - _HIGH :: 2] = rgba[channel::4]
+            rgba[channel::4] = bytes(map(table.__getitem__, array("H", pairs)))
+    return bytes(rgba)
+
+
+def surface_to_rgba(surface):
+    """
+    :param surface: cairo ImageSurface in FORMAT_ARGB32.
+    :return: RGBA pixel data of surface, without row padding.
+    """
+    surface.flush()
+    width = surface.get_width()
+    height = surface.get_height()
+    stride = surface.get_stride()
+    data = surface.get_data()
+    row_size = width * 4
+    if stride != row_size:
+        data = b"".join(
+            data[row * stride : row * stride + row_size] for row in range(height)
+        )
+    return argb32_to_rgba(bytes(data))
+
+
+def png_chunk(chunk_type, data):
+    """
+    :return: PNG chunk with its length and crc.
+    """
+    crc = zlib.crc32(data, zlib.crc32(chunk_type))
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+class PNGWriter(object):
+    """
+    Write an 8 bit RGBA PNG to a file object, a few rows at a time.
+    """
+
+    def __init__(self, f, width, height, compression=6):
+        """
+        :param f: file object opened for binary writing.
+        :param compression: zlib compression level, 0-9.
+        """
+        self.f = f
+        self.row_size = width * 4
+        self.compressor = zlib.compressobj(compression)
+        f.write(PNG_SIGNATURE)
+        # 8 bit RGBA, no interlacing.
+        header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+        f.write(png_chunk(b"IHDR", header))
+
+    def write_rows(self, rgba):
+        """
+        :param rgba: RGBA pixel data of one or more whole rows.
+        """
+        row_size = self.row_size
+        for offset in range(0, len(rgba), row_size):
+            # Each row starts with filter type 0 (None).
+            data = self.compressor.compress(
+                b"\0" + rgba[offset : offset + row_size]
+            )
+            if data:
+                self.f.write(png_chunk(b"IDAT", data))
+
+    def close(self):
+        """
+        Write the remaining data and the end of the PNG.
+        """
+        self.f.write(png_chunk(b"IDAT", self.compressor.flush()))
+        self.f.write(png_chunk(b"IEND", b""))
+
+
+def recompress_png(data, compression):
+    """
+    :param data: PNG file contents.
+    :return: the same PNG with its image data compressed again at the
+             zlib compression level, the other chunks are kept as they are.
+    """
+    before = []
+    idat = []
+    after = []
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        (length,) = struct.unpack(">I", data[offset : offset + 4])
+        chunk_type = data[offset + 4 : offset + 8]
+        end = offset + 12 + length
+        if chunk_type == b"IDAT":
+            idat.append(data[offset + 8 : end - 4])
+        else:
+            (after if idat else before).append(data[offset:end])
+        offset = end
+    image_data = zlib.compress(zlib.decompress(b"".join(idat)), compression)
+    return b"".join([PNG_SIGNATURE, *before, png_chunk(b"IDAT", image_data), *after])
+
+
+def write_surface_to_png(surface, filename, compression=CAIRO_COMPRESSION):
+    """
+    Like surface.write_to_png, but with a selectable compression level.
+    """
+    if compression == CAIRO_COMPRESSION:
+        surface.write_to_png(filename)
+        return
+    with open(filename, "wb") as f:
+        writer = PNGWriter(f, surface.get_width(), surface.get_height(), compression)
+        writer.write_rows(surface_to_rgba(surface))
+        writer.close()
+
+
+class PNGWriterPool(object):
+    """
+    Encode and write PNG files on background threads.
+
+    Only work that releases the GIL runs on the threads: cairo's
+    write_to_png and, with a compression level, zlib compressing its
+    image data again, so encoding runs concurrently with the bot and
+    with rendering the next frame.
+    Errors raised while writing are raised again by write or wait.
+    """
+
+    def __init__(self, writers=2, max_pending=None, compression=None, release=None):
+        """
+        :param writers: Number of writer threads.
+        :param max_pending: Maximum number of surfaces waiting to be written,
+                            write blocks when this is reached.
+                            Defaults to twice the number of writers.
+        :param compression: zlib compression level, or None to use
+                            cairo's write_to_png.
+        :param release: Called with each surface once it is written,
+                        by default the surface is finished.
+        """
+        if compression == CAIRO_COMPRESSION:
+            compression = None
+        self.compression = compression
+        self.release = release
+        self.writers = writers
+        self.executor = None
+        self.pending = threading.Semaphore(max_pending or writers * 2)
+        self.futures = []
+
+    def _release(self, surface):
+        if self.release is not None:
+            self.release(surface)
+        else:
+            surface.finish()
+
+    def _write_surface(self, surface, filename):
+        try:
+            try:
+                if self.compression is None:
+                    surface.write_to_png(filename)
+                    return
+                buffer = io.BytesIO()
+                surface.write_to_png(buffer)
+            finally:
+                self._release(surface)
+            data = recompress_png(buffer.getvalue(), self.compression)
+            with open(filename, "wb") as f:
+                f.write(data)
+        finally:
+            self.pending.release()
+
+    def _check_finished(self):
+        """
+        Forget writes that have finished, raising any error they raised.
+        """
+        futures = self.futures
+        self.futures = [future for future in futures if not future.done()]
+        for future in futures:
+            if future.done():
+                future.result()
+
+    def write(self, surface, filename):
+        """
+        Queue surface to be written to filename, the surface must not
+        be drawn on again until it has been written and released.
+        """
+        self._check_finished()
+        self.pending.acquire()
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.writers, thread_name_prefix="shoebot-png"
+            )
+        future = self.executor.submit(self._write_surface, surface, filename)
+        self.futures.append(future)
+
+    def wait(self):
+        """
+        Wait until all queued surfaces are written.
+        """
+        futures, self.futures = self.futures, []
+        for future in futures:
+            future.result()
+
+    def finish(self):
+        """
+        Wait until all queued surfaces are written and stop the writer
+        threads, they are started again by the next write.
+        """
+        try:
+            self.wait()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Per frame timings of the stages a bot goes through, for sbot --profile.
+"""
+import json
+import math
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+# Stages in the order they happen each frame.
+STAGES = (
+    "setup",  # Bot code in the global namespace and setup()
+    "draw",  # draw()
+    "flush",  # Canvas.flush, includes render and output unless pipelined.
+    "render",  # DrawQueue.render
+    "output",  # DrawQueueSink.rendering_finished
+    "idle",  # Waiting for events and the next frame.
+    "events",  # Handling events and updating the GUI.
+)
+PERCENTILES = (50, 90, 99)
+
+
+def no_timer(frame, stage):
+    """
+    Stand in for FrameProfiler.timer when not profiling.
+    """
+    return nullcontext()
+
+
+def percentile(values, p):
+    """
+    :param values: sorted list of numbers.
+    :return: value at percentile p, using the nearest rank.
+    """
+    if not values:
+        return 0.0
+    rank = max(int(math.ceil(p / 100.0 * len(values))), 1)
+    return values[rank - 1]
+
+
+class FrameProfiler(object):
+    """
+    Collects the time spent in each stage of each frame.
+
+    Timers can run on the bot thread and the render thread at once,
+    times for the same frame and stage are added together.
+    """
+
+    def __init__(self, filename=None, print_summary=True):
+        """
+        :param filename: JSON report is written here by finish.
+        :param print_summary: If True, finish prints a summary on stderr.
+        """
+        self.filename = filename
+        self.print_summary = print_summary
+        self.frames = OrderedDict()
+        self.lock = threading.Lock()
+        self.start_time = perf_counter()
+
+    def add(self, frame, stage, seconds):
+        with self.lock:
+            timings = self.frames.get(frame)
+            if timings is None:
+                timings = self.frames[frame] = {}
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, frame, stage):
+        """
+        Time the code in a with block as stage of frame.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(frame, stage, perf_counter() - start)
+
+    def report(self):
+        """
+        :return: dict with the timings of each frame and statistics for
+                 each stage, all times are in milliseconds.
+        """
+        with self.lock:
+            frames = [
+                dict(frame=frame, **{k: v * 1000.0 for k, v in timings.items()})
+                for frame, timings in self.frames.items()
+            ]
+        stages = OrderedDict()
+        for stage in STAGES:
+            values = sorted(timings[stage] for timings in frames if stage in timings)
+            if not values:
+                continue
+            stats = OrderedDict(
+                count=len(values),
+                total=sum(values),
+                mean=sum(values) / len(values),
+            )
+            for p in PERCENTILES:
+                stats[f"p{p}"] = percentile(values, p)
+            stats["max"] = values[-1]
+            stages[stage] = stats
+        return OrderedDict(
+            unit="ms",
+            wall_time=(perf_counter() - self.start_time) * 1000.0,
+            stages=stages,
+            frames=frames,
+        )
+
+    def summary(self, report=None):
+        """
+        :return: one line with the mean time of each stage.
+        """
+        report = report or self.report()
+        means = ", ".join(
+            f"{stage} {stats['mean']:.2f}ms"
+            for stage, stats in report["stages"].items()
+        )
+        return (
+            f"Profile: {len(report['frames'])} frames in "
+            f"{report['wall_time'] / 1000.0:.2f}s, mean per frame: {means}"
+        )
+
+    def finish(self):
+        """
+        Write the report, if there is a filename, and print a summary on stderr.
+        """
+        report = self.report()
+        if self.filename:
+            with open(self.filename, "w") as f:
+                json.dump(report, f, indent=2)
+        if self.print_summary:
+            sys.stderr.write(f"{self.summary(report)}\n")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Render frames on a separate thread, so the bot can generate the next
+frame while the previous one is rasterized.
+"""
+import queue
+import threading
+
+
+class RenderPipeline(object):
+    """
+    Passes drawqueues to a sink for rendering on a separate thread.
+
+    Frames are rendered in the order they are submitted, at most depth
+    frames wait to be rendered, after that submit blocks until the
+    render thread catches up.
+
+    The thread is started by the first submit and ends on stop, the next
+    submit starts a new one.
+
+    Exceptions raised while rendering are raised again in the bot thread
+    on the next call to submit, wait or stop.
+    """
+
+    def __init__(self, sink, depth=2):
+        """
+        :param sink: DrawQueueSink to render frames to.
+        :param depth: Maximum number of frames waiting to be rendered.
+        """
+        self.sink = sink
+        self.frames = queue.Queue(maxsize=depth)
+        self.error = None
+        self.thread = None
+
+    def run(self):
+        while True:
+            item = self.frames.get()
+            try:
+                if item is None:
+                    return
+                if self.error is None:
+                    self.sink.render(*item)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.frames.task_done()
+
+    def _raise_error(self):
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def submit(self, size, frame, drawqueue):
+        """
+        Queue drawqueue for rendering, blocks while the queue is full.
+        """
+        self._raise_error()
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self.run, daemon=True, name="shoebot-render"
+            )
+            self.thread.start()
+        self.frames.put((size, frame, drawqueue))
+
+    def wait(self):
+        """
+        Wait until all submitted frames are rendered.
+        """
+        if self.thread is not None:
+            self.frames.join()
+        self._raise_error()
+
+    def stop(self):
+        """
+        Render any remaining frames, then stop the thread.
+        """
+        if self.thread is not None:
+            thread, self.thread = self.thread, None
+            self.frames.put(None)
+            thread.join()
+        self._raise_error()
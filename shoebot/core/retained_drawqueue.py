@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Retained mode DrawQueue, only rasterizes the parts of a frame that changed.
+
+The recorded commands are split into segments, each ending with a command
+that paints or clips, so a segment is roughly one grob. Each segment is
+keyed by a hash of its commands and the drawing state it inherits.
+
+When rendering, the keys are compared with the previous frame's and the
+device space bounds of segments that were added or removed are the damaged
+area. Only the damaged area of the retained surface is cleared and drawn
+again, then the retained surface is painted onto the render context.
+"""
+from collections import defaultdict, deque, namedtuple
+from math import ceil, floor
+
+from .backend import cairo
+from .command_drawqueue import (
+    CommandDrawQueue,
+    CALL,
+    CLIP,
+    SET_DASH,
+    SET_FILL_RULE,
+    SET_LINE_CAP,
+    SET_LINE_JOIN,
+    SET_LINE_WIDTH,
+    SET_MATRIX,
+    SET_OPERATOR,
+    SET_SOURCE_RGBA,
+    SCALE,
+    TRANSLATE,
+)
+
+# Operators that affect the destination outside of the shape being drawn.
+UNBOUNDED_OPERATORS = {
+    cairo.OPERATOR_CLEAR,
+    cairo.OPERATOR_SOURCE,
+    cairo.OPERATOR_IN,
+    cairo.OPERATOR_OUT,
+    cairo.OPERATOR_DEST_IN,
+    cairo.OPERATOR_DEST_ATOP,
+}
+
+# State that render functions set for themselves.
+CALL_SETS_STATE = (SET_MATRIX, SET_SOURCE_RGBA, SET_LINE_WIDTH)
+
+# Above this many rectangles, damage is merged into a single rectangle.
+MAX_DAMAGE_RECTS = 64
+
+# When more than this fraction of the segments, and more segments than
+# MAX_DAMAGE_RECTS, were added or removed, the whole frame is drawn again
+# instead of measuring each of them.
+MAX_CHANGED_FRACTION = 0.5
+
+# State that changes the pixels a stroke or fill covers, with the cairo
+# method that sets it.
+SHAPE_STATE = (
+    (SET_LINE_WIDTH, "set_line_width"),
+    (SET_DASH, "set_dash"),
+    (SET_LINE_CAP, "set_line_cap"),
+    (SET_LINE_JOIN, "set_line_join"),
+    (SET_FILL_RULE, "set_fill_rule"),
+)
+
+
+def _call_key(render_func):
+    """
+    Render functions are opaque, but bound methods of objects that
+    implement _render_key can be compared between frames.
+
+    :return: key for render_func, or None if it cannot be keyed.
+    """
+    owner = getattr(render_func, "__self__", None)
+    render_key = getattr(owner, "_render_key", None)
+    if render_key is None:
+        return None
+    return render_key()
+
+
+def _apply_matrix(ctx, value):
+    """
+    Set the matrix tracked as value, a matrix or a chain of translations
+    and scales of one, on ctx.  Matrices set by render functions are not
+    known, the identity matrix is used instead.
+    """
+    steps = []
+    while isinstance(value, tuple) and len(value) == 4:
+        value, op, x, y = value
+        steps.append((op, x, y))
+    if isinstance(value, tuple):
+        ctx.set_matrix(cairo.Matrix(*value))
+    else:
+        ctx.identity_matrix()
+    for op, x, y in reversed(steps):
+        if op == TRANSLATE:
+            ctx.translate(x, y)
+        else:
+            ctx.scale(x, y)
+
+
+def _apply_state(ctx, state):
+    """
+    Set the tracked state that decides where a segment draws on ctx.
+    """
+    _apply_matrix(ctx, state.get(SET_MATRIX))
+    for kind, method in SHAPE_STATE:
+        value = state.get(kind, CALL)
+        if value == CALL:
+            # Not set, or left by a render function.
+            continue
+        if kind == SET_DASH:
+            getattr(ctx, method)(*value)
+        else:
+            getattr(ctx, method)(value)
+
+
+class RetainedFrame(object):
+    """
+    State kept between frames by RetainedDrawQueue.
+    """
+
+    def __init__(self):
+        self.surface = None
+        self.size = None
+        self.drawqueue = None
+        self.keys = []
+
+
+Segment = namedtuple(
+    "Segment",
+    "start end float_start operand_start key call_index has_ink unbounded "
+    "unmatched_restores state saved_states",
+)
+Segment.__doc__ = """\
+Range of recorded commands, ending with a command that paints or clips.
+
+:param start: index of the first opcode.
+:param end: index after the last opcode.
+:param float_start: index of the first float argument.
+:param operand_start: index of the first operand.
+:param key: hash of the commands and the state they inherit.
+:param call_index: operand index of the render function, if the segment ends with one.
+:param has_ink: True if the segment paints.
+:param unbounded: True if the segment paints with an unbounded operator.
+:param unmatched_restores: number of restores without a save in the segment.
+:param state: tracked state when the segment starts.
+:param saved_states: states the unmatched restores go back to, outermost first."""
+
+
+class RetainedDrawQueue(CommandDrawQueue):
+    """
+    CommandDrawQueue that keeps the previous frame's rasterized output and
+    only redraws regions where grobs were added, removed or changed.
+
+    Output is painted from an image surface, so this is intended for
+    raster output and the GUI.
+    """
+
+    def __init__(self, retained_frame):
+        """
+        :param retained_frame: RetainedFrame shared by the drawqueues of each frame.
+        """
+        CommandDrawQueue.__init__(self)
+        self.retained_frame = retained_frame
+        self.segments = []
+        self._bboxes = {}
+        # Set by render, list of (x1, y1, x2, y2) rectangles that changed
+        # since the previous frame, or None if not known.
+        self.damage = None
+
+        self._state = {}
+        self._state_stack = []
+        self._begin_segment()
+
+    # Segment and state tracking.
+
+    def _begin_segment(self):
+        self._segment_start = (len(self.opcodes), len(self.floats), len(self.operands))
+        self._segment_state = dict(self._state)
+        self._segment_stack = list(self._state_stack)
+        self._segment_sets = set()
+        self._segment_operands = []
+        self._segment_saves = 0
+        self._unmatched_restores = 0
+
+    def _end_segment(self, has_ink=True, call_index=None):
+        start, float_start, operand_start = self._segment_start
+        end = len(self.opcodes)
+        if call_index is None:
+            inherited = [
+                item
+                for item in self._segment_state.items()
+                if item[0] not in self._segment_sets
+            ]
+        else:
+            # Keyed render functions (text, images and the background) set
+            # their own matrix and source, but may depend on the rest.
+            inherited = [
+                item
+                for item in self._segment_state.items()
+                if item[0] not in CALL_SETS_STATE
+            ]
+        key = hash(
+            (
+                tuple(sorted(inherited)),
+                tuple(self._segment_operands),
+                self.opcodes[start:end].tobytes(),
+                self.floats[float_start:].tobytes(),
+            )
+        )
+        unbounded = self._state.get(SET_OPERATOR) in UNBOUNDED_OPERATORS
+        restores = self._unmatched_restores
+        saved_states = self._segment_stack[-restores:] if restores else ()
+        self.segments.append(
+            Segment(
+                start,
+                end,
+                float_start,
+                operand_start,
+                key,
+                call_index,
+                has_ink,
+                unbounded,
+                restores,
+                self._segment_state,
+                saved_states,
+            )
+        )
+        return key
+
+    def _set_state(self, kind, value):
+        self._state[kind] = value
+        self._segment_sets.add(kind)
+
+    def _set_operand_state(self, kind, value):
+        self._set_state(kind, value)
+        self._segment_operands.append((kind, value))
+
+    def set_matrix(self, matrix):
+        CommandDrawQueue.set_matrix(self, matrix)
+        self._set_state(SET_MATRIX, tuple(self.floats[-6:]))
+
+    def translate(self, tx, ty):
+        CommandDrawQueue.translate(self, tx, ty)
+        self._set_state(SET_MATRIX, (self._state.get(SET_MATRIX), TRANSLATE, tx, ty))
+
+    def scale(self, sx, sy):
+        CommandDrawQueue.scale(self, sx, sy)
+        self._set_state(SET_MATRIX, (self._state.get(SET_MATRIX), SCALE, sx, sy))
+
+    def set_source_rgba(self, red, green, blue, alpha=1.0):
+        CommandDrawQueue.set_source_rgba(self, red, green, blue, alpha)
+        self._set_state(SET_SOURCE_RGBA, (red, green, blue, alpha))
+
+    def set_line_width(self, width):
+        CommandDrawQueue.set_line_width(self, width)
+        self._set_state(SET_LINE_WIDTH, width)
+
+    def set_fill_rule(self, fill_rule):
+        CommandDrawQueue.set_fill_rule(self, fill_rule)
+        self._set_operand_state(SET_FILL_RULE, fill_rule)
+
+    def set_dash(self, dashes, offset=0):
+        CommandDrawQueue.set_dash(self, dashes, offset)
+        self._set_operand_state(SET_DASH, (tuple(dashes), offset))
+
+    def set_line_cap(self, line_cap):
+        CommandDrawQueue.set_line_cap(self, line_cap)
+        self._set_operand_state(SET_LINE_CAP, line_cap)
+
+    def set_line_join(self, line_join):
+        CommandDrawQueue.set_line_join(self, line_join)
+        self._set_operand_state(SET_LINE_JOIN, line_join)
+
+    def set_operator(self, op):
+        CommandDrawQueue.set_operator(self, op)
+        self._set_operand_state(SET_OPERATOR, op)
+
+    def save(self):
+        CommandDrawQueue.save(self)
+        self._state_stack.append(dict(self._state))
+        self._segment_saves += 1
+
+    def restore(self):
+        CommandDrawQueue.restore(self)
+        if self._segment_saves:
+            self._segment_saves -= 1
+        else:
+            self._unmatched_restores += 1
+        if self._state_stack:
+            self._state = self._state_stack.pop()
+        # The restored state is not otherwise part of the segment's key.
+        self._segment_operands.append(tuple(sorted(self._state.items())))
+
+    def fill(self):
+        CommandDrawQueue.fill(self)
+        self._end_segment()
+        self._begin_segment()
+
+    def stroke(self):
+        CommandDrawQueue.stroke(self)
+        self._end_segment()
+        self._begin_segment()
+
+    def clip(self):
+        CommandDrawQueue.clip(self)
+        key = self._end_segment(has_ink=False)
+        self._state[CLIP] = (self._state.get(CLIP), key)
+        self._begin_segment()
+
+    def append(self, render_func):
+        CommandDrawQueue.append(self, render_func)
+        self._end_segment(call_index=len(self.operands) - 1)
+        # Render functions change these without it being recorded.
+        for kind in CALL_SETS_STATE:
+            self._state[kind] = CALL
+        self._begin_segment()
+
+    # Rendering.
+
+    def _segment_keys(self):
+        """
+        :return: list of keys for each segment, keys of render functions
+                 are evaluated now, as they may depend on state set after
+                 they were added (e.g. the background color).
+        """
+        keys = []
+        for segment in self.segments:
+            if segment.call_index is None:
+                keys.append(segment.key)
+            else:
+                call_key = _call_key(self.operands[segment.call_index])
+                if call_key is None:
+                    # Never equal, so always redrawn.
+                    keys.append(object())
+                else:
+                    keys.append(hash((segment.key, call_key)))
+        return keys
+
+    def segment_bbox(self, index, size):
+        """
+        :return: device space bounds of the pixels segment index draws as
+                 (x1, y1, x2, y2) or None if it does not draw anything.
+
+        The segment is replayed on its own, starting from the line width,
+        caps, joins, dashes and matrix it inherits.
+        """
+        if index in self._bboxes:
+            return self._bboxes[index]
+
+        segment = self.segments[index]
+        width, height = size
+        if not segment.has_ink:
+            bbox = None
+        elif segment.unbounded or (
+            segment.call_index is not None
+            and _call_key(self.operands[segment.call_index]) is None
+        ):
+            bbox = (0, 0, width, height)
+        else:
+            surface = cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA, None)
+            ctx = cairo.Context(surface)
+            for state in segment.saved_states:
+                _apply_state(ctx, state)
+                ctx.save()
+            _apply_state(ctx, segment.state)
+            self._replay(
+                ctx,
+                segment.start,
+                segment.end,
+                segment.float_start,
+                segment.operand_start,
+            )
+            x, y, w, h = surface.ink_extents()
+            if w and h:
+                # Round out, with a pixel either side for antialiasing.
+                bbox = (
+                    floor(x) - 1,
+                    floor(y) - 1,
+                    ceil(x + w) + 1,
+                    ceil(y + h) + 1,
+                )
+            else:
+                bbox = None
+        self._bboxes[index] = bbox
+        return bbox
+
+    def _damage(self, keys, size):
+        """
+        :return: list of rectangles (x1, y1, x2, y2) that changed since the
+                 previous frame.
+
+        Segments are matched in order by key, each one with the next
+        unmatched segment of the previous frame with the same key.
+        Segments left unmatched in either frame were removed or added.
+        """
+        frame = self.retained_frame
+        previous = frame.drawqueue
+        width, height = size
+
+        positions = defaultdict(deque)
+        for i, key in enumerate(frame.keys):
+            positions[key].append(i)
+        removed = []
+        added = []
+        next_i = 0
+        for j, key in enumerate(keys):
+            candidates = positions.get(key)
+            while candidates and candidates[0] < next_i:
+                candidates.popleft()
+            if candidates:
+                i = candidates.popleft()
+                removed.extend(range(next_i, i))
+                next_i = i + 1
+            else:
+                added.append(j)
+        removed.extend(range(next_i, len(frame.keys)))
+
+        changed = len(removed) + len(added)
+        count = max(len(keys), len(frame.keys))
+        if changed > max(MAX_DAMAGE_RECTS, MAX_CHANGED_FRACTION * count):
+            return [(0, 0, width, height)]
+
+        bboxes = [previous.segment_bbox(i, size) for i in removed]
+        bboxes += [self.segment_bbox(j, size) for j in added]
+        damage = []
+        for bbox in bboxes:
+            if bbox is None:
+                continue
+            x1, y1, x2, y2 = bbox
+            x1, y1 = max(x1, 0), max(y1, 0)
+            x2, y2 = min(x2, width), min(y2, height)
+            if x1 < x2 and y1 < y2:
+                damage.append((x1, y1, x2, y2))
+
+        if len(damage) > MAX_DAMAGE_RECTS:
+            x1s, y1s, x2s, y2s = zip(*damage)
+            damage = [(min(x1s), min(y1s), max(x2s), max(y2s))]
+        return damage
+
+    def render(self, r_context):
+        """
+        Draw the damaged parts of the retained surface and paint it onto
+        r_context, a cairo Context.
+        """
+        x1, y1, x2, y2 = r_context.clip_extents()
+        if x1 != 0 or y1 != 0:
+            # Unbounded surface or part of a tiled frame, there is nothing to retain.
+            self.damage = None
+            return CommandDrawQueue.render(self, r_context)
+
+        frame = self.retained_frame
+        size = int(ceil(x2)), int(ceil(y2))
+        keys = self._segment_keys()
+        if frame.surface is None or frame.size != size:
+            frame.surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, *size)
+            frame.size = size
+            damage = [(0, 0, size[0], size[1])]
+        elif keys == frame.keys:
+            damage = []
+        else:
+            damage = self._damage(keys, size)
+
+        if damage:
+            ctx = cairo.Context(frame.surface)
+            for x1, y1, x2, y2 in damage:
+                ctx.rectangle(x1, y1, x2 - x1, y2 - y1)
+            ctx.clip()
+            ctx.set_operator(cairo.OPERATOR_CLEAR)
+            ctx.paint()
+            ctx.set_operator(cairo.OPERATOR_OVER)
+            self._replay(ctx, 0, len(self.opcodes), 0, 0)
+            frame.surface.flush()
+
+        frame.drawqueue = self
+        frame.keys = keys
+        self.damage = damage
+
+        r_context.set_source_surface(frame.surface)
+        r_context.paint()
+        return r_context
+
+    def render_commands(self, r_context):
+        """
+        Replay all the drawing commands onto r_context, without using
+        or updating the retained surface.
+        """
+        return CommandDrawQueue.render(self, r_context)
+
+    def __str__(self):
+        return (
+            f"<RetainedDrawQueue commands={len(self.opcodes)} "
+            f"segments={len(self.segments)}>"
+        )
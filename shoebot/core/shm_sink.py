@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Sink that publishes frames in a ring buffer in shared memory.
+
+Another process can attach to the segment by name and read frames
+without them going through files or sockets.
+
+Layout of the segment, all integers little endian:
+
+    header (HEADER_SIZE bytes):
+        magic, version, slot count, slot data size, latest sequence
+    slots, each SLOT_HEADER_SIZE + slot data size bytes:
+        sequence, frame, width, height, stride
+        ARGB32 pixel data (native endian, premultiplied alpha)
+
+Frame n (counting from 1) is written to slot (n - 1) % slot count.
+While it is being written the slot sequence is 2n - 1, once it is
+complete the sequence is 2n and the latest sequence in the header is n.
+Readers check the slot sequence before and after using the pixels, if
+it changed the writer has reused the slot and the frame must be skipped.
+
+SharedMemoryFrameReader.view gives the pixels in place, without copying,
+SharedMemoryFrameReader.read copies them out of the slot.
+"""
+import struct
+from multiprocessing import shared_memory
+
+from .backend import cairo
+from .drawqueue_sink import DrawQueueSink
+
+MAGIC = b"SHOEBOT\0"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIIQQ")
+HEADER_SIZE = 64
+LATEST_SEQUENCE = struct.Struct("<Q")
+LATEST_SEQUENCE_OFFSET = HEADER.size - LATEST_SEQUENCE.size
+SLOT_HEADER = struct.Struct("<QqIII")
+SLOT_HEADER_SIZE = 64
+
+
+class SharedMemorySink(DrawQueueSink):
+    """
+    DrawQueueSink that renders frames straight into a ring of slots
+    in a shared memory segment.
+    """
+
+    def __init__(self, name=None, slots=3, max_size=None):
+        """
+        :param name: Name of the shared memory segment, if None a name is
+                     generated, readers can find it in self.name.
+        :param slots: Number of frames kept in the ring.
+        :param max_size: (width, height) of the largest frame, defaults to
+                         the size of the first frame.
+        """
+        DrawQueueSink.__init__(self)
+        self.name = name
+        self.slot_count = slots
+        self.max_size = max_size
+        self.shm = None
+        self.slot_size = None
+        self.sequence = 0
+        # Surface drawing into the slot of the frame being rendered.
+        self.surface = None
+        if max_size is not None:
+            self._create_segment(max_size)
+
+    def _create_segment(self, size):
+        width, height = size
+        self.slot_size = cairo.ImageSurface.format_stride_for_width(
+            cairo.FORMAT_ARGB32, int(width)
+        ) * int(height)
+        self.shm = shared_memory.SharedMemory(
+            name=self.name,
+            create=True,
+            size=HEADER_SIZE + self.slot_count * (SLOT_HEADER_SIZE + self.slot_size),
+        )
+        self.name = self.shm.name
+        HEADER.pack_into(
+            self.shm.buf, 0, MAGIC, VERSION, self.slot_count, self.slot_size, 0
+        )
+
+    def _slot_offset(self, sequence):
+        slot = (sequence - 1) % self.slot_count
+        return HEADER_SIZE + slot * (SLOT_HEADER_SIZE + self.slot_size)
+
+    def create_rcontext(self, size, frame):
+        """
+        Return a context that draws directly into the next slot.
+        """
+        width, height = int(size[0]), int(size[1])
+        if self.shm is None:
+            self._create_segment((width, height))
+        stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, width)
+        if stride * height > self.slot_size:
+            raise ValueError(
+                f"Frame of {width}x{height} does not fit in slots of {self.slot_size} bytes."
+            )
+
+        self.sequence += 1
+        offset = self._slot_offset(self.sequence)
+        # Odd sequence marks the slot as being written.
+        SLOT_HEADER.pack_into(
+            self.shm.buf, offset, self.sequence * 2 - 1, frame, width, height, stride
+        )
+        data_offset = offset + SLOT_HEADER_SIZE
+        self.surface = cairo.ImageSurface.create_for_data(
+            self.shm.buf[data_offset : data_offset + stride * height],
+            cairo.FORMAT_ARGB32,
+            width,
+            height,
+            stride,
+        )
+        ctx = cairo.Context(self.surface)
+        # Clear the frame that was in this slot.
+        ctx.set_operator(cairo.OPERATOR_CLEAR)
+        ctx.paint()
+        ctx.set_operator(cairo.OPERATOR_OVER)
+        return ctx
+
+    def rendering_finished(self, size, frame, cairo_ctx):
+        """
+        Publish the frame to readers.
+        """
+        self._finish_surface()
+        offset = self._slot_offset(self.sequence)
+        # The slot sequence is the first field of the slot header.
+        LATEST_SEQUENCE.pack_into(self.shm.buf, offset, self.sequence * 2)
+        LATEST_SEQUENCE.pack_into(
+            self.shm.buf, LATEST_SEQUENCE_OFFSET, self.sequence
+        )
+
+    def _finish_surface(self):
+        """
+        Finish the surface drawing into the current slot and drop it, so
+        it stops using the shared memory.
+        """
+        if self.surface is not None:
+            self.surface.flush()
+            self.surface.finish()
+            self.surface = None
+
+    def finish(self):
+        """
+        Close and remove the shared memory segment.
+        """
+        # A frame that failed to render may still have its surface.
+        self._finish_surface()
+        if self.shm is not None:
+            shm, self.shm = self.shm, None
+            try:
+                shm.unlink()
+            finally:
+                shm.close()
+
+    def set_title(self, title):
+        # Does nothing, only relevant to GUI
+        pass
+
+
+class SharedMemoryFrameReader(object):
+    """
+    Read frames published by a SharedMemorySink in another process.
+    """
+
+    def __init__(self, name):
+        self.shm = shared_memory.SharedMemory(name=name)
+        magic, version, self.slot_count, self.slot_size, _ = HEADER.unpack_from(
+            self.shm.buf, 0
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{name} is not a shoebot frame buffer.")
+
+    def latest_sequence(self):
+        """
+        :return: sequence number of the latest complete frame, 0 if none.
+        """
+        return LATEST_SEQUENCE.unpack_from(self.shm.buf, LATEST_SEQUENCE_OFFSET)[0]
+
+    def _slot_offset(self, sequence):
+        slot = (sequence - 1) % self.slot_count
+        return HEADER_SIZE + slot * (SLOT_HEADER_SIZE + self.slot_size)
+
+    def view(self, sequence=None):
+        """
+        Get a frame in place, without copying it.
+
+        The writer may reuse the slot while the pixels are in use, once
+        done with them check is_valid(sequence), if it is False they were
+        overwritten and must be discarded.  Release pixels before close.
+
+        :param sequence: sequence number of the frame, defaults to the latest.
+        :return: (sequence, frame, width, height, stride, pixels) where
+                 pixels is a memoryview of the slot, or None if the frame
+                 is not available, either because it was not written yet or
+                 because its slot has been reused.
+        """
+        if sequence is None:
+            sequence = self.latest_sequence()
+        if sequence < 1:
+            return None
+        offset = self._slot_offset(sequence)
+        slot_sequence, frame, width, height, stride = SLOT_HEADER.unpack_from(
+            self.shm.buf, offset
+        )
+        if slot_sequence != sequence * 2:
+            return None
+        data_offset = offset + SLOT_HEADER_SIZE
+        pixels = self.shm.buf[data_offset : data_offset + stride * height]
+        return sequence, frame, width, height, stride, pixels
+
+    def is_valid(self, sequence):
+        """
+        :return: True if the frame at sequence is still in its slot.
+        """
+        offset = self._slot_offset(sequence)
+        return SLOT_HEADER.unpack_from(self.shm.buf, offset)[0] == sequence * 2
+
+    def read(self, sequence=None):
+        """
+        Copy a frame out of the ring.
+
+        :param sequence: sequence number of the frame, defaults to the latest.
+        :return: (frame, width, height, stride, pixels) with pixels as bytes,
+                 or None if the frame is not available, see view.
+        """
+        frame_view = self.view(sequence)
+        if frame_view is None:
+            return None
+        sequence, frame, width, height, stride, pixels = frame_view
+        with pixels:
+            data = bytes(pixels)
+        if not self.is_valid(sequence):
+            return None
+        return frame, width, height, stride, data
+
+    def close(self):
+        self.shm.close()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Index of where grobs were drawn in a frame, to find the grobs under the
+mouse pointer or in an area without testing every grob.
+"""
+from math import isfinite
+
+DEFAULT_CELL_SIZE = 64
+# Grobs covering more cells than this are kept in a list that every query
+# checks, instead of being added to each cell.
+MAX_CELLS = 1024
+
+
+def _transform_point(matrix, x, y):
+    xx, yx, xy, yy, x0, y0 = matrix
+    return xx * x + xy * y + x0, yx * x + yy * y + y0
+
+
+def _invert(matrix):
+    """
+    :return: inverse of a matrix given as (xx, yx, xy, yy, x0, y0), like
+             cairo.Matrix, or None if it cannot be inverted.
+    """
+    xx, yx, xy, yy, x0, y0 = matrix
+    det = xx * yy - yx * xy
+    if not det:
+        return None
+    ixx, iyx, ixy, iyy = yy / det, -yx / det, -xy / det, xx / det
+    return ixx, iyx, ixy, iyy, -(ixx * x0 + ixy * y0), -(iyx * x0 + iyy * y0)
+
+
+class FrameIndex(object):
+    """
+    Uniform grid of the device space bounds of the grobs drawn in a frame.
+
+    Each cell lists the grobs whose bounds overlap it, so a query only
+    looks at the grobs in the cells it covers.
+    """
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.oversized = []
+        # (grob, local extents, matrix, device bounds) in drawing order.
+        self.entries = []
+
+    def add(self, grob, extents, matrix):
+        """
+        :param extents: x1, y1, x2, y2 of the grob before it is transformed.
+        :param matrix: transform of the grob, as (xx, yx, xy, yy, x0, y0).
+        """
+        x1, y1, x2, y2 = extents
+        corners = ((x1, y1), (x2, y1), (x1, y2), (x2, y2))
+        xs, ys = zip(*(_transform_point(matrix, x, y) for x, y in corners))
+        bounds = min(xs), min(ys), max(xs), max(ys)
+
+        index = len(self.entries)
+        self.entries.append((grob, extents, matrix, bounds))
+
+        if not all(isfinite(v) for v in bounds):
+            self.oversized.append(index)
+            return
+        cx1, cy1, cx2, cy2 = self._cell_range(*bounds)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > MAX_CELLS:
+            self.oversized.append(index)
+            return
+        cells = self.cells
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                cells.setdefault((cx, cy), []).append(index)
+
+    def _cell_range(self, x1, y1, x2, y2):
+        size = self.cell_size
+        return int(x1 // size), int(y1 // size), int(x2 // size), int(y2 // size)
+
+    def _candidates(self, x1, y1, x2, y2):
+        """
+        :return: sorted indices of entries in the cells that overlap a rect.
+        """
+        cx1, cy1, cx2, cy2 = self._cell_range(x1, y1, x2, y2)
+        cells = self.cells
+        found = set(self.oversized)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(cells):
+            # Larger than the area with grobs, look at every cell instead.
+            for (cx, cy), indices in cells.items():
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2:
+                    found.update(indices)
+        else:
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    found.update(cells.get((cx, cy), ()))
+        return sorted(found)
+
+    def query(self, x, y, width, height):
+        """
+        :return: grobs whose bounds overlap the rect, in the order they
+                 were drawn.
+        """
+        x1, y1 = min(x, x + width), min(y, y + height)
+        x2, y2 = max(x, x + width), max(y, y + height)
+        grobs = []
+        for index in self._candidates(x1, y1, x2, y2):
+            grob, extents, matrix, (bx1, by1, bx2, by2) = self.entries[index]
+            if bx1 <= x2 and x1 <= bx2 and by1 <= y2 and y1 <= by2:
+                grobs.append(grob)
+        return grobs
+
+    def picked(self, x, y):
+        """
+        :return: grobs under the point x, y, the topmost (last drawn) first.
+
+        Paths are tested with their contains method, other grobs with
+        their bounds.
+        """
+        grobs = []
+        for index in reversed(self._candidates(x, y, x, y)):
+            grob, extents, matrix, (bx1, by1, bx2, by2) = self.entries[index]
+            if not (bx1 <= x <= bx2 and by1 <= y <= by2):
+                continue
+            inverse = _invert(matrix)
+            if inverse is None:
+                continue
+            local_x, local_y = _transform_point(inverse, x, y)
+            contains = getattr(grob, "contains", None)
+            if contains is not None:
+                if not contains(local_x, local_y):
+                    continue
+            else:
+                x1, y1, x2, y2 = extents
+                if not (x1 <= local_x <= x2 and y1 <= local_y <= y2):
+                    continue
+            grobs.append(grob)
+        return grobs
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SpatialIndex(object):
+    """
+    Keeps a FrameIndex of the grobs drawn in each frame.
+
+    Like DrawStats, grobs are added as they are drawn, and queries answer
+    for the last frame that was flushed (what is on screen), or the frame
+    being drawn if no frame was flushed yet.
+    """
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.frame_index = FrameIndex(cell_size)
+        self.last_frame = None
+        self.last_index = None
+
+    def add(self, grob, extents, matrix):
+        self.frame_index.add(grob, extents, matrix)
+
+    def end_frame(self, frame):
+        """
+        Keep the index of frame, and start indexing the next frame.
+        """
+        self.last_frame = frame
+        self.last_index = self.frame_index
+        self.frame_index = FrameIndex(self.cell_size)
+
+    def _index(self):
+        if self.last_index is None:
+            return self.frame_index
+        return self.last_index
+
+    def query(self, x, y, width, height):
+        return self._index().query(x, y, width, height)
+
+    def picked(self, x, y):
+        return self._index().picked(x, y)
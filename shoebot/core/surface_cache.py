@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Cache of surfaces decoded from image files.
+
+Decoding an image file is slow, so bots that draw the same image every
+frame use the cached surface.  The cache is limited to a number of
+bytes, least recently used surfaces are dropped first.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from .backend import cairo
+from .surface_pool import surface_bytes
+
+# Default limit on the size of cached surfaces, in bytes.
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def file_signature(path):
+    """
+    :return: (mtime, size) of the file at path, these change when it is
+             written to, or None if it can't be read.
+    """
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def cached_surface_bytes(surface):
+    """
+    :return: approximate memory used by surface, in bytes.
+
+    RecordingSurfaces, used for svg files, are counted as if rasterized.
+    """
+    if isinstance(surface, cairo.ImageSurface):
+        return surface_bytes(
+            surface.get_format(), surface.get_width(), surface.get_height()
+        )
+    extents = surface.get_extents()
+    if extents is None:
+        return 0
+    return surface_bytes(cairo.FORMAT_ARGB32, int(extents.width), int(extents.height))
+
+
+class ImageSurfaceCache(object):
+    """
+    LRU cache of surfaces, keyed by the path of the file they were decoded
+    from along with its modification time and size, so changed files are
+    loaded again.
+
+    Pinned surfaces stay cached until unpinned or cleared, but count
+    towards max_bytes.  Surfaces larger than max_bytes are not cached.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param max_bytes: Maximum total size of cached surfaces.
+        """
+        self.max_bytes = max_bytes
+        self.cached_bytes = 0
+        # path: (signature, surface, nbytes)
+        self.entries = OrderedDict()
+        self.pinned = set()
+        self.lock = threading.Lock()
+        # Counters, see stats.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, path):
+        signature, surface, nbytes = self.entries.pop(path)
+        self.cached_bytes -= nbytes
+
+    def _evict(self):
+        """
+        Drop least recently used surfaces that aren't pinned, until the
+        cache fits in max_bytes.
+        """
+        for path in list(self.entries):
+            if self.cached_bytes <= self.max_bytes:
+                break
+            if path not in self.pinned:
+                self._remove(path)
+                self.evictions += 1
+
+    def get(self, path):
+        """
+        :return: surface decoded from path, or None if it needs to be loaded.
+        """
+        signature = file_signature(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                if entry[0] == signature:
+                    self.entries.move_to_end(path)
+                    self.hits += 1
+                    return entry[1]
+                # The file changed since it was loaded.
+                self._remove(path)
+                self.invalidations += 1
+            self.misses += 1
+            return None
+
+    def put(self, path, surface):
+        """
+        Cache surface, decoded from the file at path.
+        """
+        signature = file_signature(path)
+        if signature is None:
+            return
+        nbytes = cached_surface_bytes(surface)
+        with self.lock:
+            if path in self.entries:
+                self._remove(path)
+            if nbytes > self.max_bytes and path not in self.pinned:
+                return
+            self.entries[path] = signature, surface, nbytes
+            self.cached_bytes += nbytes
+            self._evict()
+
+    def pin(self, path):
+        """
+        Keep the surface for path cached, once it is loaded.
+        """
+        with self.lock:
+            self.pinned.add(path)
+
+    def unpin(self, path):
+        with self.lock:
+            self.pinned.discard(path)
+            self._evict()
+
+    def clear(self, path=None):
+        """
+        Drop the surface for path, or every surface and pin if path is None.
+        """
+        with self.lock:
+            if path is None:
+                self.entries.clear()
+                self.pinned.clear()
+                self.cached_bytes = 0
+            else:
+                self.pinned.discard(path)
+                if path in self.entries:
+                    self._remove(path)
+
+    def set_max_bytes(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def stats(self):
+        """
+        :return: dict of hit, miss, eviction and invalidation counts, and
+                 the number of surfaces and bytes currently cached.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self.entries),
+                "pinned": len(self.pinned),
+                "cached_bytes": self.cached_bytes,
+                "max_bytes": self.max_bytes,
+            }
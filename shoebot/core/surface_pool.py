@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Pool of image surfaces reused between frames.
+
+Allocating a new ImageSurface for every frame means allocating and page
+faulting the whole frame each time, for large frames this is a
+noticeable part of rendering.
+"""
+import threading
+from collections import defaultdict
+
+from .backend import cairo
+
+# Default limit on the size of surfaces kept in a pool, in bytes.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def surface_bytes(format, width, height):
+    """
+    :return: size in bytes of the pixel data of an ImageSurface.
+    """
+    return cairo.ImageSurface.format_stride_for_width(format, width) * height
+
+
+class SurfacePool(object):
+    """
+    Reuse ImageSurfaces of the same format and size.
+
+    Surfaces are taken with acquire and given back with release once
+    nothing will draw on them or read them, released surfaces are kept
+    while the pool holds less than max_bytes.  Safe to use from several
+    threads.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param max_bytes: Maximum total size of surfaces kept for reuse.
+        """
+        self.max_bytes = max_bytes
+        self.pooled_bytes = 0
+        self.surfaces = defaultdict(list)
+        self.lock = threading.Lock()
+        # Counters, see stats.
+        self.allocated = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def acquire(self, format, size):
+        """
+        :return: cleared ImageSurface of format and size (width, height).
+        """
+        width, height = size
+        key = format, width, height
+        with self.lock:
+            free = self.surfaces[key]
+            if free:
+                surface = free.pop()
+                self.pooled_bytes -= surface_bytes(*key)
+                self.reused += 1
+            else:
+                surface = None
+                self.allocated += 1
+
+        if surface is None:
+            return cairo.ImageSurface(format, width, height)
+
+        ctx = cairo.Context(surface)
+        ctx.set_operator(cairo.OPERATOR_CLEAR)
+        ctx.paint()
+        return surface
+
+    def release(self, surface):
+        """
+        Give surface back to the pool, or finish it if the pool is full.
+        """
+        key = surface.get_format(), surface.get_width(), surface.get_height()
+        nbytes = surface_bytes(*key)
+        with self.lock:
+            if self.pooled_bytes + nbytes <= self.max_bytes:
+                self.surfaces[key].append(surface)
+                self.pooled_bytes += nbytes
+                return
+            self.discarded += 1
+        surface.finish()
+
+    def clear(self):
+        """
+        Finish and forget all pooled surfaces.
+        """
+        with self.lock:
+            surfaces = [s for free in self.surfaces.values() for s in free]
+            self.surfaces.clear()
+            self.pooled_bytes = 0
+        for surface in surfaces:
+            surface.finish()
+
+    def stats(self):
+        """
+        :return: dict of allocated, reused and discarded surface counts
+                 and the number of bytes currently pooled.
+        """
+        with self.lock:
+            return {
+                "allocated": self.allocated,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "pooled_bytes": self.pooled_bytes,
+            }
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Sink that rasterizes very large images as tiles in parallel threads.
+
+The bot runs once to fill the drawqueue, which is recorded once, then
+each tile is rasterized from the recording by a pool thread.  cairo
+releases the GIL while it rasterizes, so tiles render in parallel.
+Tiles are drawn straight into the pixels of their row of tiles, and
+the rows are streamed into the PNG, so the full image is never held in
+memory.
+"""
+import multiprocessing
+from functools import partial
+from multiprocessing.pool import ThreadPool
+
+from .backend import cairo
+from .cairo_sink import CairoImageSink
+from .png import PNGWriter, argb32_to_rgba
+
+DEFAULT_TILE_SIZE = 1024
+
+
+def render_tile(recording, row_data, row_y, stride, tile):
+    """
+    Rasterize part of a frame into the pixels of its row of tiles.
+
+    :param recording: RecordingSurface the frame was drawn on.
+    :param row_data: bytearray of ARGB32 pixels of the row of tiles, with
+                     a spare row at the end so every tile can start in it.
+    :param row_y: y coordinate of the row.
+    :param stride: bytes per line of the row.
+    :param tile: (x, y, width, height) of the area to render.
+    :return: tile
+    """
+    x, y, width, height = tile
+    data = memoryview(row_data)[x * 4 + (y - row_y) * stride :]
+    surface = cairo.ImageSurface.create_for_data(
+        data, cairo.FORMAT_ARGB32, width, height, stride
+    )
+    ctx = cairo.Context(surface)
+    ctx.set_operator(cairo.OPERATOR_CLEAR)
+    ctx.paint()
+    ctx.set_operator(cairo.OPERATOR_OVER)
+    ctx.set_source_surface(recording, -x, -y)
+    ctx.paint()
+    # Let go of row_data before the row is written.
+    surface.finish()
+    data.release()
+    return tile
+
+
+class TiledImageSink(CairoImageSink):
+    """
+    CairoImageSink for huge PNG images, renders tiles on a pool of threads.
+
+    Peak memory is roughly one row of tiles.  The threads are started by
+    the first frame and kept until finish.
+    """
+
+    def __init__(
+        self,
+        target=None,
+        format=None,
+        multifile=False,
+        buff=None,
+        tile_size=DEFAULT_TILE_SIZE,
+        jobs=None,
+        compression=6,
+    ):
+        """
+        :param tile_size: Width and height of each tile in pixels.
+        :param jobs: Number of threads rendering tiles, defaults to the number of CPUs.
+        :param compression: zlib compression level of the PNG.
+
+        See CairoImageSink for the other parameters.
+        """
+        CairoImageSink.__init__(self, target, format, multifile, buff)
+        if self.format != "png":
+            raise ValueError("TiledImageSink only supports png output.")
+        self.tile_size = tile_size
+        self.jobs = jobs or multiprocessing.cpu_count()
+        self.compression = compression
+        self.pool = None
+
+    def tile_rows(self, size):
+        """
+        :return: list of rows, each a list of (x, y, width, height) tiles.
+        """
+        width, height = size
+        rows = []
+        for y in range(0, height, self.tile_size):
+            tile_height = min(self.tile_size, height - y)
+            rows.append(
+                [
+                    (x, y, min(self.tile_size, width - x), tile_height)
+                    for x in range(0, width, self.tile_size)
+                ]
+            )
+        return rows
+
+    def render(self, size, frame, drawqueue):
+        """
+        Render drawqueue as tiles and write them to a PNG.
+        """
+        size = int(size[0]), int(size[1])
+        output = self._output_file(frame)
+        if isinstance(output, str):
+            with open(output, "wb") as f:
+                self._render_png(size, drawqueue, f)
+        else:
+            self._render_png(size, drawqueue, output)
+
+    def _render_png(self, size, drawqueue, f):
+        width, height = size
+        writer = PNGWriter(f, width, height, self.compression)
+        stride = width * 4
+
+        # Render functions run once, on this thread, the pool threads only
+        # rasterize the recording.
+        recording = cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA, None)
+        drawqueue.render(cairo.Context(recording))
+
+        if self.pool is None:
+            self.pool = ThreadPool(self.jobs)
+        row_data = None
+        try:
+            for row in self.tile_rows(size):
+                row_y, row_height = row[0][1], row[0][3]
+                if row_data is None or len(row_data) != (row_height + 1) * stride:
+                    row_data = bytearray((row_height + 1) * stride)
+
+                render = partial(render_tile, recording, row_data, row_y, stride)
+                tiles = row
+                if row_y == 0:
+                    # Anything cairo builds lazily for the recording is built
+                    # by the first tile, before the threads share it.
+                    render(row[0])
+                    tiles = row[1:]
+                # Tiles are drawn in place, so their order doesn't matter.
+                for tile in self.pool.imap_unordered(render, tiles):
+                    pass
+                writer.write_rows(argb32_to_rgba(row_data[: row_height * stride]))
+        finally:
+            recording.finish()
+
+        writer.close()
+
+    def finish(self):
+        """
+        Stop the threads rendering tiles, they are started again by
+        the next frame.
+        """
+        try:
+            CairoImageSink.finish(self)
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+# This file is part of Shoebot.
+# Copyright (C) 2007-2009 the Shoebot authors
+# See the COPYING file for the full license text.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+#   The name of the author may not be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR IMPLIED
+#   WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+#   MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO
+#   EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#   SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+#   PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+#   OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+#   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+#   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+#   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Sink that streams frames to ffmpeg to encode a video.
+
+Frames are rendered to an ImageSurface and its pixel data is written
+to ffmpeg's stdin as raw video, so no image files are written or
+encoded on the way.
+"""
+import os
+import sys
+
+from .backend import cairo
+from .drawqueue_sink import DrawQueueSink
+
+DEFAULT_FPS = 30
+
+# ffmpeg output options for each supported extension.
+X264 = ["-c:v", "libx264", "-crf", "20", "-pix_fmt", "yuv420p"]
+VIDEO_CODECS = {
+    ".mp4": X264 + ["-movflags", "+faststart"],
+    ".mov": X264,
+    ".mkv": X264,
+    ".webm": ["-c:v", "libvpx-vp9", "-b:v", "0", "-crf", "30", "-pix_fmt", "yuv420p"],
+    ".gif": [],
+}
+VIDEO_EXTENSIONS = tuple(VIDEO_CODECS)
+
+# cairo ARGB32 is native endian, so the byte order depends on the platform.
+RAW_PIXEL_FORMAT = "bgra" if sys.byteorder == "little" else "argb"
+
+
+class VideoSink(DrawQueueSink):
+    """
+    DrawQueueSink that pipes each frame to an ffmpeg subprocess.
+
+    The video is complete once finish is called at the end of the run.
+    All frames must be the same size.  Pixels are passed to ffmpeg
+    premultiplied, so transparent areas come out as if drawn on black.
+    """
+
+    def __init__(self, filename, fps=None, ffmpeg="ffmpeg", ffmpeg_args=None):
+        """
+        :param filename: Video file to write, the extension selects the codec.
+        :param fps: Frames per second, defaults to the speed of the bot.
+        :param ffmpeg: ffmpeg executable.
+        :param ffmpeg_args: Output options for ffmpeg, overriding the defaults
+                            for the file extension.
+        """
+        DrawQueueSink.__init__(self)
+        extension = os.path.splitext(filename)[1].lower()
+        if ffmpeg_args is None:
+            if extension not in VIDEO_CODECS:
+                raise ValueError(f"Unsupported video format {extension}")
+            ffmpeg_args = VIDEO_CODECS[extension]
+        self.filename = filename
+        self.fps = fps
+        self.ffmpeg = ffmpeg
+        self.ffmpeg_args = ffmpeg_args
+        self.process = None
+        self.surface = None
+
+    def _start_ffmpeg(self, size):
+        import subprocess
+
+        fps = self.fps or abs(getattr(self.bot, "_speed", None) or 0) or DEFAULT_FPS
+        width, height = size
+        cmd = [
+            self.ffmpeg,
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            RAW_PIXEL_FORMAT,
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            str(fps),
+            "-i",
+            "-",
+            # Codecs using yuv420p need even dimensions.
+            "-vf",
+            "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            *self.ffmpeg_args,
+            self.filename,
+        ]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def create_rcontext(self, size, frame):
+        """
+        Reuse a single ImageSurface for every frame.
+        """
+        size = int(size[0]), int(size[1])
+        if self.surface is None:
+            self.surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, *size)
+            self._start_ffmpeg(size)
+        elif (self.surface.get_width(), self.surface.get_height()) != size:
+            raise ValueError("All frames of a video must be the same size.")
+        ctx = cairo.Context(self.surface)
+        # The surface is reused, clear the previous frame.
+        ctx.set_operator(cairo.OPERATOR_CLEAR)
+        ctx.paint()
+        ctx.set_operator(cairo.OPERATOR_OVER)
+        return ctx
+
+    def rendering_finished(self, size, frame, cairo_ctx):
+        """
+        Write the pixels of the frame to ffmpeg.
+        """
+        surface = cairo_ctx.get_target()
+        surface.flush()
+        # ARGB32 rows are never padded, so the data is exactly one frame.
+        self.process.stdin.write(surface.get_data())
+
+    def finish(self):
+        """
+        Close ffmpeg's input and wait for it to finish writing the video.
+
+        Called after the last frame, or after the bot failed, so the frames
+        rendered before the error make a complete video.
+        """
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        self.surface = None
+        try:
+            process.stdin.close()
+        finally:
+            returncode = process.wait()
+        if returncode != 0:
+            raise IOError(f"ffmpeg exited with code {returncode}")
+
+    def set_title(self, title):
+        # Does nothing, only relevant to GUI
+        pass
@@ -71,6 +71,7 @@ from .bezier import (
 )
 from .grob import Grob, CENTER, CORNER, CORNERS
 from .img import Image
+from .instances import Instances
 from .point import Point
 from .transforms import Transform
 from .variable import BOOLEAN, BUTTON, NUMBER, TEXT, Variable
@@ -8,11 +8,15 @@ import sys
 import locale
 import gettext
 
-from itertools import chain
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain
+from numbers import Real
 from math import pi as _pi, sqrt
-from math import sin, cos
+from math import acos, sin, cos
 
 from shoebot.core.backend import cairo
+from shoebot.util import get_numpy
 
 from .basecolor import ColorMixin
 from .grob import Grob, CENTER, CORNER, CORNERS
@@ -101,6 +105,361 @@ gettext.bindtextdomain(APP, DIR)
 gettext.textdomain(APP)
 _ = gettext.gettext
 
+# Opcodes of the elements stored in PackedElements.
+_LINE_TO = 0
+_CURVE_TO = 1
+_MOVE_TO = 2
+_CLOSE_PATH = 3
+_REL_LINE_TO = 4
+_REL_MOVE_TO = 5
+_REL_CURVE_TO = 6
+_ARC = 7
+_ELLIPSE = 8
+_NO_OP = 9
+
+_OPCODES = {
+    LINETO: _LINE_TO,
+    CURVETO: _CURVE_TO,
+    MOVETO: _MOVE_TO,
+    CLOSE: _CLOSE_PATH,
+    RLINETO: _REL_LINE_TO,
+    RMOVETO: _REL_MOVE_TO,
+    RCURVETO: _REL_CURVE_TO,
+    ARC: _ARC,
+    ELLIPSE: _ELLIPSE,
+    None: _NO_OP,
+}
+
+# Command of each opcode, and how many floats its element takes.
+_COMMANDS = sorted(_OPCODES, key=_OPCODES.get)
+_ARITY = (2, 6, 2, 2, 2, 2, 6, 5, 4, 0)
+_ABSOLUTE = {_REL_LINE_TO: _LINE_TO, _REL_MOVE_TO: _MOVE_TO, _REL_CURVE_TO: _CURVE_TO}
+
+
+def _flatten_arc(x, y, rx, ry, angle1, angle2, tolerance):
+    """
+    :return: coordinates of points along an arc of an ellipse, from angle1 to
+             angle2, close enough together to be within tolerance of it.
+    """
+    radius = max(abs(rx), abs(ry))
+    if radius > tolerance:
+        step = 2 * acos(1 - tolerance / radius)
+    else:
+        step = _pi / 2
+    steps = max(1, int((angle2 - angle1) / step) + 1)
+    points = array("d")
+    for i in range(steps + 1):
+        angle = angle1 + (angle2 - angle1) * i / steps
+        points.append(x + rx * cos(angle))
+        points.append(y + ry * sin(angle))
+    return points
+
+
+class PackedElements(object):
+    """
+    Storage for the elements of a BezierPath, as an array of opcodes and
+    an array of their float coordinates.
+
+    Elements cost a byte and 8 bytes per coordinate, instead of a tuple or
+    PathElement each, and are rendered by a single loop over the arrays.
+
+    Indexing returns a PathElement, created on first access and kept, so
+    the same element is returned each time.
+    """
+
+    def __init__(self, elements=None):
+        self.opcodes = array("B")
+        self.floats = array("d")
+        # Index of the first float of each element, built when indexing.
+        self._offsets = array("L")
+        self._path_elements = {}
+        if elements is not None:
+            self.extend(elements)
+
+    def append(self, element):
+        """
+        Append a PathElement or a tuple of the arguments to create one.
+        """
+        if isinstance(element, PathElement):
+            cmd, values = element.cmd, element.values
+            self._path_elements[len(self.opcodes)] = element
+        else:
+            cmd, values = element[0], element[1:]
+        opcode = _OPCODES[cmd]
+        if len(values) != _ARITY[opcode]:
+            # Nested arguments such as ('curveto', (x1, y1), (x2, y2), (x, y))
+            values = PathElement(cmd, *values).values
+        self.opcodes.append(opcode)
+        self.floats.extend(values)
+
+    def extend(self, elements):
+        if isinstance(elements, PackedElements):
+            start = len(self.opcodes)
+            self.opcodes.extend(elements.opcodes)
+            self.floats.extend(elements.floats)
+            for index, element in elements._path_elements.items():
+                self._path_elements[start + index] = element
+        else:
+            for element in elements:
+                self.append(element)
+
+    def copy(self):
+        """
+        :return: PackedElements with the same elements.
+        """
+        packed = PackedElements()
+        packed.extend(self)
+        return packed
+
+    def _offset(self, index):
+        offsets = self._offsets
+        if index >= len(offsets):
+            opcodes = self.opcodes
+            f = offsets[-1] + _ARITY[opcodes[len(offsets) - 1]] if offsets else 0
+            for opcode in opcodes[len(offsets) : index + 1]:
+                offsets.append(f)
+                f += _ARITY[opcode]
+        return offsets[index]
+
+    def element(self, index):
+        """
+        :return: tuple of the command and coordinates of an element.
+        """
+        opcode = self.opcodes[index]
+        f = self._offset(index)
+        return (_COMMANDS[opcode], *self.floats[f : f + _ARITY[opcode]])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self.opcodes)
+        if not 0 <= index < len(self.opcodes):
+            raise IndexError("path element index out of range")
+        element = self._path_elements.get(index)
+        if element is None:
+            element = self._path_elements[index] = PathElement(*self.element(index))
+        return element
+
+    def __iter__(self):
+        for index in range(len(self.opcodes)):
+            yield self[index]
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def traverse(self, cairo_ctx):
+        """
+        Issue the elements on cairo_ctx.
+        """
+        floats = self.floats
+        f = 0
+        for opcode in self.opcodes:
+            if opcode == _LINE_TO:
+                cairo_ctx.line_to(floats[f], floats[f + 1])
+                f += 2
+            elif opcode == _CURVE_TO:
+                cairo_ctx.curve_to(
+                    floats[f],
+                    floats[f + 1],
+                    floats[f + 2],
+                    floats[f + 3],
+                    floats[f + 4],
+                    floats[f + 5],
+                )
+                f += 6
+            elif opcode == _MOVE_TO:
+                cairo_ctx.move_to(floats[f], floats[f + 1])
+                f += 2
+            elif opcode == _CLOSE_PATH:
+                cairo_ctx.close_path()
+                f += 2
+            elif opcode == _REL_LINE_TO:
+                cairo_ctx.rel_line_to(floats[f], floats[f + 1])
+                f += 2
+            elif opcode == _REL_MOVE_TO:
+                cairo_ctx.rel_move_to(floats[f], floats[f + 1])
+                f += 2
+            elif opcode == _REL_CURVE_TO:
+                cairo_ctx.rel_curve_to(
+                    floats[f],
+                    floats[f + 1],
+                    floats[f + 2],
+                    floats[f + 3],
+                    floats[f + 4],
+                    floats[f + 5],
+                )
+                f += 6
+            elif opcode == _ARC:
+                cairo_ctx.arc(
+                    floats[f],
+                    floats[f + 1],
+                    floats[f + 2],
+                    floats[f + 3],
+                    floats[f + 4],
+                )
+                f += 5
+            elif opcode == _ELLIPSE:
+                x, y, w, h = floats[f : f + 4]
+                if w != 0.0 and h != 0.0:
+                    cairo_ctx.save()
+                    cairo_ctx.translate(x + w / 2.0, y + h / 2.0)
+                    cairo_ctx.scale(w * 0.5, h * 0.5)
+                    cairo_ctx.arc(0.0, 0.0, 1.0, 0.0, 2 * _pi)
+                    cairo_ctx.close_path()
+                    cairo_ctx.restore()
+                f += 4
+
+    def extents(self):
+        """
+        Compute the bounds of the elements from their coordinates, as cairo's
+        path_extents would, including the extrema of curves and arcs.
+
+        :return: x1, y1, x2, y2
+        """
+        floats = self.floats
+        xs = array("d")
+        ys = array("d")
+        # Current point and start of the current contour.
+        cx = cy = sx = sy = 0.0
+        current = False
+        f = 0
+        for opcode in self.opcodes:
+            arity = _ARITY[opcode]
+            args = floats[f : f + arity]
+            f += arity
+            if opcode in _ABSOLUTE:
+                args = [v + (cy if i % 2 else cx) for i, v in enumerate(args)]
+                opcode = _ABSOLUTE[opcode]
+            if opcode == _LINE_TO or opcode == _CURVE_TO:
+                if not current:
+                    # Without a current point cairo moves to the first point.
+                    cx = sx = args[0]
+                    cy = sy = args[1]
+                    current = True
+                xs.append(cx)
+                ys.append(cy)
+                if opcode == _CURVE_TO:
+                    for x, y in geometry.curve_extrema(cx, cy, *args):
+                        xs.append(x)
+                        ys.append(y)
+                cx, cy = args[-2], args[-1]
+                xs.append(cx)
+                ys.append(cy)
+            elif opcode == _MOVE_TO:
+                cx = sx = args[0]
+                cy = sy = args[1]
+                current = True
+            elif opcode == _CLOSE_PATH:
+                if current:
+                    xs.extend((cx, sx))
+                    ys.extend((cy, sy))
+                    cx, cy = sx, sy
+            elif opcode == _ARC:
+                points = geometry.arc_extrema(*args)
+                if current:
+                    xs.append(cx)
+                    ys.append(cy)
+                else:
+                    sx, sy = points[0]
+                for x, y in points:
+                    xs.append(x)
+                    ys.append(y)
+                cx, cy = points[1]
+                current = True
+            elif opcode == _ELLIPSE:
+                x, y, w, h = args
+                if w != 0.0 and h != 0.0:
+                    xs.extend((x, x + w))
+                    ys.extend((y, y + h))
+                    if current:
+                        xs.extend((cx, sx))
+                        ys.extend((cy, sy))
+                    else:
+                        sx, sy = x + w, y + h / 2.0
+                    cx, cy = sx, sy
+                    current = True
+        if not xs:
+            return 0.0, 0.0, 0.0, 0.0
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def flatten(self, tolerance=0.1):
+        """
+        Approximate the elements with straight lines, for hit testing.
+
+        Curves, arcs and ellipses are split into enough lines that they are
+        at most about tolerance away from the real shape.
+
+        :return: list of contours, each an array of x, y coordinates.
+        """
+        floats = self.floats
+        contours = []
+        contour = None
+        cx = cy = 0.0
+        f = 0
+        for opcode in self.opcodes:
+            arity = _ARITY[opcode]
+            args = floats[f : f + arity]
+            f += arity
+            if opcode == _NO_OP or (contour is None and opcode == _CLOSE_PATH):
+                continue
+            if opcode in _ABSOLUTE:
+                args = [v + (cy if i % 2 else cx) for i, v in enumerate(args)]
+                opcode = _ABSOLUTE[opcode]
+            if opcode == _MOVE_TO or contour is None:
+                start = args[:2]
+                if opcode == _ARC:
+                    x, y, radius, angle1, angle2 = args
+                    start = (x + radius * cos(angle1), y + radius * sin(angle1))
+                elif opcode == _ELLIPSE:
+                    x, y, w, h = args
+                    start = (x + w, y + h / 2.0)
+                contour = array("d", start)
+                contours.append(contour)
+                if opcode == _MOVE_TO:
+                    cx, cy = start
+                    continue
+            if opcode == _LINE_TO:
+                contour.extend(args)
+            elif opcode == _CURVE_TO:
+                x1, y1, x2, y2, x3, y3 = args
+                # Wang's formula for the number of lines within tolerance.
+                ddx = max(abs(cx - 2 * x1 + x2), abs(x1 - 2 * x2 + x3))
+                ddy = max(abs(cy - 2 * y1 + y2), abs(y1 - 2 * y2 + y3))
+                steps = int(sqrt(0.75 * sqrt(ddx**2 + ddy**2) / tolerance)) + 1
+                for step in range(1, steps + 1):
+                    t = step / steps
+                    mt = 1 - t
+                    a0, a1, a2, a3 = mt**3, 3 * mt * mt * t, 3 * mt * t * t, t**3
+                    contour.append(a0 * cx + a1 * x1 + a2 * x2 + a3 * x3)
+                    contour.append(a0 * cy + a1 * y1 + a2 * y2 + a3 * y3)
+            elif opcode == _ARC:
+                x, y, radius, angle1, angle2 = args
+                while angle2 < angle1:
+                    angle2 += 2 * _pi
+                contour.extend(
+                    _flatten_arc(x, y, radius, radius, angle1, angle2, tolerance)
+                )
+            elif opcode == _ELLIPSE:
+                x, y, w, h = args
+                if w != 0.0 and h != 0.0:
+                    rx, ry = w / 2.0, h / 2.0
+                    contour.extend(
+                        _flatten_arc(x + rx, y + ry, rx, ry, 0.0, 2 * _pi, tolerance)
+                    )
+                    opcode = _CLOSE_PATH
+            if opcode == _CLOSE_PATH:
+                # Following lines start a new contour from the start of this one.
+                contour = array("d", contour[:2])
+                contours.append(contour)
+            cx, cy = contour[-2], contour[-1]
+        return [contour for contour in contours if len(contour) > 4]
+
+    def __str__(self):
+        return (
+            f"<PackedElements elements={len(self.opcodes)} floats={len(self.floats)}>"
+        )
+
 
 class BezierPath(Grob, ColorMixin):
     """
@@ -143,10 +502,8 @@ class BezierPath(Grob, ColorMixin):
         blendmode=None,
         packed_elements=None,
     ):
-        # Stores two lists, _elements and _render_funcs that are kept syncronized
-        # _render_funcs contain functions that do the rendering
-        # _elements contains either a PathElement or the arguments that need
-        # to be passed to a PathElement when it's created.
+        # _elements stores the commands and coordinates of the path in arrays
+        # (see PackedElements), _traverse renders directly from them.
         #
         # This way PathElements are not created unless they are used in the bot
         Grob.__init__(self, bot)
@@ -163,11 +520,10 @@ class BezierPath(Grob, ColorMixin):
             blendmode=blendmode,
         )
 
-        if packed_elements is not None:
-            self._elements, self._render_funcs = packed_elements
+        if isinstance(packed_elements, PackedElements):
+            self._elements = packed_elements
         else:
-            self._elements = []
-            self._render_funcs = []
+            self._elements = PackedElements(packed_elements)
 
         self.closed = False
 
@@ -175,23 +531,40 @@ class BezierPath(Grob, ColorMixin):
         self._bounds = None
         self._center = None
         self._segments = None
+        self._lut = None
+        self._polygon = None
+        # Transform and cairo path of this path, see _append_to.  Copies of
+        # the path share this until either changes.
+        self._cairo_path = [None, None]
 
         if isinstance(path, (tuple, list)):
             # list of path elements
             for element in path:
                 self.append(element)
         elif isinstance(path, BezierPath):
-            self._elements = list(path._elements)
-            self._render_funcs = list(path._render_funcs)
+            self._elements = path._elements.copy()
+            self._cairo_path = path._cairo_path
             self.closed = path.closed
 
-    def _append_element(self, render_func, pe):
+    def _invalidate(self):
         """
-        Append a render function and the parameters to pass
-        an equivilent PathElement, or the PathElement itself.
+        Forget values cached from the elements of the path, called when
+        elements are added.
+        """
+        self._bounds = None
+        self._center = None
+        self._segments = None
+        self._lut = None
+        self._polygon = None
+        self._cairo_path = [None, None]
+
+    def _append_element(self, pe):
+        """
+        Append the parameters to pass an equivilent PathElement,
+        or the PathElement itself.
         """
-        self._render_funcs.append(render_func)
         self._elements.append(pe)
+        self._invalidate()
 
     def append(self, *args):
         if len(args) == 2:
@@ -199,20 +572,8 @@ class BezierPath(Grob, ColorMixin):
             self.moveto(*args)
         elif isinstance(args[0], PathElement):
             p = args[0]
-            if p.cmd == MOVETO:
-                self._append_element(self._canvas.moveto_closure(p.x, p.y), p)
-            elif p.cmd == LINETO:
-                self._append_element(self._canvas.lineto_closure(p.x, p.y), p)
-            elif p.cmd == CURVETO:
-                self._append_element(
-                    self._canvas.curveto_closure(p.x, p.y, p.c1x, p.c1y, p.c2x, p.c2y),
-                    p,
-                )
-            elif p.cmd == ARC:
-                self._append_element(
-                    self._canvas.arc_closure(p.x, p.y, p.radius, p.angle1, p.angle2),
-                    p,
-                )
+            if p.cmd in (MOVETO, LINETO, CURVETO, ARC):
+                self._append_element(p)
 
     def addpoint(self, *args):
         self.append(*args)
@@ -230,52 +591,46 @@ class BezierPath(Grob, ColorMixin):
             strokedash=self._strokedash,
             dashoffset=self._dashoffset,
             blendmode=self._blendmode,
-            packed_elements=(self._elements[:], self._render_funcs[:]),
+            packed_elements=self._elements.copy(),
         )
         path.closed = self.closed
+        path._bounds = self._bounds
         path._center = self._center
+        path._segments = self._segments
+        path._lut = self._lut
+        path._polygon = self._polygon
+        path._cairo_path = self._cairo_path
         return path
 
     def moveto(self, x, y):
-        self._append_element(self._canvas.moveto_closure(x, y), (MOVETO, x, y))
+        self._append_element((MOVETO, x, y))
 
     def relmoveto(self, x, y):
-        self._append_element(self._canvas.relmoveto_closure(x, y), (RMOVETO, x, y))
+        self._append_element((RMOVETO, x, y))
 
     def lineto(self, x, y):
-        self._append_element(self._canvas.lineto_closure(x, y), (LINETO, x, y))
+        self._append_element((LINETO, x, y))
 
     def rellineto(self, x, y):
-        self._append_element(self._canvas.rellineto_closure(x, y), (RLINETO, x, y))
+        self._append_element((RLINETO, x, y))
 
     def line(self, x1, y1, x2, y2):
         self.moveto(x1, y1)
         self.lineto(x2, y2)
 
     def curveto(self, x1, y1, x2, y2, x3, y3):
-        self._append_element(
-            self._canvas.curveto_closure(x1, y1, x2, y2, x3, y3),
-            (CURVETO, x1, y1, x2, y2, x3, y3),
-        )
+        self._append_element((CURVETO, x1, y1, x2, y2, x3, y3))
 
     def relcurveto(self, x1, y1, x2, y2, x3, y3):
-        self._append_element(
-            self._canvas.relcurveto_closure(x1, y1, x2, y2, x3, y3),
-            (RCURVETO, x1, y1, x2, y2, x3, y3),
-        )
+        self._append_element((RCURVETO, x1, y1, x2, y2, x3, y3))
 
     def arc(self, x, y, radius, angle1, angle2):
-        self._append_element(
-            self._canvas.arc_closure(x, y, radius, angle1, angle2),
-            (ARC, x, y, radius, angle1, angle2),
-        )
+        self._append_element((ARC, x, y, radius, angle1, angle2))
 
     def closepath(self):
         if self._elements:
             start_el = self[0]
-            self._append_element(
-                self._canvas.closepath_closure(), (CLOSE, start_el.x, start_el.y)
-            )
+            self._append_element((CLOSE, start_el.x, start_el.y))
             self.closed = True
 
     def ellipse(self, x, y, w, h, ellipsemode=CORNER):
@@ -286,9 +641,7 @@ class BezierPath(Grob, ColorMixin):
         elif ellipsemode == CORNERS:
             w = w - x
             h = h - y
-        self._append_element(
-            self._canvas.ellipse_closure(x, y, w, h), (ELLIPSE, x, y, w, h)
-        )
+        self._append_element((ELLIPSE, x, y, w, h))
         self.closed = True
 
     def rect(self, x, y, w, h, roundness=0.0, rectmode=CORNER):
@@ -320,50 +673,113 @@ class BezierPath(Grob, ColorMixin):
 
     def _traverse(self, cairo_ctx):
         """
-        Traverse this path
+        Traverse this path, issuing its elements on cairo_ctx.
         """
-        for render_func in self._render_funcs:
-            render_func(cairo_ctx)
+        self._elements.traverse(cairo_ctx)
 
-    def _get_bounds(self):
+    def _copy_cairo_path(self, cairo_ctx, transform):
         """
-        Return cached bounds of this Grob.
-        If bounds are not cached, render to a meta surface, and
-        keep the meta surface and bounds cached.
+        :return: cairo path of this path traversed under transform, kept until
+                 the path changes or is copied under another transform.
+
+        Leaves cairo_ctx without a current path.
         """
-        if self._bounds:
-            return self._bounds
+        key = tuple(transform)
+        cache = self._cairo_path
+        if cache[0] != key or cache[1] is None:
+            cairo_ctx.new_path()
+            cairo_ctx.set_matrix(transform)
+            self._traverse(cairo_ctx)
+            cache[:] = key, cairo_ctx.copy_path()
+            cairo_ctx.new_path()
+        return cache[1]
 
-        record_surface = cairo.RecordingSurface(
-            cairo.CONTENT_COLOR_ALPHA, (-1, -1, 1, 1)
-        )
-        dummy_ctx = cairo.Context(record_surface)
-        self._traverse(dummy_ctx)
+    def _append_to(self, cairo_ctx, transform):
+        """
+        Issue this path on cairo_ctx under transform.
 
-        self._bounds = dummy_ctx.path_extents()
+        A path drawn again under the same transform, such as one made in
+        setup() and drawn each frame, is copied as a cairo path the second
+        time and appended from then on, instead of being traversed.
+        Paths drawn once are only traversed.
+        """
+        cairo_ctx.set_matrix(transform)
+        if not isinstance(cairo_ctx, cairo.Context):
+            # Draw queues that record commands replay from their own arrays.
+            self._traverse(cairo_ctx)
+            return
+
+        key = tuple(transform)
+        cache = self._cairo_path
+        if cache[0] != key:
+            cache[:] = key, None
+            self._traverse(cairo_ctx)
+        elif cache[1] is None:
+            self._traverse(cairo_ctx)
+            cache[1] = cairo_ctx.copy_path()
+        else:
+            cairo_ctx.append_path(cache[1])
+
+    def _get_bounds(self):
+        """
+        Return cached bounds of this Grob.
+        If bounds are not cached, compute them from the path elements
+        and cache them until the path changes.
+        """
+        if self._bounds is None:
+            self._bounds = self._elements.extents()
         return self._bounds
 
+    _get_extents = _get_bounds
+
     def _get_dimensions(self):
         x1, y1, x2, y2 = self._get_bounds()
         return x1, y1
 
-    def contains(self, x, y):
+    def _get_polygon(self):
         """
-        Return cached bounds of this Grob.
-        If bounds are not cached, render to a meta surface, and
-        keep the meta surface and bounds cached.
+        :return: the path flattened to contours of straight lines, cached
+                 until the path changes.
         """
-        if self._bounds:
-            return self._bounds
+        if self._polygon is None:
+            self._polygon = self._elements.flatten()
+        return self._polygon
 
-        record_surface = cairo.RecordingSurface(
-            cairo.CONTENT_COLOR_ALPHA, (-1, -1, 1, 1)
-        )
-        dummy_ctx = cairo.Context(record_surface)
-        self._traverse(dummy_ctx)
+    def contains(self, x, y):
+        """
+        Return True if the point x, y is inside the path, following its
+        fill rule.
 
-        in_fill = dummy_ctx.in_fill(x, y)
-        return in_fill
+        x and y may also be sequences (or numpy arrays) of coordinates, to
+        test many points at once, then a list of bools is returned.
+
+        The path is flattened to straight lines once, and kept until the
+        path changes.  With numpy installed, sequences of points are tested
+        against all the lines at once.
+        """
+        x1, y1, x2, y2 = self._get_bounds()
+        polygon = self._get_polygon()
+        evenodd = self.fillrule in (EVENODD, cairo.FILL_RULE_EVEN_ODD)
+
+        def contains(x, y):
+            if not (x1 <= x <= x2 and y1 <= y <= y2):
+                return False
+            winding = geometry.winding_number(polygon, x, y)
+            return bool(winding % 2) if evenodd else winding != 0
+
+        if isinstance(x, Real):
+            return contains(x, y)
+        np = get_numpy()
+        if np is None:
+            return [contains(px, py) for px, py in zip(x, y)]
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        inside = (x1 <= x) & (x <= x2) & (y1 <= y) & (y <= y2)
+        (candidates,) = np.nonzero(inside)
+        winding = geometry.winding_numbers(np, polygon, x[candidates], y[candidates])
+        inside[candidates] = (winding % 2 == 1) if evenodd else (winding != 0)
+        return inside.tolist()
 
     def _get_center(self):
         """
@@ -387,70 +803,110 @@ class BezierPath(Grob, ColorMixin):
 
     center = property(_get_center)
 
-    def _render_closure(self):
-        """Use a closure so that draw attributes can be saved"""
-        fillcolor = self.fill
-        fillrule = self.fillrule
-        strokecolor = self.stroke
-        strokewidth = self.strokewidth
-        strokecap = self.strokecap
-        strokejoin = self.strokejoin
-        strokedash = self.strokedash
-        dashoffset = self.dashoffset
-        blendmode = self.blendmode
+    def _get_render_state(self):
+        """
+        :return: the draw attributes passed to _render_path.
+        """
+        return (
+            self.fill,
+            self.fillrule,
+            self.stroke,
+            self.strokewidth,
+            self.strokecap,
+            self.strokejoin,
+            self.strokedash,
+            self.dashoffset,
+            self.blendmode,
+        )
 
-        def _render(cairo_ctx):
-            """
-            At the moment this is based on cairo.
+    def _render_path(
+        self,
+        cairo_ctx,
+        fillcolor,
+        fillrule,
+        strokecolor,
+        strokewidth,
+        strokecap,
+        strokejoin,
+        strokedash,
+        dashoffset,
+        blendmode,
+    ):
+        """
+        At the moment this is based on cairo.
 
-            TODO: Need to work out how to move the cairo specific
-                  bits somewhere else.
-            """
-            # Go to initial point (CORNER or CENTER):
-            transform = self._call_transform_mode(self._transform)
+        TODO: Need to work out how to move the cairo specific
+              bits somewhere else.
+        """
+        # Go to initial point (CORNER or CENTER):
+        transform = self._call_transform_mode(self._transform)
+
+        if fillcolor is None and strokecolor is None:
+            # Fixes _bug_FillStrokeNofillNostroke.bot
+            return
+
+        # Run the path commands on the cairo context:
+        self._append_to(cairo_ctx, transform)
+        # Matrix affects stroke, so we need to reset it:
+        cairo_ctx.set_matrix(cairo.Matrix())
+
+        if blendmode:
+            cairo_ctx.set_operator(BLENDMODES[blendmode])
+
+        if fillcolor:
+            cairo_ctx.set_source_rgba(*fillcolor)
+            if fillrule:
+                cairo_ctx.set_fill_rule(fillrule)
+            if not strokecolor:
+                cairo_ctx.fill()
+            else:
+                cairo_ctx.fill_preserve()
+        if strokecolor:
+            cairo_ctx.set_source_rgba(*strokecolor)
+            cairo_ctx.set_line_width(strokewidth)
+            if strokedash:
+                cairo_ctx.set_dash(strokedash, dashoffset)
+            if strokecap:
+                # this is needed because strokecap and strokejoin have a ROUND
+                # option which is a different value for each
+                cairo_ctx.set_line_cap(STROKE_CAPS[strokecap])
+            if strokejoin:
+                cairo_ctx.set_line_join(STROKE_JOINS[strokejoin])
+            cairo_ctx.stroke()
+
+        if blendmode:
+            # reset blend mode
+            cairo_ctx.set_operator(cairo.OPERATOR_OVER)
 
-            if fillcolor is None and strokecolor is None:
-                # Fixes _bug_FillStrokeNofillNostroke.bot
-                return
+    def _render_closure(self):
+        """Use a closure so that draw attributes can be saved"""
+        render_state = self._get_render_state()
 
-            cairo_ctx.set_matrix(transform)
-            # Run the path commands on the cairo context:
-            self._traverse(cairo_ctx)
-            # Matrix affects stroke, so we need to reset it:
-            cairo_ctx.set_matrix(cairo.Matrix())
-
-            if blendmode:
-                cairo_ctx.set_operator(BLENDMODES[blendmode])
-
-            if fillcolor:
-                cairo_ctx.set_source_rgba(*fillcolor)
-                if fillrule:
-                    cairo_ctx.set_fill_rule(fillrule)
-                if not strokecolor:
-                    cairo_ctx.fill()
-                else:
-                    cairo_ctx.fill_preserve()
-            if strokecolor:
-                cairo_ctx.set_source_rgba(*strokecolor)
-                cairo_ctx.set_line_width(strokewidth)
-                if strokedash:
-                    cairo_ctx.set_dash(strokedash, dashoffset)
-                if strokecap:
-                    # this is needed because strokecap and strokejoin have a ROUND
-                    # option which is a different value for each
-                    cairo_ctx.set_line_cap(STROKE_CAPS[strokecap])
-                if strokejoin:
-                    cairo_ctx.set_line_join(STROKE_JOINS[strokejoin])
-                cairo_ctx.stroke()
-
-            if blendmode:
-                # reset blend mode
-                cairo_ctx.set_operator(cairo.OPERATOR_OVER)
+        def _render(cairo_ctx):
+            self._render_path(cairo_ctx, *render_state)
 
         return _render
 
     def draw(self):
-        self._deferred_render(self._render_closure())
+        fill, stroke = self.fill, self.stroke
+        if fill is None and stroke is None:
+            self._canvas.draw_stats.add(self)
+        else:
+            self._canvas.draw_stats.add(
+                self,
+                path_elements=len(self._elements),
+                set_matrix=2,
+                set_source=bool(fill) + bool(stroke),
+            )
+            self._add_to_spatial_index()
+
+        recorder = self._canvas.get_recorder()
+        if recorder is not None:
+            # The draw queue records the cairo calls as they are made,
+            # so there is no need to keep a closure around until render time.
+            self._render_path(recorder, *self._get_render_state())
+        else:
+            self._deferred_render(self._render_closure())
 
     def _get_contours(self):
         """
@@ -498,24 +954,52 @@ class BezierPath(Grob, ColorMixin):
         """
         # Originally from nodebox-gl
         if segments is None:
-            segments = self._segment_lengths(relative=True)
-        if len(segments) == 0:
+            cumulative, starts = self._get_lut()
+        else:
+            cumulative, starts = self._build_lut(segments)
+        if len(cumulative) == 0:
             raise PathError("The given path is empty")
-        for i, el in enumerate(self._get_elements()):
-            if i == 0 or el.cmd == MOVETO:
-                closeto = Point(el.x, el.y)
-            if t <= segments[i] or i == len(segments) - 1:
-                break
-            else:
-                t -= segments[i]
+        # The first segment that ends at or after t.
+        last = len(cumulative) - 1
+        i = min(bisect_left(cumulative, t), last)
+        start = self[starts[bisect_right(starts, i) - 1]]
+        closeto = Point(start.x, start.y)
+        if i:
+            t -= cumulative[i - 1]
+        length = cumulative[i] - cumulative[i - 1] if i else cumulative[0]
         try:
-            t /= segments[i]
+            t /= length
         except ZeroDivisionError:
             pass
-        if i == len(segments) - 1 and segments[i] == 0:
+        if i == last and length == 0:
             i -= 1
         return (i, t, closeto)
 
+    def _build_lut(self, segments):
+        """
+        :param segments: relative lengths of each segment in the path.
+        :return: cumulative relative lengths of the segments, and the indices
+                 of elements that start a contour, to bisect in _locate.
+        """
+        starts = array("L", [0])
+        starts.extend(
+            index
+            for index, opcode in enumerate(self._elements.opcodes)
+            if index and opcode == _MOVE_TO
+        )
+        return array("d", accumulate(segments)), starts
+
+    def _get_lut(self):
+        """
+        :return: the arc-length lookup table used by _locate, cached until
+                 the path changes.
+        """
+        if self._lut is None:
+            if self._segments is None:
+                self._segments = self._get_length(segmented=True, precision=10)
+            self._lut = self._build_lut(self._segments)
+        return self._lut
+
     def point(self, t, segments=None):
         """
         Returns the PathElement at time t (0.0-1.0) on the path.
@@ -531,10 +1015,7 @@ class BezierPath(Grob, ColorMixin):
         if len(self._elements) == 0:
             raise PathError("The given path is empty")
 
-        if self._segments is None:
-            self._segments = self._get_length(segmented=True, precision=10)
-
-        i, t, closeto = self._locate(t, segments=self._segments)
+        i, t, closeto = self._locate(t, segments=segments)
         x0, y0 = self[i].x, self[i].y
         p1 = self[i + 1]
         if p1.cmd == CLOSE:
@@ -581,9 +1062,101 @@ class BezierPath(Grob, ColorMixin):
             # If amount=4, we want the point at t 0.0, 0.33, 0.66 and 1.0.
             # If amount=2, we want the point at t 0.0 and 1.0.
             d = float(n) / (amount - 1)
+        numpy = get_numpy()
+        if numpy is not None:
+            points = self._points_numpy(numpy, start, d, int(amount), segments)
+            if points is not None:
+                yield from points
+                return
         for i in range(int(amount)):
             yield self.point(start + d * i, segments)
 
+    def _points_numpy(self, np, start, d, amount, segments=None):
+        """
+        :return: list of the PathElements point() returns at start + d * i,
+                 for i in range(amount), located and evaluated all at once
+                 with numpy, or None if the path has elements that point()
+                 does not support.
+        """
+        opcodes = np.frombuffer(self._elements.opcodes, dtype=np.uint8)
+        supported = (_LINE_TO, _CURVE_TO, _MOVE_TO, _CLOSE_PATH, _ARC)
+        if not np.isin(opcodes, supported).all():
+            return None
+        if segments is None:
+            cumulative, starts = self._get_lut()
+        else:
+            cumulative, starts = self._build_lut(segments)
+        if len(cumulative) == 0:
+            raise PathError("The given path is empty")
+
+        elements = list(self._elements)
+        ex = np.array([el.x for el in elements])
+        ey = np.array([el.y for el in elements])
+        curves = [el if el.cmd == CURVETO else None for el in elements]
+        c1x = np.array([0.0 if el is None else el.ctrl1.x for el in curves])
+        c1y = np.array([0.0 if el is None else el.ctrl1.y for el in curves])
+        c2x = np.array([0.0 if el is None else el.ctrl2.x for el in curves])
+        c2y = np.array([0.0 if el is None else el.ctrl2.y for el in curves])
+
+        # Same steps as _locate, for every t.
+        t = start + d * np.arange(amount, dtype=float)
+        cumulative = np.frombuffer(cumulative, dtype=float)
+        starts = np.array(starts, dtype=np.intp)
+        last = len(cumulative) - 1
+        i = np.minimum(np.searchsorted(cumulative, t, side="left"), last)
+        contour = starts[np.searchsorted(starts, i, side="right") - 1]
+        before = np.where(i > 0, cumulative[i - 1], 0.0)
+        t = np.where(i > 0, t - before, t)
+        length = cumulative[i] - before
+        t = np.where(length != 0, t / np.where(length != 0, length, 1.0), t)
+        i = np.where((i == last) & (length == 0), i - 1, i)
+
+        # Same steps as point(), for every kind of element.
+        x0, y0 = ex[i], ey[i]
+        following = opcodes[i + 1]
+        x1 = np.where(following == _CLOSE_PATH, ex[contour], ex[i + 1])
+        y1 = np.where(following == _CLOSE_PATH, ey[contour], ey[i + 1])
+        line_x = x0 + t * (x1 - x0)
+        line_y = y0 + t * (y1 - y0)
+
+        mint = 1 - t
+        cx1, cy1, cx2, cy2 = c1x[i + 1], c1y[i + 1], c2x[i + 1], c2y[i + 1]
+        x01 = x0 * mint + cx1 * t
+        y01 = y0 * mint + cy1 * t
+        x12 = cx1 * mint + cx2 * t
+        y12 = cy1 * mint + cy2 * t
+        x23 = cx2 * mint + x1 * t
+        y23 = cy2 * mint + y1 * t
+        out_c1x = x01 * mint + x12 * t
+        out_c1y = y01 * mint + y12 * t
+        out_c2x = x12 * mint + x23 * t
+        out_c2y = y12 * mint + y23 * t
+        curve_x = out_c1x * mint + out_c2x * t
+        curve_y = out_c1y * mint + out_c2y * t
+
+        points = []
+        for k, opcode in enumerate(following.tolist()):
+            if opcode == _CURVE_TO:
+                points.append(
+                    PathElement(
+                        CURVETO,
+                        float(out_c1x[k]),
+                        float(out_c1y[k]),
+                        float(out_c2x[k]),
+                        float(out_c2y[k]),
+                        float(curve_x[k]),
+                        float(curve_y[k]),
+                    )
+                )
+            elif opcode == _ARC:
+                el = elements[i[k] + 1]
+                points.append(
+                    PathElement(ARC, el.x, el.y, el.radius, el.angle1, el.angle2)
+                )
+            else:
+                points.append(PathElement(LINETO, float(line_x[k]), float(line_y[k])))
+        return points
+
     def _linepoint(self, t, x0, y0, x1, y1):
         """Returns coordinates for point at t on the line.
         Calculates the coordinates of x and y for a point at t on a straight line.
@@ -737,35 +1310,22 @@ class BezierPath(Grob, ColorMixin):
         """
         Yields all elements as PathElements
         """
-        for index, el in enumerate(self._elements):
-            if isinstance(el, tuple):
-                el = PathElement(*el)
-                self._elements[index] = el
-            yield el
+        return iter(self._elements)
 
     def extend(self, pathelements):
         self._elements.extend(pathelements)
+        self._invalidate()
 
     def __getitem__(self, item):
         """
-        el is either a PathElement or the parameters to pass
-        to one.
-        If el is a PathElement return it
-        If el is parameters, create a PathElement and return it
+        Return the PathElement at item, or a list of them for a slice.
+
+        PathElements are created the first time they are accessed.
         """
-        if isinstance(item, slice):
-            indices = item.indices(len(self))
-            return [self.__getitem__(i) for i in range(*indices)]
-        else:
-            el = self._elements[item]
-            if isinstance(el, tuple):
-                el = PathElement(*el)
-                self._elements[item] = el
-            return el
+        return self._elements[item]
 
     def __iter__(self):
-        for index in range(len(self._elements)):
-            yield self.__getitem__(index)
+        return iter(self._elements)
 
     def __len__(self):
         return len(self._elements)
@@ -798,15 +1358,24 @@ class ClippingPath(BezierPath):
         def render(cairo_ctx):
             # Go to initial point (CORNER or CENTER):
             transform = self._call_transform_mode(self._transform)
-            cairo_ctx.set_matrix(transform)
 
             # Traverse the path
-            self._path._traverse(cairo_ctx)
+            self._path._append_to(cairo_ctx, transform)
             cairo_ctx.save()
             cairo_ctx.clip()
 
         return render
 
+    def draw(self):
+        self._canvas.draw_stats.add(
+            self, path_elements=len(self._path._elements), set_matrix=1
+        )
+        recorder = self._canvas.get_recorder()
+        if recorder is not None:
+            self._render_closure()(recorder)
+        else:
+            self._deferred_render(self._render_closure())
+
 
 class EndClip(Grob):
     def __init__(self, bot, **kwargs):
@@ -819,7 +1388,11 @@ class EndClip(Grob):
         return render
 
     def draw(self):
-        self._deferred_render(self._render_closure())
+        recorder = self._canvas.get_recorder()
+        if recorder is not None:
+            recorder.restore()
+        else:
+            self._deferred_render(self._render_closure())
 
 
 class CtrlPoint(object):
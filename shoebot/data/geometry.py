@@ -167,6 +167,107 @@ def point_in_polygon(points, x, y):
     return odd
 
 
+def winding_number(contours, x, y):
+    """Returns how many times the closed contours wind around the point (x,y).
+    Each contour is a flat sequence of x, y coordinates: [x0, y0, x1, y1, ...],
+    the point is inside with the nonzero fill rule if this is not 0,
+    and inside with the even-odd fill rule if it is odd.
+    """
+    winding = 0
+    for contour in contours:
+        n = len(contour)
+        x0, y0 = contour[n - 2], contour[n - 1]
+        for i in range(0, n, 2):
+            x1, y1 = contour[i], contour[i + 1]
+            if y0 <= y:
+                if y1 > y and (x1 - x0) * (y - y0) - (x - x0) * (y1 - y0) > 0:
+                    winding += 1
+            elif y1 <= y and (x1 - x0) * (y - y0) - (x - x0) * (y1 - y0) < 0:
+                winding -= 1
+            x0, y0 = x1, y1
+    return winding
+
+
+def winding_numbers(np, contours, x, y):
+    """Returns winding_number for each point in the numpy arrays x and y.
+    The crossing test of every edge runs on blocks of points at once,
+    blocks are kept small enough that a block by all edges stays in memory.
+    """
+    edges = [np.asarray(contour, dtype=float).reshape(-1, 2) for contour in contours]
+    edges = [edge for edge in edges if len(edge)]
+    winding = np.zeros(len(x), dtype=int)
+    if not edges:
+        return winding
+    x0, y0 = np.concatenate([np.roll(edge, 1, axis=0) for edge in edges]).T
+    x1, y1 = np.concatenate(edges).T
+    dx, dy = x1 - x0, y1 - y0
+    block = max(1, (1 << 20) // len(x0))
+    for start in range(0, len(x), block):
+        px = x[start : start + block, None]
+        py = y[start : start + block, None]
+        side = dx * (py - y0) - (px - x0) * dy
+        up = (y0 <= py) & (y1 > py) & (side > 0)
+        down = (y0 > py) & (y1 <= py) & (side < 0)
+        winding[start : start + block] = up.sum(axis=1) - down.sum(axis=1)
+    return winding
+
+
+# --- EXTENTS -----------------------------------------------------------------------------------------
+
+
+def curve_extrema(x0, y0, x1, y1, x2, y2, x3, y3):
+    """Returns the points where the cubic bezier spline turns back horizontally
+    or vertically, these and its end points are the extents of the spline.
+    The derivative of each coordinate is a quadratic, its roots between 0.0 and 1.0
+    are the times of the extrema.
+    """
+    points = []
+    for p0, p1, p2, p3 in ((x0, x1, x2, x3), (y0, y1, y2, y3)):
+        a = p3 - p0 + 3 * (p1 - p2)
+        b = 2 * (p0 - 2 * p1 + p2)
+        c = p1 - p0
+        if abs(a) < 1e-12:
+            roots = (-c / b,) if b else ()
+        else:
+            d = b * b - 4 * a * c
+            if d < 0:
+                continue
+            d = sqrt(d)
+            roots = ((-b + d) / (2 * a), (-b - d) / (2 * a))
+        for t in roots:
+            if 0 < t < 1:
+                mt = 1 - t
+                a0, a1, a2, a3 = mt**3, 3 * mt * mt * t, 3 * mt * t * t, t**3
+                points.append(
+                    (
+                        a0 * x0 + a1 * x1 + a2 * x2 + a3 * x3,
+                        a0 * y0 + a1 * y1 + a2 * y2 + a3 * y3,
+                    )
+                )
+    return points
+
+
+def arc_extrema(x, y, radius, angle1, angle2):
+    """Returns the start and end points of an arc, and its points at each quarter turn.
+    The arc goes clockwise from angle1 to angle2 (in radians), like cairo's arc,
+    so if angle2 is less than angle1 it is increased by 2*pi until it is not.
+    """
+    while angle2 < angle1:
+        angle2 += 2 * pi
+    points = [
+        (x + radius * cos(angle1), y + radius * sin(angle1)),
+        (x + radius * cos(angle2), y + radius * sin(angle2)),
+    ]
+    # Multiples of a quarter turn between the two angles.
+    quarter = int(angle1 // (pi / 2)) + 1
+    while quarter * pi / 2 < angle2 and len(points) < 6:
+        points.append(
+            (x + radius * cos(quarter * pi / 2), y + radius * sin(quarter * pi / 2))
+        )
+        quarter += 1
+    return points
+
+
 # =====================================================================================================
 
 # --- AFFINE TRANSFORM --------------------------------------------------------------------------------
@@ -51,6 +51,21 @@ class Grob:
         """Implementations must return the x, y of their center"""
         raise NotImplementedError()
 
+    def _get_extents(self):
+        """Implementations must return x1, y1, x2, y2 of their bounds,
+        disregarding transforms."""
+        raise NotImplementedError()
+
+    def _add_to_spatial_index(self):
+        """
+        Add this grob to the canvas spatial index, if it keeps one,
+        so it can be found by Canvas.picked and Canvas.query.
+        """
+        spatial_index = self._canvas.spatial_index
+        if spatial_index is not None:
+            transform = self._call_transform_mode(self._transform)
+            spatial_index.add(self, self._get_extents(), tuple(transform))
+
     def _call_transform_mode(self):
         """
         This should never get called:
@@ -1,35 +1,38 @@
 import array
 import os.path
+from functools import lru_cache
 from io import StringIO
 
-from shoebot.core.backend import cairo, driver, gi
+from shoebot.core.backend import cairo, driver
+from shoebot.core.surface_cache import ImageSurfaceCache, file_signature
 from shoebot.util import _copy_attrs
 
 from .basecolor import ColorMixin
 from .grob import Grob
 
-try:
-    gi.require_version("Rsvg", "2.0")
-    from gi.repository import Rsvg
-except ValueError:
-    Rsvg = None
 
+@lru_cache(maxsize=None)
+def get_rsvg():
+    """
+    Import Rsvg the first time an svg is loaded.
 
-CENTER = "center"
-CORNER = "corner"
+    :return: Rsvg module, or None if it is not available.
+    """
+    try:
+        return driver.gi_repository("Rsvg", "2.0")
+    except ValueError:
+        return None
 
 
-class SurfaceRef(object):
-    """ Cannot have a weakref to a cairo surface, so wrapper is used """
-
-    def __init__(self, surface):
-        self.surface = surface
+CENTER = "center"
+CORNER = "corner"
 
 
 class Image(Grob, ColorMixin):
-    _surface_cache = (
-        {}
-    )  # Did have a WeakValueDictionary here but this caused a memory leak of images every frame
+    # Surfaces decoded from files, shared by all bots.  Use this to limit
+    # memory used by images, e.g. Image.surface_cache.set_max_bytes(...),
+    # or keep an image loaded with Image.surface_cache.pin(path).
+    surface_cache = ImageSurfaceCache()
     _state_attributes = {
         "transform",
     }  # NBX uses transform and transformmode here
@@ -70,9 +73,9 @@ class Image(Grob, ColorMixin):
             # writing temp files (e.g. using nodebox's web library, see example 1 of the library)
             # if no data is passed the path is used to open a local file
             if self.data is None:
-                surfaceref = self._surface_cache.get(path)
-                if surfaceref:
-                    surface = surfaceref.surface
+                surface = self.surface_cache.get(path)
+                cached = surface is not None
+                if cached:
                     if isinstance(surface, cairo.RecordingSurface):
                         extents = surface.get_extents()
                         # extents has x, y which we dont use right now
@@ -81,8 +84,11 @@ class Image(Grob, ColorMixin):
                     else:
                         sw = surface.get_width()
                         sh = surface.get_height()
-                elif os.path.splitext(path)[1].lower() == ".svg" and Rsvg is not None:
-                    handle = Rsvg.Handle()
+                elif (
+                    os.path.splitext(path)[1].lower() == ".svg"
+                    and get_rsvg() is not None
+                ):
+                    handle = get_rsvg().Handle()
                     svg = handle.new_from_file(path)
                     dimensions = svg.get_dimensions()
                     sw = dimensions.width
@@ -112,7 +118,8 @@ class Image(Grob, ColorMixin):
                             bgra_array, cairo.FORMAT_ARGB32, sw, sh, sw * 4
                         )
 
-                self._surface_cache[path] = SurfaceRef(surface)
+                if not cached:
+                    self.surface_cache.put(path, surface)
             else:
                 from PIL import Image as PILImage
 
@@ -146,7 +153,9 @@ class Image(Grob, ColorMixin):
             self.height = height or sh
             self._surface = surface
 
-        self._deferred_render()
+        # Recording surfaces of svgs have no width or height of their own.
+        self._surface_size = sw, sh
+        self.draw()
 
     def _render(self, ctx):
         if self.width and self.height:
@@ -158,9 +167,50 @@ class Image(Grob, ColorMixin):
             ctx.set_source_surface(self._surface)
             ctx.paint()
 
+    def _render_key(self):
+        """
+        Identifies what _render draws, so unchanged images can be skipped.
+
+        :return: key of the image contents and placement, or None for
+                 surfaces passed as data, which the bot may draw into
+                 between frames.
+        """
+        if isinstance(self.data, cairo.ImageSurface):
+            return None
+        if self.data is None:
+            # The cached surface is loaded again when the file changes.
+            contents = self.path, file_signature(self.path)
+        else:
+            contents = self.data
+        return (
+            contents,
+            self.x,
+            self.y,
+            self.width,
+            self.height,
+            tuple(self._call_transform_mode(self._transform)),
+        )
+
     def draw(self):
+        if self.width and self.height:
+            self._canvas.draw_stats.add(
+                self,
+                image_paints=1,
+                image_pixels=int(self.width * self.height),
+                set_matrix=1,
+                set_source=1,
+            )
+            self._add_to_spatial_index()
+        else:
+            self._canvas.draw_stats.add(self)
         self._deferred_render()
 
+    def _get_extents(self):
+        """Returns the bounds of the image, disregarding transforms."""
+        # The transform is scaled to fit the surface in width and height.
+        sw, sh = self._surface_size
+        return self.x, self.y, self.x + sw, self.y + sh
+
     def _get_center(self):
         """Returns the center point of the path, disregarding transforms."""
         x = self.x + self.width / 2
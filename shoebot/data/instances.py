@@ -0,0 +1,314 @@
+from array import array
+from itertools import repeat
+from math import cos, isnan, nan, radians, sin, sqrt
+
+from shoebot.core.backend import cairo
+from shoebot.util import get_numpy
+
+from .basecolor import ColorMixin
+from .bezier import BLENDMODES, STROKE_CAPS, STROKE_JOINS
+from .grob import Grob
+
+# Stored in place of the color of instances without fill or stroke.
+_NO_COLOR = (nan, nan, nan, nan)
+
+
+class Instances(Grob, ColorMixin):
+    """
+    One BezierPath drawn many times, each instance with its own position,
+    rotation, scale, fill and stroke.
+
+    The instances are a single grob, rendered by one function that
+    appends the path, traversed once, under the transform of each instance.
+    """
+
+    def __init__(
+        self,
+        bot,
+        path,
+        xs,
+        ys,
+        angles=None,
+        scales=None,
+        fills=None,
+        strokes=None,
+        fill=None,
+        fillrule=None,
+        stroke=None,
+        strokewidth=0,
+        strokecap=None,
+        strokejoin=None,
+        strokedash=None,
+        dashoffset=None,
+        blendmode=None,
+    ):
+        """
+        :param path: BezierPath to draw, with its origin at each x, y.
+        :param xs: x coordinate of each instance.
+        :param ys: y coordinate of each instance.
+        :param angles: rotation of each instance, in degrees.
+        :param scales: scale of each instance.
+        :param fills: fill of each instance as a Color, rgba tuple or None,
+                      instead of fill.
+        :param strokes: stroke of each instance, instead of stroke.
+
+        Sequences of parameters can be lists, arrays or numpy arrays and
+        must all have the same length.
+        """
+        Grob.__init__(self, bot)
+        ColorMixin.__init__(
+            self,
+            fill=fill,
+            fillrule=fillrule,
+            stroke=stroke,
+            strokewidth=strokewidth,
+            strokecap=strokecap,
+            strokejoin=strokejoin,
+            strokedash=strokedash,
+            dashoffset=dashoffset,
+            blendmode=blendmode,
+        )
+        self._path = path
+        self._xs = array("d", xs)
+        self._ys = array("d", ys)
+        self._angles = None if angles is None else array("d", angles)
+        self._scales = None if scales is None else array("d", scales)
+        self._fills = None if fills is None else self._pack_colors(fills)
+        self._strokes = None if strokes is None else self._pack_colors(strokes)
+        count = len(self._xs)
+        for name in ("_ys", "_angles", "_scales", "_fills", "_strokes"):
+            values = getattr(self, name)
+            if values is None:
+                continue
+            length = len(values) // 4 if name in ("_fills", "_strokes") else len(values)
+            if length != count:
+                raise ValueError(f"{name[1:]} has {length} values, expected {count}")
+        # Set by draw, the path and attributes _render draws with.
+        self._render_state = None
+
+    @staticmethod
+    def _pack_colors(colors):
+        """
+        :return: array of the r, g, b, a of each color, None is stored as NaN.
+
+        Colors are Colors, sequences of r, g, b and optional alpha, or rows
+        of a numpy array, which is copied whole.
+        """
+        packed = array("d")
+        if getattr(colors, "ndim", None) == 2 and colors.dtype.kind in "fiu":
+            if colors.shape[1] not in (3, 4):
+                raise ValueError(
+                    f"colors have {colors.shape[1]} values, expected 3 or 4"
+                )
+            np = get_numpy()
+            rgba = np.ones((len(colors), 4))
+            rgba[:, : colors.shape[1]] = colors
+            packed.frombytes(rgba.tobytes())
+            return packed
+        for color in colors:
+            if color is None:
+                packed.extend(_NO_COLOR)
+            else:
+                color = tuple(color)
+                packed.extend(color if len(color) == 4 else color + (1.0,))
+        return packed
+
+    def _get_center(self):
+        """Returns the center of the instance positions, disregarding transforms."""
+        if not self._xs:
+            return 0.0, 0.0
+        return (
+            (min(self._xs) + max(self._xs)) / 2.0,
+            (min(self._ys) + max(self._ys)) / 2.0,
+        )
+
+    center = property(_get_center)
+
+    def _instance_transforms(self):
+        """
+        :return: iterator of x, y, angle in radians and scale of each instance.
+        """
+        count = len(self._xs)
+        angles = self._angles or repeat(0.0, count)
+        scales = self._scales or repeat(1.0, count)
+        for x, y, angle, scale in zip(self._xs, self._ys, angles, scales):
+            # Positive angles rotate counter-clockwise, as rotate() does.
+            yield x, y, -radians(angle), scale
+
+    def _get_extents(self):
+        """
+        Returns the bounds of all the instances, disregarding transforms.
+        """
+        path = self._render_state[0] if self._render_state else self._path
+        px1, py1, px2, py2 = path._get_bounds()
+        corners = ((px1, py1), (px2, py1), (px1, py2), (px2, py2))
+        xs = []
+        ys = []
+        for x, y, angle, scale in self._instance_transforms():
+            c, s = scale * cos(angle), scale * sin(angle)
+            for px, py in corners:
+                xs.append(x + c * px - s * py)
+                ys.append(y + s * px + c * py)
+        if not xs:
+            return 0.0, 0.0, 0.0, 0.0
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def contains(self, x, y):
+        """
+        Return True if the point x, y is inside any of the instances.
+        """
+        path = self._render_state[0] if self._render_state else self._path
+        for ix, iy, angle, scale in self._instance_transforms():
+            if not scale:
+                continue
+            # Undo the move, rotation and scale of the instance.
+            dx, dy = x - ix, y - iy
+            c, s = cos(angle) / scale, sin(angle) / scale
+            if path.contains(c * dx + s * dy, c * dy - s * dx):
+                return True
+        return False
+
+    def _get_path_matrix(self, transform):
+        """
+        :return: matrix to copy the cairo path under, scaled like the largest
+                 instance, as cairo keeps paths with a precision of 1/256
+                 of a device pixel.
+        """
+        xx, yx, xy, yy, x0, y0 = transform
+        scale = sqrt(abs(xx * yy - yx * xy))
+        if self._scales:
+            scale *= max(map(abs, self._scales))
+        if not scale:
+            scale = 1.0
+        return cairo.Matrix(scale, 0, 0, scale, 0, 0)
+
+    def _get_render_state(self):
+        """
+        :return: the path, as it is now, and draw attributes used by _render.
+        """
+        transform = self._call_transform_mode(self._transform)
+        return (
+            self._path.copy(),
+            transform,
+            self._get_path_matrix(transform),
+            None if self.fill is None else tuple(self.fill),
+            None if self.stroke is None else tuple(self.stroke),
+            self.fillrule,
+            self.strokewidth,
+            self.strokecap,
+            self.strokejoin,
+            None if self.strokedash is None else tuple(self.strokedash),
+            self.dashoffset,
+            self.blendmode,
+        )
+
+    def _render(self, cairo_ctx):
+        (
+            path,
+            transform,
+            path_matrix,
+            fill,
+            stroke,
+            fillrule,
+            strokewidth,
+            strokecap,
+            strokejoin,
+            strokedash,
+            dashoffset,
+            blendmode,
+        ) = self._render_state
+        cairo_path = path._copy_cairo_path(cairo_ctx, path_matrix)
+        identity = cairo.Matrix()
+        fills = self._fills
+        strokes = self._strokes
+
+        if blendmode:
+            cairo_ctx.set_operator(BLENDMODES[blendmode])
+        if fillrule:
+            cairo_ctx.set_fill_rule(fillrule)
+        cairo_ctx.set_line_width(strokewidth)
+        if strokedash:
+            cairo_ctx.set_dash(strokedash, dashoffset)
+        if strokecap:
+            cairo_ctx.set_line_cap(STROKE_CAPS[strokecap])
+        if strokejoin:
+            cairo_ctx.set_line_join(STROKE_JOINS[strokejoin])
+
+        for i, (x, y, angle, scale) in enumerate(self._instance_transforms()):
+            j = i * 4
+            has_fill = fill is not None if fills is None else not isnan(fills[j])
+            has_stroke = (
+                stroke is not None if strokes is None else not isnan(strokes[j])
+            )
+            if not scale or not (has_fill or has_stroke):
+                continue
+            cairo_ctx.set_matrix(transform)
+            cairo_ctx.translate(x, y)
+            cairo_ctx.rotate(angle)
+            cairo_ctx.scale(scale, scale)
+            cairo_ctx.append_path(cairo_path)
+            # Matrix affects stroke, so we need to reset it:
+            cairo_ctx.set_matrix(identity)
+            if has_fill:
+                if fills is None:
+                    cairo_ctx.set_source_rgba(*fill)
+                else:
+                    cairo_ctx.set_source_rgba(
+                        fills[j], fills[j + 1], fills[j + 2], fills[j + 3]
+                    )
+                if not has_stroke:
+                    cairo_ctx.fill()
+                else:
+                    cairo_ctx.fill_preserve()
+            if has_stroke:
+                if strokes is None:
+                    cairo_ctx.set_source_rgba(*stroke)
+                else:
+                    cairo_ctx.set_source_rgba(
+                        strokes[j], strokes[j + 1], strokes[j + 2], strokes[j + 3]
+                    )
+                cairo_ctx.stroke()
+
+        if blendmode:
+            # reset blend mode
+            cairo_ctx.set_operator(cairo.OPERATOR_OVER)
+
+    def _render_key(self):
+        """Identifies what _render draws, so unchanged instances can be skipped."""
+        path, transform, path_matrix, *attributes = self._render_state
+        arrays = (
+            path._elements.opcodes,
+            path._elements.floats,
+            self._xs,
+            self._ys,
+            self._angles,
+            self._scales,
+            self._fills,
+            self._strokes,
+        )
+        return (
+            tuple(None if values is None else values.tobytes() for values in arrays),
+            tuple(transform),
+            tuple(attributes),
+        )
+
+    def draw(self):
+        count = len(self._xs)
+        self._render_state = self._get_render_state()
+        self._canvas.draw_stats.add(
+            self,
+            path_elements=len(self._path) * count,
+            set_matrix=2 * count,
+            set_source=self._count_colors(self.fill, self._fills)
+            + self._count_colors(self.stroke, self._strokes),
+        )
+        self._add_to_spatial_index()
+        self._deferred_render()
+
+    def _count_colors(self, color, colors):
+        """
+        :return: number of instances drawn with color or colors.
+        """
+        if colors is None:
+            return 0 if color is None else len(self._xs)
+        return sum(1 for value in colors[::4] if not isnan(value))
@@ -27,53 +27,70 @@
 #   WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
 #   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
 #   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import gettext
 import sys
 from collections import namedtuple
 from enum import Enum
+from functools import lru_cache
 
 from cairo import PATH_CLOSE_PATH, PATH_CURVE_TO, PATH_LINE_TO, PATH_MOVE_TO
 
-from shoebot.core.backend import cairo, driver, gi
+from shoebot.core.backend import LazyImport, cairo, driver
 from shoebot.util import ShoebotInstallError, _copy_attrs
 
 from .basecolor import ColorMixin
 from .bezier import BezierPath
 from .grob import Grob
 
-try:
-    gi.require_version("Pango", "1.0")
-    gi.require_version("PangoCairo", "1.0")
-    from gi.repository import Pango, PangoCairo
-except ValueError as no_pango:
-    global Pango, PangoCairo
-
-    # workaround for readthedocs where Pango is not installed,
-    print(_("Pango not found - typography will not be available."), file=sys.stderr)
-
-    class FakePango(object):
-        class Weight(Enum):
-            # Weights copied from PangoWeight
-            THIN = 100
-            ULTRALIGHT = 200
-            LIGHT = 300
-            SEMILIGHT = 350
-            BOOK = 380
-            NORMAL = 400
-            MEDIUM = 500
-            SEMIBOLD = 600
-            BOLD = 700
-            ULTRABOLD = 800
-            HEAVY = 900
-            ULTRAHEAVY = 1000
-
-        def __getattr__(self, item):
-            if item == "Weight":
-                return FakePango.Weight
-
-            raise NotImplementedError("FakePango does not implement %s" % item)
-
-    Pango = FakePango()
-    PangoCairo = FakePango()
+# The text domain is bound in bezier.
+_ = gettext.gettext
+
+
+class FakePango(object):
+    """
+    Stands in for Pango when it is not installed, e.g. on readthedocs.
+    """
+
+    class Weight(Enum):
+        # Weights copied from PangoWeight
+        THIN = 100
+        ULTRALIGHT = 200
+        LIGHT = 300
+        SEMILIGHT = 350
+        BOOK = 380
+        NORMAL = 400
+        MEDIUM = 500
+        SEMIBOLD = 600
+        BOLD = 700
+        ULTRABOLD = 800
+        HEAVY = 900
+        ULTRAHEAVY = 1000
+
+    def __getattr__(self, item):
+        if item == "Weight":
+            return FakePango.Weight
+
+        raise NotImplementedError("FakePango does not implement %s" % item)
+
+
+@lru_cache(maxsize=None)
+def _import_pango(name):
+    """
+    Import Pango or PangoCairo, the first time text is used.
+    """
+    try:
+        return driver.gi_repository(name, "1.0")
+    except ValueError:
+        if name == "Pango":
+            print(
+                _("Pango not found - typography will not be available."),
+                file=sys.stderr,
+            )
+        return FakePango()
+
+
+Pango = LazyImport(lambda: _import_pango("Pango"))
+PangoCairo = LazyImport(lambda: _import_pango("PangoCairo"))
 
 
 # Pango Utility functions
@@ -190,6 +207,13 @@ class Text(Grob, ColorMixin):
         self._pre_render()
 
         if draw:
+            if self._fillcolor is None:
+                canvas.draw_stats.add(self)
+            else:
+                canvas.draw_stats.add(
+                    self, set_matrix=1, set_source=0 if outline else 1
+                )
+                self._add_to_spatial_index()
             # this way we do not render if we only need to create metrics
             if bool(ctx):
                 self._render(self._ctx)
@@ -226,6 +250,7 @@ class Text(Grob, ColorMixin):
 
         self._pangocairo_ctx = pangocairo_create_context(cr)
         self._pango_layout = PangoCairo.create_layout(cr)
+        self._canvas.draw_stats.count("pango_layouts")
         # layout line spacing
         # TODO: the behaviour is not the same as nodebox yet
         # self.layout.set_spacing(int(((self.lineheight-1)*self._fontsize)*Pango.SCALE)) #pango requires an int casting
@@ -289,6 +314,30 @@ class Text(Grob, ColorMixin):
         PangoCairo.show_layout(pycairo_ctx, self._pango_layout)
         PangoCairo.update_layout(pycairo_ctx, self._pango_layout)
 
+    def _render_key(self):
+        """Identifies what _render draws, so unchanged text can be skipped."""
+        return (
+            self.text,
+            self.font,
+            self.fontsize,
+            self.x,
+            self.y,
+            self.width,
+            self.height,
+            self.align,
+            self.lineheight,
+            self.indent,
+            self.outline,
+            self._prerendered,
+            repr(sorted(self.markup_vars.items())),
+            self.hintstyle,
+            self.hintmetrics,
+            self.antialias,
+            self.subpixelorder,
+            None if self._fillcolor is None else tuple(self._fillcolor),
+            tuple(self._call_transform_mode(self._transform)),
+        )
+
     # This version is probably more pangoesque, but the layout iterator
     # caused segfaults on some system
     @property
@@ -362,6 +411,11 @@ class Text(Grob, ColorMixin):
         del cairo_ctx
         return p
 
+    def _get_extents(self):
+        """Returns the bounds of the text, disregarding transforms."""
+        x, y, width, height = self.bounds
+        return x, y, x + width, y + height
+
     def _get_center(self):
         """Returns the center point of the path, disregarding transforms."""
         w, h = self._pango_layout.get_pixel_size()
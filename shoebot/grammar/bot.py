@@ -44,6 +44,7 @@ from shoebot.data import (
     Text,
     Variable,
     Image,
+    Instances,
     ClippingPath,
     NUMBER,
     TEXT,
@@ -287,6 +288,9 @@ class Bot(Grammar):
     def Image(self, *args, **kwargs):
         return self._makeColorableInstance(Image, args, kwargs)
 
+    def Instances(self, *args, **kwargs):
+        return self._makeColorableInstance(Instances, args, kwargs)
+
     def Text(self, *args, **kwargs):
         return self._makeColorableInstance(Text, args, kwargs)
 
@@ -488,6 +492,32 @@ class Bot(Grammar):
         else:
             return self._speed
 
+    def picked(self, x=None, y=None):
+        """Return the shapes drawn under a point in the last frame.
+
+        Shapes are indexed from the first call of picked() or query(),
+        in an animation they are found from the next frame on.
+
+        :param x: X coordinate, defaults to MOUSEX
+        :param y: Y coordinate, defaults to MOUSEY
+        :return: list of shapes, the topmost first
+        """
+        if x is None:
+            x = self._namespace.get("MOUSEX", self.MOUSEX)
+        if y is None:
+            y = self._namespace.get("MOUSEY", self.MOUSEY)
+        return self._canvas.picked(x, y)
+
+    def query(self, x, y, width, height):
+        """Return the shapes drawn in the last frame that overlap a rect.
+
+        Shapes are indexed from the first call of picked() or query(),
+        in an animation they are found from the next frame on.
+
+        :return: list of shapes, in the order they were drawn
+        """
+        return self._canvas.query(x, y, width, height)
+
     @property
     def FRAME(self):
         return self._frame
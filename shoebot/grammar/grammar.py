@@ -7,8 +7,10 @@ import sys
 import traceback
 from math import copysign
 from time import sleep, time
+from types import BuiltinFunctionType, FunctionType, MethodType
 
 from .livecode import LiveExecution
+from shoebot.core.profiler import no_timer
 from shoebot.core.events import (
     event_is,
     next_event,
@@ -41,6 +43,9 @@ class Grammar(object):
     run which is called to actually run the Bot.
     """
 
+    # Namespace template for each grammar class, see _namespace_template.
+    _namespace_templates = {}
+
     def __init__(self, canvas, namespace=None, vars=None):
         self._canvas = canvas
         self._dynamic = True  ##
@@ -71,20 +76,59 @@ class Grammar(object):
         self._namespace["FRAME"] = frame
         self._namespace["PAGENUM"] = frame
 
-    def _load_namespace(self, namespace, filename=None):
+    @classmethod
+    def _namespace_template(cls):
         """
-        Initialise bot namespace with info in shoebot.data
+        Work out once per class what goes in a bot namespace.
 
-        :param filename: Will be set to __file__ in the namespace
+        :return: (names, methods, properties) - dict of values that are the
+                 same for every bot, list of (name, function) to bind to the
+                 bot and list of property names to read from the bot.
         """
+        template = Grammar._namespace_templates.get(cls)
+        if template is not None:
+            return template
+
         from shoebot import data
 
-        for name in dir(data):
-            namespace[name] = getattr(data, name)
+        names = {name: getattr(data, name) for name in dir(data)}
+        methods = []
+        properties = []
+        for name in dir(cls):
+            if name[0] == "_":
+                continue
+            # Find the attribute without calling descriptors.
+            attr = next(
+                klass.__dict__[name] for klass in cls.__mro__ if name in klass.__dict__
+            )
+            if isinstance(attr, FunctionType):
+                methods.append((name, attr))
+            elif isinstance(
+                attr, (staticmethod, classmethod, MethodType, BuiltinFunctionType)
+            ) or not hasattr(type(attr), "__get__"):
+                names[name] = getattr(cls, name)
+            else:
+                # Properties and other descriptors depend on the bot.
+                properties.append(name)
+
+        template = Grammar._namespace_templates[cls] = names, methods, properties
+        return template
 
-        for name in dir(self):
+    def _load_namespace(self, namespace, filename=None):
+        """
+        Initialise bot namespace with info in shoebot.data
+
+        :param filename: Will be set to __file__ in the namespace
+        """
+        names, methods, properties = self._namespace_template()
+        namespace.update(names)
+        for name, function in methods:
+            namespace[name] = MethodType(function, self)
+        for name, value in self.__dict__.items():
             if name[0] != "_":
-                namespace[name] = getattr(self, name)
+                namespace[name] = value
+        for name in properties:
+            namespace[name] = getattr(self, name)
 
         namespace["_ctx"] = self  # Used in older nodebox scripts.
         namespace["__file__"] = filename
@@ -130,6 +174,10 @@ class Grammar(object):
             if max_iterations is None:
                 max_iterations = 1
 
+        profiler = self._canvas.profiler
+        timer = profiler.timer if profiler is not None else no_timer
+
+        rendering_finished = False
         try:
             # Iterations only increment, whereas FRAME can decrement if the user sets a negative speed.
             iteration = 0
@@ -156,9 +204,10 @@ class Grammar(object):
 
                     if first_run:
                         # Run code in the global namespace, followed by setup()
-                        executor.run()
-                        if "setup" in executor.ns:
-                            executor.ns["setup"]()
+                        with timer(self._frame, "setup"):
+                            executor.run()
+                            if "setup" in executor.ns:
+                                executor.ns["setup"]()
 
                         if "draw" in executor.ns:
                             if self._speed is None:
@@ -171,11 +220,13 @@ class Grammar(object):
                     is_animation = "draw" in executor.ns
                     if is_animation and self._speed != 0:
                         # If speed is 0, then don't output anything..
-                        executor.ns["draw"]()
+                        with timer(self._frame, "draw"):
+                            executor.ns["draw"]()
                         canvas_dirty = True
 
                 if canvas_dirty:
-                    self._canvas.flush(self._frame)
+                    with timer(self._frame, "flush"):
+                        self._canvas.flush(self._frame)
 
                 if frame_limiter:
                     # Frame limiting is only used when running the GUI.
@@ -196,12 +247,15 @@ class Grammar(object):
 
                 # Handle events
                 continue_running, first_run = self._handle_events(
-                    iteration, is_animation, next_frame_due
+                    iteration, is_animation, next_frame_due, timer
                 )
                 if not continue_running:
                     # Event handler returns False if it receives a message to quit.
                     break
 
+            # Wait for any frames still rendering on the pipeline thread.
+            rendering_finished = True
+            self._canvas.finish_rendering()
             # Main loop has finished, return True to indicate it exited normally.
             return True
         except Exception as e:
@@ -216,8 +270,18 @@ class Grammar(object):
                 errmsg = simple_traceback(e, executor.known_good or "")
             sys.stderr.write(f"{errmsg}\n")
             return False
-
-    def _handle_events(self, iteration, is_animation, next_frame_due):
+        finally:
+            if not rendering_finished:
+                # Output the frames drawn before the error and close the sink.
+                try:
+                    self._canvas.finish_rendering()
+                except Exception:
+                    # The error that stopped the bot has been reported.
+                    pass
+            if profiler is not None:
+                profiler.finish()
+
+    def _handle_events(self, iteration, is_animation, next_frame_due, timer=no_timer):
         """
         The Shoebot mainloop, GUI and shell communicate with each other using events.
 
@@ -227,6 +291,8 @@ class Grammar(object):
         This handler waits for events and updates where needed, the loop also
         serves handles the delay between frames for animated bots.
 
+        Time spent waiting for events is timed as "idle", handling them as "events".
+
         return: continue_running, restart
         """
 
@@ -235,47 +301,50 @@ class Grammar(object):
         # Quit
         # Continue running.
 
+        frame = self._frame
         restart_bot = False
         while True:
             timeout = min(next_frame_due - time(), 0.1)
-            event = next_event(
-                block=timeout > 0, timeout=timeout if timeout > 0 else None
-            )
-            # Update GUI, which may in-turn generate new events.
-            self._canvas.sink.main_iteration()
-
-            if event is not None:
-                if event.type == QUIT_EVENT:
-                    # The user chose to quit via the shell or GUI.
-                    return False, False
-                elif event.type == REDRAW_EVENT:
-                    # The GUI needs redrawing (usually because the Window was resized)
-                    # TODO: This is a hack/workaround, since the graphics backend doesn't currently support redrawing
-                    if not is_animation:
-                        return True, True
-                elif event.type == SET_WINDOW_TITLE_EVENT:
-                    # A new window title was specified in the shell
-                    self._canvas.sink.set_title(event.data)
-                elif event.type == SOURCE_CHANGED_EVENT:
-                    # New source code was loaded from the shell.
-                    # Debounce SOURCE_CHANGED events -
-                    # Gedit generates two events for changing a single character -
-                    # delete and then add
-                    while event and event.type == SOURCE_CHANGED_EVENT:
-                        # TODO, can this be handled differently (non-blocking or just ignore source that is the same?)
-                        event = next_event(block=True, timeout=0.001)
-                    if not is_animation:
-                        return True, True
-                elif event.type == VARIABLE_CHANGED_EVENT:
-                    # A Variable was changed, from the shell or the GUI.
-                    # TODO, make VARIABLE_ADDED_EVENT, VARIABLE_DELETED_EVENT
-                    # TODO, sketched out, fix up properly.
-                    self._executor.ns[event.data.name] = event.data.value
-                    # TODO: State was updated, bot needs to execute again ???
-                    if not is_animation:
-                        # On non-animated bots, updating variables re-runs the whole
-                        # whole bot so that the user may see the updated state.
-                        return True, True
+            with timer(frame, "idle"):
+                event = next_event(
+                    block=timeout > 0, timeout=timeout if timeout > 0 else None
+                )
+            with timer(frame, "events"):
+                # Update GUI, which may in-turn generate new events.
+                self._canvas.sink.main_iteration()
+
+                if event is not None:
+                    if event.type == QUIT_EVENT:
+                        # The user chose to quit via the shell or GUI.
+                        return False, False
+                    elif event.type == REDRAW_EVENT:
+                        # The GUI needs redrawing (usually because the Window was resized)
+                        # TODO: This is a hack/workaround, since the graphics backend doesn't currently support redrawing
+                        if not is_animation:
+                            return True, True
+                    elif event.type == SET_WINDOW_TITLE_EVENT:
+                        # A new window title was specified in the shell
+                        self._canvas.sink.set_title(event.data)
+                    elif event.type == SOURCE_CHANGED_EVENT:
+                        # New source code was loaded from the shell.
+                        # Debounce SOURCE_CHANGED events -
+                        # Gedit generates two events for changing a single character -
+                        # delete and then add
+                        while event and event.type == SOURCE_CHANGED_EVENT:
+                            # TODO, can this be handled differently (non-blocking or just ignore source that is the same?)
+                            event = next_event(block=True, timeout=0.001)
+                        if not is_animation:
+                            return True, True
+                    elif event.type == VARIABLE_CHANGED_EVENT:
+                        # A Variable was changed, from the shell or the GUI.
+                        # TODO, make VARIABLE_ADDED_EVENT, VARIABLE_DELETED_EVENT
+                        # TODO, sketched out, fix up properly.
+                        self._executor.ns[event.data.name] = event.data.value
+                        # TODO: State was updated, bot needs to execute again ???
+                        if not is_animation:
+                            # On non-animated bots, updating variables re-runs the whole
+                            # whole bot so that the user may see the updated state.
+                            return True, True
 
             if time() >= next_frame_due:
                 break
@@ -300,6 +369,7 @@ class Grammar(object):
         ## TODO: Not used when running as a bot, possibly should not be available in
         ## this case
         self._canvas.flush(self._frame)
+        self._canvas.finish_rendering()
 
     #### Variables
     def _addvar(self, v):
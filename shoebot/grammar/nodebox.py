@@ -8,6 +8,7 @@ from shoebot.util.fonts import list_pango_fonts
 from .bot import Bot
 from shoebot.data import (
     geometry,
+    Color,
     Point,
     BezierPath,
     Image,
@@ -426,6 +427,66 @@ class NodeBot(Bot):
                 p.addpoint(point)
             p.draw()
 
+    def instances(
+        self,
+        path,
+        xs,
+        ys,
+        angles=None,
+        scales=None,
+        fills=None,
+        strokes=None,
+        draw=True,
+        **kwargs,
+    ):
+        """Draw a path many times, such as the particles of a particle system.
+
+        Each instance is drawn with the path's origin at x, y, and can be
+        rotated, scaled and colored on its own, this is much faster than
+        drawing a copy of the path for each one.
+
+        :param path: BezierPath to draw
+        :param xs: x-coordinate of each instance
+        :param ys: y-coordinate of each instance
+        :param angles: rotation of each instance in degrees
+        :param scales: scale of each instance
+        :param fills: fill color of each instance, or None for no fill
+        :param strokes: stroke color of each instance, or None for no stroke
+        :param boolean draw: whether to draw the instances on the canvas or not
+        :return: Instances grob
+
+        Sequences can be lists or numpy arrays of the same length, without
+        fills or strokes the current fill and stroke colors are used.
+        Colors given as numbers, such as the rows of an N x 3 or N x 4 numpy
+        array, are r, g, b and optional alpha between 0 and 1, other colors
+        follow the current color mode and range.
+        """
+        fills = self._instance_colors(fills)
+        strokes = self._instance_colors(strokes)
+        instances = self.Instances(
+            path,
+            xs,
+            ys,
+            angles=angles,
+            scales=scales,
+            fills=fills,
+            strokes=strokes,
+            **kwargs,
+        )
+        if draw:
+            instances.draw()
+        return instances
+
+    def _instance_colors(self, colors):
+        """
+        :return: colors with strings and Colors made into Colors in the current
+                 color mode, numbers and numpy arrays are left to be packed
+                 as they are.
+        """
+        if colors is None or getattr(colors, "ndim", 1) != 1:
+            return colors
+        return [self.color(c) if isinstance(c, (str, Color)) else c for c in colors]
+
     def drawimage(self, image, x=None, y=None):
         """
         :param image: Image to draw
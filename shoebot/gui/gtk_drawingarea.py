@@ -1,5 +1,6 @@
 import os
-from math import radians
+import threading
+from math import ceil, floor, radians
 
 from pkg_resources import resource_filename, Requirement
 
@@ -8,9 +9,9 @@ from shoebot.core.events import REDRAW_EVENT, publish_event
 from shoebot.sbio.socket_server import SocketServer
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk
+from gi.repository import GLib, Gtk
 
-pycairo = driver.cairo
+pycairo = driver.pycairo
 
 ICON_FILE = resource_filename(
     Requirement.parse("shoebot"), "share/pixmaps/shoebot-ide.png"
@@ -54,6 +55,10 @@ class ShoebotWidget(Gtk.DrawingArea, SocketServer):
         self.bot_size = None
         self.frame = -1
         self.backing_store = BackingStore.get_backingstore(1, 1)
+        # Frames may be rendered on a RenderPipeline thread, GTK calls must
+        # happen on this thread and the backing store is shared with draw.
+        self._gtk_thread = threading.current_thread()
+        self._backing_store_lock = threading.Lock()
 
     def draw_default_image(self, cr):
         if os.path.isfile(ICON_FILE):
@@ -119,9 +124,10 @@ class ShoebotWidget(Gtk.DrawingArea, SocketServer):
 
         cr = driver.ensure_pycairo_context(cr)
 
-        surface = self.backing_store.surface
-        cr.set_source_surface(surface)
-        cr.paint()
+        with self._backing_store_lock:
+            surface = self.backing_store.surface
+            cr.set_source_surface(surface)
+            cr.paint()
 
     def create_rcontext(self, size, frame):
         """
@@ -139,7 +145,35 @@ class ShoebotWidget(Gtk.DrawingArea, SocketServer):
         self._ctx = ctx
         return ctx
 
-    def do_drawing(self, size, frame, cairo_ctx):
+    def _gtk_call(self, func, *args):
+        """
+        Call a GTK function, deferring it to the GTK thread if needed.
+        """
+        if threading.current_thread() is self._gtk_thread:
+            func(*args)
+        else:
+            GLib.idle_add(func, *args)
+
+    @staticmethod
+    def _device_rects(cr, damage):
+        """
+        :param damage: list of (x1, y1, x2, y2) in bot coordinates.
+        :return: list of (x, y, width, height) covering damage in the
+                 device (widget) coordinates of cr, rounded out to pixels.
+        """
+        rects = []
+        for x1, y1, x2, y2 in damage:
+            corners = [
+                cr.user_to_device(x, y)
+                for x, y in ((x1, y1), (x2, y1), (x1, y2), (x2, y2))
+            ]
+            xs = [x for x, _ in corners]
+            ys = [y for _, y in corners]
+            x, y = floor(min(xs)), floor(min(ys))
+            rects.append((x, y, ceil(max(xs)) - x, ceil(max(ys)) - y))
+        return rects
+
+    def do_drawing(self, size, frame, cairo_ctx, damage=None):
         """
         Update the backing store from a cairo context and
         schedule a REDRAW_EVENT (expose event)
@@ -147,21 +181,49 @@ class ShoebotWidget(Gtk.DrawingArea, SocketServer):
         :param size: width, height in pixels of bot
         :param frame: frame # thar was drawn
         :param cairo_ctx: cairo context the bot was drawn on
+        :param damage: list of (x1, y1, x2, y2) areas of the bot that changed
+                       since the last frame, or None if everything changed.
         """
         if self.get_window() and not self.bot_size:
             # Get initial size for window
-            self.set_size_request(*size)
+            self._gtk_call(self.set_size_request, *size)
 
+        if size != self.bot_size:
+            damage = None
         self.bot_size = size
-        self.backing_store = BackingStore.get_backingstore(self.width, self.height)
-
-        cr = pycairo.Context(self.backing_store.surface)
-        if self.scale_fit:
-            self.scale_context_and_center(cr)
-
-        cairo_ctx = driver.ensure_pycairo_context(cairo_ctx)
-        cr.set_source_surface(cairo_ctx.get_target())
-        # Create the cairo context
-        cr.set_operator(cairo.OPERATOR_SOURCE)
-        cr.paint()
-        self.queue_draw()
+        with self._backing_store_lock:
+            backing_store = BackingStore.get_backingstore(self.width, self.height)
+            if backing_store is not self.backing_store:
+                # New backing store, everything needs painting.
+                damage = None
+            self.backing_store = backing_store
+            if damage is not None and not damage:
+                # Nothing changed.
+                return
+
+            cr = pycairo.Context(self.backing_store.surface)
+            if self.scale_fit:
+                self.scale_context_and_center(cr)
+
+            if damage is not None:
+                # Only copy the changed pixels, clipping to whole pixels
+                # so the edges are not blended.
+                device_rects = self._device_rects(cr, damage)
+                matrix = cr.get_matrix()
+                cr.identity_matrix()
+                for rect in device_rects:
+                    cr.rectangle(*rect)
+                cr.clip()
+                cr.set_matrix(matrix)
+
+            cairo_ctx = driver.ensure_pycairo_context(cairo_ctx)
+            cr.set_source_surface(cairo_ctx.get_target())
+            # Create the cairo context
+            cr.set_operator(cairo.OPERATOR_SOURCE)
+            cr.paint()
+
+        if damage is None:
+            self._gtk_call(self.queue_draw)
+        else:
+            for rect in device_rects:
+                self._gtk_call(self.queue_draw_area, *rect)
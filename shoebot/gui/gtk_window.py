@@ -2,7 +2,7 @@ import os
 import sys
 
 from pathlib import Path
-from shoebot.core.backend import gi
+from shoebot.core.backend import cairo, gi
 from shoebot.core.events import (
     publish_event,
     QUIT_EVENT,
@@ -14,7 +14,7 @@ from gi.repository import Gdk, Gtk
 from pkg_resources import resource_filename, Requirement
 
 from shoebot.gui import ShoebotWidget, VarWindow
-from shoebot.core import DrawQueueSink
+from shoebot.core import DrawQueueSink, RetainedDrawQueue
 from .gtk_input_device import GtkInputDeviceMixin
 
 import locale
@@ -175,6 +175,7 @@ class ShoebotWindow(Gtk.Window, GtkInputDeviceMixin, DrawQueueSink):
         self.present()
 
         self.pending_snapshots = []  # list of filenames to save after rendering.
+        self._drawqueue = None  # drawqueue of the frame being rendered.
         if outputfile:
             # The test harness uses this to get the gui to output an image, otherwise it may not make much sense
             # to have an output file with a GUI window ?
@@ -195,8 +196,11 @@ class ShoebotWindow(Gtk.Window, GtkInputDeviceMixin, DrawQueueSink):
             super(ShoebotWindow, self).gtk_mouse_button_down(widget, event)
 
     def render(self, size, frame, drawqueue):
+        self._drawqueue = drawqueue
         cairo_ctx = super(self.__class__, self).render(size, frame, drawqueue)
-        self.sb_widget.do_drawing(size, frame, cairo_ctx)
+        # RetainedDrawQueue knows which areas changed since the last frame.
+        damage = getattr(drawqueue, "damage", None)
+        self.sb_widget.do_drawing(size, frame, cairo_ctx, damage=damage)
 
     def rendering_finished(self, size, frame, r_context):
         """
@@ -209,12 +213,20 @@ class ShoebotWindow(Gtk.Window, GtkInputDeviceMixin, DrawQueueSink):
         canvas = self.bot.canvas
 
         pending_snapshots = self.pending_snapshots
+        snapshot_context = r_context
+        if pending_snapshots and isinstance(self._drawqueue, RetainedDrawQueue):
+            # Retained frames are painted from an image, replay the drawing
+            # commands so snapshots in vector formats stay vector.
+            snapshot_context = cairo.Context(
+                cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA, (0, 0, *size))
+            )
+            self._drawqueue.render_commands(snapshot_context)
         for filename in pending_snapshots:
             # TODO, show filename in the GUI.
             print(f"Save snapshot: {filename}", file=sys.stderr)
             # TODO - remove many of these closures.
             f = canvas.output_closure(filename)
-            f(r_context)
+            f(snapshot_context)
 
         super().rendering_finished(size, frame, r_context)
         self.pending_snapshots = []
@@ -37,7 +37,17 @@ import sys
 
 DEFAULT_SERVERPORT = 7777
 
-OUTPUT_EXTENSIONS = (".png", ".svg", ".ps", ".pdf")
+OUTPUT_EXTENSIONS = (
+    ".png",
+    ".svg",
+    ".ps",
+    ".pdf",
+    ".mp4",
+    ".mov",
+    ".mkv",
+    ".webm",
+    ".gif",
+)
 APP = "shoebot"
 DIR = sys.prefix + "/share/shoebot/locale"
 
@@ -92,10 +102,37 @@ def main():
         "--outputfile",
         dest="outputfile",
         help=_(
-            "run script and output to image file (accepts .png .svg .pdf and .ps extensions)"
+            "run script and output to image file (accepts .png .svg .pdf and .ps extensions) or video file (.mp4 .mov .mkv .webm .gif, needs ffmpeg)"
         ),
         metavar="FILE",
     )
+    group.add_argument(
+        "--tile-size",
+        type=int,
+        dest="tile_size",
+        default=None,
+        help=_(
+            "render png output in tiles of N pixels using --jobs threads, for very large images"
+        ),
+        metavar="N",
+    )
+    group.add_argument(
+        "--png-writers",
+        type=int,
+        dest="png_writers",
+        default=0,
+        help=_("encode and write png files on N background threads"),
+        metavar="N",
+    )
+    group.add_argument(
+        "--png-compression",
+        type=int,
+        dest="png_compression",
+        default=None,
+        choices=range(10),
+        help=_("zlib compression level of png files, 0 (fastest) to 9 (smallest)"),
+        metavar="LEVEL",
+    )
 
     # Shoebot IO - Sockets
     group.add_argument(
@@ -161,6 +198,27 @@ def main():
         default=False,
         help=_("set number of iteration, multiple images will be produced"),
     )
+    group.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        dest="jobs",
+        default=None,
+        help=_(
+            "render frames in N processes, use with -r and -o for bots that only depend on FRAME"
+        ),
+    )
+
+    group.add_argument(
+        "--pipeline",
+        type=int,
+        dest="pipeline_depth",
+        default=0,
+        help=_(
+            "render frames on a separate thread while the bot runs, with up to N frames queued"
+        ),
+        metavar="N",
+    )
 
     group = parser.add_argument_group("Window Management")
     group.add_argument(
@@ -219,6 +277,24 @@ def main():
         default=sys.platform == "darwin",
         help=_("disable running bot code in background thread (default on OSX)."),
     )
+    group.add_argument(
+        "--profile",
+        dest="profile",
+        metavar="REPORT",
+        help=_(
+            "time each stage of every frame and write the timings "
+            "to REPORT as JSON, a summary is printed on exit."
+        ),
+    )
+    group.add_argument(
+        "--render-server",
+        dest="render_server",
+        metavar="SOCKET",
+        help=_(
+            "run a headless render server on a unix socket, "
+            "see shoebot.sbio.render_server for the protocol."
+        ),
+    )
     group.add_argument(
         "-V",
         "--verbose",
@@ -237,6 +313,15 @@ def main():
         diagnose()
         sys.exit()
 
+    if args.render_server:
+        from shoebot.sbio.render_server import serve
+
+        try:
+            serve(args.render_server)
+        except KeyboardInterrupt:
+            pass
+        sys.exit()
+
     if not args.script:
         error(
             _(
@@ -254,6 +339,18 @@ def main():
     else:
         namespace = None
 
+    if args.jobs is not None and args.jobs < 1:
+        error(_("--jobs must be at least 1"))
+
+    if args.tile_size is not None:
+        if args.tile_size < 1:
+            error(_("--tile-size must be at least 1"))
+        if not (args.outputfile or "").lower().endswith(".png"):
+            error(_("--tile-size can only be used with png output"))
+
+    if args.pipeline_depth < 0:
+        error(_("--pipeline must be at least 0"))
+
     if args.window:
         window = args.window
     else:
@@ -278,6 +375,12 @@ def main():
         args=shlex.split(args.script_args or ""),
         verbose=args.verbose,
         background_thread=not args.disable_background_thread,
+        jobs=args.jobs,
+        tile_size=args.tile_size,
+        pipeline_depth=args.pipeline_depth,
+        png_writers=args.png_writers,
+        png_compression=args.png_compression,
+        profile=args.profile,
     )
 
     # Return errorcode
@@ -12,6 +12,12 @@ socketserver  similar to 'shell' but for remote connections, allows changing man
               would be a massive security hole!
 
               socketserver is activated by passing -s and optionally --port
+
+render_server headless server that renders bots to png, svg, pdf or ps on
+              request over a local unix socket, keeping bots warm between
+              requests.
+
+              render_server is activated by passing --render-server SOCKET
 """
 # NOTE - Called 'sbio' not 'io', since calling a module 'io' can break
 #        the stdlib and ability to install things with pip :/
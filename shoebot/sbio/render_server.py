@@ -0,0 +1,262 @@
+"""
+Headless render server, renders bots on request over a local socket.
+
+Starting Python, importing cairo and GI, loading the bot namespace and
+running setup() costs much more than rendering a small image.  The
+server pays these once, then keeps a warm bot per script so a request
+only runs the bot code and renders.
+
+$ sbot --render-server /tmp/shoebot.sock &
+
+Requests and responses are a line of JSON, a response is followed by
+"length" bytes of image data:
+
+    {"script": "examples/basic/primitives.bot", "vars": {"size": 20},
+     "size": [200, 200], "format": "png"}
+    {"ok": true, "format": "png", "length": 5203}
+
+Instead of "script" a request can pass the code as "source", "frame"
+sets FRAME for animated bots.  On errors "ok" is false and "error"
+holds the traceback, with a length of 0.
+
+Warm bots of animated scripts keep their namespace after setup(), so
+each request renders like the next frame of a single run.
+"""
+import hashlib
+import io
+import json
+import os
+import socket
+import socketserver
+import traceback
+from collections import OrderedDict
+
+from shoebot.core import CairoCanvas, CairoImageSink
+from shoebot.data import Variable
+from shoebot.grammar import NodeBot
+
+DEFAULT_MAX_BOTS = 16
+FORMATS = ("png", "svg", "pdf", "ps")
+
+
+class WarmBot(object):
+    """
+    Bot kept ready to render the same script again.
+    """
+
+    def __init__(self, source, filename):
+        self.code = compile(f"{source}\n\n", filename, "exec")
+        self.filename = filename
+        # One sink per format, kept so their surface pools are reused.
+        self.sinks = {"png": CairoImageSink(format="png", buff=io.BytesIO())}
+        canvas = CairoCanvas(self.sinks["png"])
+        self.bot = NodeBot(canvas)
+        self.bot._load_namespace(self.bot._namespace, filename)
+        # Scripts run from scratch start from a copy of this namespace,
+        # so globals from one render don't leak into the next.
+        self.initial_namespace = dict(self.bot._namespace)
+        self.animated = None  # Known after the first render.
+        self.var_defaults = {}
+
+    def _get_sink(self, format, buff=None, outputfile=None):
+        """
+        :return: CairoImageSink for format, set to output to buff or outputfile.
+        """
+        if outputfile:
+            format = os.path.splitext(outputfile)[1][1:].lower()
+        sink = self.sinks.get(format)
+        if sink is None:
+            sink = self.sinks[format] = CairoImageSink(format=format, buff=buff)
+            sink.set_bot(self.bot)
+        sink.buff = buff
+        sink.filename = outputfile
+        return sink
+
+    def _apply_vars(self, vars):
+        """
+        Set variables from vars, other variables revert to their default.
+        """
+        bot = self.bot
+        values = dict(self.var_defaults)
+        values.update(vars)
+        for name, value in values.items():
+            variable = bot._vars.get(name)
+            if isinstance(variable, Variable):
+                # var() keeps the value of a Variable it already knows.
+                variable.value = value
+            else:
+                # Picked up by var() when the code runs, like sbot --vars.
+                bot._vars[name] = value
+            bot._namespace[name] = value
+
+    def render(
+        self,
+        format="png",
+        size=None,
+        vars=None,
+        frame=None,
+        outputfile=None,
+        restart=False,
+    ):
+        """
+        :param outputfile: Filename to output to, instead of returning image data.
+        :param restart: If True, animated bots run setup() again as if this was
+                        their first frame.
+        :return: image data of the rendered bot, or outputfile if set.
+        """
+        bot = self.bot
+        canvas = bot._canvas
+        ns = bot._namespace
+
+        if restart:
+            self.animated = None
+        if outputfile:
+            buff = None
+            canvas.sink = self._get_sink(format, outputfile=outputfile)
+        else:
+            buff = io.BytesIO()
+            canvas.sink = self._get_sink(format, buff=buff)
+
+        if frame is not None:
+            bot._frame = frame
+            bot._update_animation_variables(frame, frame)
+
+        if not self.animated:
+            # Run the script from scratch, using the cached code and namespace.
+            ns.clear()
+            ns.update(self.initial_namespace)
+            ns.pop("WIDTH", None)
+            ns.pop("HEIGHT", None)
+            canvas.size = None
+            bot._set_initial_defaults()
+        if size:
+            canvas.size = None
+            bot.size(*size)
+        self._apply_vars(vars or {})
+        canvas.reset_canvas()
+
+        if not self.animated:
+            exec(self.code, ns)
+            if self.animated is None:
+                if "setup" in ns:
+                    ns["setup"]()
+                self.animated = "draw" in ns
+                self.var_defaults = {
+                    name: variable.default
+                    for name, variable in bot._vars.items()
+                    if isinstance(variable, Variable)
+                }
+                if self.animated:
+                    # setup() may have drawn, only draw() output is rendered.
+                    canvas.reset_canvas()
+                    self._apply_vars(vars or {})
+        if self.animated:
+            ns["draw"]()
+
+        canvas.flush(bot._frame)
+        canvas.finish_rendering()
+        if buff is None:
+            return outputfile
+        return buff.getvalue()
+
+
+class RenderServer(socketserver.UnixStreamServer):
+    """
+    Unix socket server that keeps up to max_bots warm bots, the least
+    recently used bot is dropped when another is needed.
+
+    Requests are handled one at a time, as bots share global state.
+    """
+
+    def __init__(self, path, max_bots=DEFAULT_MAX_BOTS):
+        if os.path.exists(path):
+            os.unlink(path)
+        socketserver.UnixStreamServer.__init__(self, path, RenderRequestHandler)
+        self.max_bots = max_bots
+        self.bots = OrderedDict()
+
+    def get_bot(self, source, filename):
+        """
+        :return: WarmBot for source, from the cache if possible.
+        """
+        key = hashlib.sha256(source.encode("utf-8")).hexdigest(), filename
+        bot = self.bots.pop(key, None)
+        if bot is None:
+            bot = WarmBot(source, filename)
+        self.bots[key] = bot
+        while len(self.bots) > self.max_bots:
+            self.bots.popitem(last=False)
+        return bot
+
+    def render(self, request):
+        """
+        :param request: dict, see the module docstring.
+        :return: image data
+        """
+        format = request.get("format", "png")
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported format {format}")
+        if "source" in request:
+            source = request["source"]
+            filename = "<string>"
+        else:
+            filename = request["script"]
+            with open(filename) as f:
+                source = f.read()
+
+        bot = self.get_bot(source, filename)
+        try:
+            return bot.render(
+                format=format,
+                size=request.get("size"),
+                vars=request.get("vars"),
+                frame=request.get("frame"),
+            )
+        except Exception:
+            # State of the bot is unknown after an error.
+            self.bots.pop(next(reversed(self.bots)), None)
+            raise
+
+
+class RenderRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                data = self.server.render(json.loads(line))
+                response = {"ok": True, "length": len(data)}
+            except Exception:
+                data = b""
+                response = {"ok": False, "length": 0, "error": traceback.format_exc()}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.write(data)
+            self.wfile.flush()
+
+
+def serve(path, max_bots=DEFAULT_MAX_BOTS):
+    """
+    Run a render server on a unix socket at path until interrupted.
+    """
+    with RenderServer(path, max_bots=max_bots) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+def render(path, **request):
+    """
+    Send a render request to the server at path.
+
+    :return: image data
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        f = sock.makefile("rwb")
+        f.write(json.dumps(request).encode("utf-8") + b"\n")
+        f.flush()
+        response = json.loads(f.readline())
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return f.read(response["length"])
@@ -41,6 +41,7 @@ Type 'help' to list all the available commands.
 from __future__ import print_function
 import base64
 import cmd
+import json
 import shlex
 
 from shoebot.core.events import (
@@ -284,6 +285,13 @@ class ShoebotCmd(cmd.Cmd):
         else:
             self.print_response("No vars")
 
+    def do_stats(self, line):
+        """
+        Show counts of the grobs drawn in the last frame and the work
+        needed to render them.
+        """
+        self.print_response(json.dumps(self.bot._canvas.stats()))
+
     @trusted_cmd
     def do_load_base64(self, line):
         """
@@ -18,11 +18,13 @@ import sys
 import socket
 import gettext
 
-from shoebot.core.backend import gi
+from shoebot.core.backend import LazyImport, driver
 
-from gi.repository import GObject
 from .shell import ShoebotCmd
 
+# Imported when the server starts, so importing shoebot.sbio stays fast.
+GObject = LazyImport(lambda: driver.gi_repository("GObject", "2.0"))
+
 APP = "shoebot"
 DIR = sys.prefix + "/share/shoebot/locale"
 locale.setlocale(locale.LC_ALL, "")
@@ -28,6 +28,7 @@
 #   OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
 #   ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """Assorted utility functions, mainly for color and font handling"""
+from functools import lru_cache
 
 
 class ShoebotInstallError(Exception):
@@ -62,6 +63,21 @@ class UnbufferedFile:
         return self.fd.fileno()
 
 
+@lru_cache(maxsize=None)
+def get_numpy():
+    """
+    :return: numpy, imported on first use, or None if it is not installed.
+
+    numpy is optional, functions that work on many values at once use it
+    when it is available and fall back to plain Python.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
 def _copy_attr(v):
     if v is None:
         return None
@@ -1,13 +1,11 @@
 #!/usr/bin/env python3
-import gi
-
-gi.require_version("PangoCairo", "1.0")
-from gi.repository import PangoCairo
+from shoebot.core.backend import driver
 
 
 def list_pango_fonts():
     """Returns a list of available Pango font names. Names are returned in the
     Pango font string format, e.g. "Inconsolata Bold"."""
+    PangoCairo = driver.gi_repository("PangoCairo", "1.0")
     names = []
     families = PangoCairo.font_map_get_default().list_families()
     for family in families:
@@ -1,9 +1,5 @@
-import os
-import shutil
 import argparse
-import subprocess
-import tempfile
-from pathlib import Path
+import sys
 
 
 def main():
@@ -15,13 +11,14 @@ def main():
         "-o",
         "--outputfile",
         dest="outputfile",
-        help="destination file (.mp4 only)",
+        help="destination file (.mp4 .mov .mkv .webm or .gif)",
         metavar="FILE",
     )
     parser.add_argument(
         "-f",
         "--frames",
         dest="framenumber",
+        type=int,
         default=300,
         help="number of frames to export (default 300)",
     )
@@ -33,20 +30,18 @@ def main():
     else:
         outfile = args.outputfile
 
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        tmpdirpath = Path(tmpdirname)
+    # Frames are piped straight to ffmpeg by VideoSink.
+    from shoebot import run
 
-        image_name = tmpdirpath / Path(args.script).with_suffix(".png").name
-        cmd = f"sbot {args.script} --repeat {args.framenumber} \
-            --outputfile {image_name}"
-        result = subprocess.call(cmd, shell=True)
-
-        fileglob = tmpdirpath / "*.png"
-        cmd = f"ffmpeg -loglevel 8 -r 30 -f image2 -pattern_type glob \
-          -i '{fileglob}' -c:v libx264 -crf 20 -movflags faststart -c:a aac \
-          -pix_fmt yuv420p {outfile}"
-        subprocess.call(cmd, shell=True)
+    success = run(
+        src=args.script,
+        outputfile=outfile,
+        max_iterations=args.framenumber,
+        window=False,
+        background_thread=False,
+    )
+    return 0 if success else 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Benchmark a set of representative bots, rendered headlessly.
+
+Each workload runs in a fresh process for a fixed number of frames and
+reports frames per second, peak RSS and the mean time of each stage of
+a frame (see FrameProfiler).  Results are written as JSON, and can be
+compared against a baseline saved from an earlier run:
+
+    python -m tests.benchmarks.bench_bots --output tests/benchmarks/baseline.json
+    python -m tests.benchmarks.bench_bots --baseline tests/benchmarks/baseline.json
+
+The exit status is 1 if any workload regressed by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).absolute().parent.parent.parent
+EXAMPLES_DIR = PROJECT_DIR / "examples"
+
+DEFAULT_FRAMES = 30
+DEFAULT_THRESHOLD = 0.1
+
+RECTS = """
+size(800, 800)
+def draw():
+    for i in range(5000):
+        fill(random(), random(), random(), 0.5)
+        rect(random(WIDTH), random(HEIGHT), 20, 20)
+"""
+
+BEZIER_PATHS = """
+size(800, 800)
+def draw():
+    nofill()
+    stroke(0)
+    for i in range(20):
+        autoclosepath(False)
+        beginpath(random(WIDTH), random(HEIGHT))
+        for j in range(1000):
+            curveto(
+                random(WIDTH), random(HEIGHT),
+                random(WIDTH), random(HEIGHT),
+                random(WIDTH), random(HEIGHT),
+            )
+        endpath()
+"""
+
+TEXT = """
+size(800, 800)
+def draw():
+    for i in range(300):
+        fontsize(8 + i % 30)
+        text(f"Shoebot {i}", random(WIDTH), random(HEIGHT))
+"""
+
+IMAGES = """
+size(800, 800)
+def draw():
+    for i in range(500):
+        image(IMAGE_PATH, random(WIDTH), random(HEIGHT))
+"""
+
+CLIPPING = """
+size(800, 800)
+def draw():
+    for i in range(300):
+        beginclip(oval(random(WIDTH), random(HEIGHT), 100, 100, draw=False))
+        for j in range(5):
+            rect(random(WIDTH), random(HEIGHT), 200, 200)
+        endclip()
+"""
+
+# name: code or path of a bot relative to examples/
+WORKLOADS = {
+    "rects": RECTS,
+    "bezier_paths": BEZIER_PATHS,
+    "text": TEXT,
+    "images": IMAGES,
+    "clipping": CLIPPING,
+    "lsystem": "libraries/lsystem/growing_plant.bot",
+    "graph": "libraries/graph/shortest_path_animated.bot",
+    "boids": "libraries/boids/swarm.bot",
+    "hypnoval": "animation/hypnoval.bot",
+    "parade": "animation/parade.bot",
+    "nebula": "demos/nebula.bot",
+    "foliage": "grid/foliage.bot",
+    "hairs": "path_effects/hairs.bot",
+}
+
+
+def create_image(filename):
+    """
+    Write the png used by the image workload.
+    """
+    from shoebot.core.backend import cairo
+
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 64, 64)
+    ctx = cairo.Context(surface)
+    ctx.set_source_rgba(0.2, 0.4, 0.6, 0.8)
+    ctx.arc(32, 32, 30, 0, 6.283)
+    ctx.fill()
+    surface.write_to_png(filename)
+
+
+def run_workload(name, frames):
+    """
+    Render a workload, called in a fresh process so peak RSS is its own.
+
+    :return: dict of results.
+    """
+    from random import seed
+
+    from shoebot import create_bot
+    from shoebot.core import FrameProfiler
+
+    workload = WORKLOADS[name]
+    namespace = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if workload.endswith(".bot"):
+            src = str(EXAMPLES_DIR / workload)
+            # Bots load their assets relative to their own directory.
+            os.chdir(os.path.dirname(src))
+        else:
+            src = workload
+            namespace["IMAGE_PATH"] = os.path.join(tmpdir, "image.png")
+            create_image(namespace["IMAGE_PATH"])
+
+        # Frames are rendered to image surfaces but not written anywhere.
+        bot = create_bot(
+            outputfile=os.path.join(tmpdir, "benchmark.raw"),
+            iterations=frames,
+            namespace=namespace,
+        )
+        profiler = FrameProfiler(print_summary=False)
+        bot._canvas.set_profiler(profiler)
+
+        seed(0)
+        start = time.perf_counter()
+        success = bot.run(src, max_iterations=frames, verbose=True)
+        elapsed = time.perf_counter() - start
+
+    report = profiler.report()
+    # Bots without a draw() function render a single frame.
+    rendered = report["stages"].get("flush", {}).get("count", 0)
+    return {
+        "success": success,
+        "frames": rendered,
+        "seconds": elapsed,
+        "fps": rendered / elapsed if elapsed else 0.0,
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        // (1024 if sys.platform == "darwin" else 1),
+        "stages_ms": {
+            stage: stats["mean"] for stage, stats in report["stages"].items()
+        },
+    }
+
+
+def run_benchmarks(names, frames):
+    """
+    :return: dict of results for each workload in names.
+    """
+    results = {}
+    for name in names:
+        # A new process for each workload, spawned rather than forked so
+        # it does not start with the memory of this one.
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=get_context("spawn")
+        ) as executor:
+            results[name] = executor.submit(run_workload, name, frames).result()
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "frames": frames,
+        "workloads": results,
+    }
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    :return: list of messages for each workload slower or using more memory
+             than in baseline, by more than threshold (0.1 = 10%).
+    """
+    regressions = []
+    baseline_workloads = baseline.get("workloads", {})
+    for name, result in results["workloads"].items():
+        before = baseline_workloads.get(name)
+        if before is None:
+            continue
+        if not result["success"]:
+            regressions.append(f"{name}: failed to run")
+            continue
+        if before["fps"] and result["fps"] < before["fps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {result['fps']:.2f} fps, was {before['fps']:.2f} fps"
+            )
+        if result["peak_rss_kb"] > before["peak_rss_kb"] * (1 + threshold):
+            regressions.append(
+                f"{name}: peak RSS {result['peak_rss_kb']} kB, "
+                f"was {before['peak_rss_kb']} kB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "workloads",
+        nargs="*",
+        help=f"Workloads to run, defaults to all of: {', '.join(WORKLOADS)}",
+    )
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare results to this JSON file.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fraction slower or larger than the baseline that is a regression.",
+    )
+    args = parser.parse_args()
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"Unknown workloads: {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(args.workloads or list(WORKLOADS), args.frames)
+    for name, result in results["workloads"].items():
+        stages = " ".join(f"{k} {v:.2f}" for k, v in result["stages_ms"].items())
+        print(
+            f"{name:>14}: {result['fps']:8.2f} fps "
+            f"{result['peak_rss_kb'] / 1024:8.1f} MiB peak RSS  ms/frame: {stages}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_results(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark how long shoebot takes to import, for a headless bot.
+
+Runs the import in fresh interpreters with python -X importtime and
+reports the median wall time, the modules with the largest cumulative
+import time, and which optional modules (gi, Pango, GTK, PIL...) were
+imported, as none are needed to output a bot without text or images.
+
+    python -m tests.benchmarks.bench_import --runs 10 --top 15
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Statement timed in a new interpreter.
+IMPORT_STATEMENT = "import shoebot; shoebot.create_bot(outputfile='bench.png')"
+
+# Modules that should only be imported when they are used.
+OPTIONAL_MODULES = (
+    "gi",
+    "pgi",
+    "gi.repository.Pango",
+    "gi.repository.PangoCairo",
+    "gi.repository.Rsvg",
+    "gi.repository.Gtk",
+    "PIL",
+    "shoebot.gui",
+    "cairocffi",
+)
+
+
+def parse_importtime(stderr):
+    """
+    :return: dict of module: cumulative import time in microseconds,
+             from the output of python -X importtime.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            # Header line.
+            continue
+        times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def time_import(statement=IMPORT_STATEMENT):
+    """
+    :return: wall time in seconds, dict of cumulative import times and the
+             set of optional modules that were imported.
+    """
+    code = (
+        f"{statement}\n"
+        "import sys\n"
+        f"print(','.join(m for m in {OPTIONAL_MODULES!r} if m in sys.modules))"
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+    imported = {m for m in result.stdout.strip().split(",") if m}
+    return elapsed, parse_importtime(result.stderr), imported
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    wall_times = []
+    for run in range(args.runs):
+        elapsed, import_times, imported = time_import()
+        wall_times.append(elapsed)
+
+    slowest = sorted(import_times.items(), key=lambda item: -item[1])[: args.top]
+    results = {
+        "python": sys.version.split()[0],
+        "median_seconds": statistics.median(wall_times),
+        "import_us": dict(slowest),
+        "optional_modules_imported": sorted(imported),
+    }
+
+    print(f"Median startup: {results['median_seconds'] * 1000:.1f} ms")
+    print("Slowest imports (cumulative):")
+    for module, us in slowest:
+        print(f"{us / 1000:10.1f} ms  {module}")
+    if imported:
+        print(f"Optional modules imported: {', '.join(sorted(imported))}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark CairoImageSink with and without surface pooling.
+
+Renders frames that paint the whole canvas, without writing files,
+and reports time, surfaces allocated and page faults per frame.
+
+    python -m tests.benchmarks.bench_surface_pool --size 3840 2160 --frames 60
+"""
+import argparse
+import resource
+import time
+
+from shoebot.core import CairoImageSink
+from shoebot.core import DrawQueue
+from shoebot.core.backend import cairo
+from shoebot.core.surface_pool import DEFAULT_MAX_BYTES
+from shoebot.core.surface_pool import surface_bytes
+
+
+def create_drawqueue():
+    drawqueue = DrawQueue()
+
+    def render(ctx):
+        ctx.set_source_rgb(0.2, 0.4, 0.6)
+        ctx.paint()
+        ctx.set_source_rgb(1, 1, 1)
+        ctx.rectangle(10, 10, 100, 100)
+        ctx.fill()
+
+    drawqueue.append(render)
+    return drawqueue
+
+
+def benchmark(size, frames, surface_pool_bytes):
+    """
+    :return: dict of results for rendering frames of size.
+    """
+    # An extension that isn't png or a vector format renders to an
+    # ImageSurface without writing it anywhere.
+    sink = CairoImageSink("benchmark.raw", surface_pool_bytes=surface_pool_bytes)
+    drawqueue = create_drawqueue()
+
+    faults_before = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    start = time.perf_counter()
+    for frame in range(frames):
+        sink.render(size, frame, drawqueue)
+    elapsed = time.perf_counter() - start
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults_before
+
+    if sink.surface_pool is not None:
+        allocated = sink.surface_pool.stats()["allocated"]
+    else:
+        allocated = frames
+    return {
+        "ms_per_frame": elapsed * 1000 / frames,
+        "surfaces_allocated": allocated,
+        "bytes_allocated": allocated * surface_bytes(cairo.FORMAT_ARGB32, *size),
+        "page_faults_per_frame": faults / frames,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, nargs=2, default=(3840, 2160))
+    parser.add_argument("--frames", type=int, default=60)
+    args = parser.parse_args()
+
+    size = tuple(args.size)
+    results = {
+        "unpooled": benchmark(size, args.frames, 0),
+        "pooled": benchmark(size, args.frames, DEFAULT_MAX_BYTES),
+    }
+    for name, result in results.items():
+        print(
+            f"{name:>9}: {result['ms_per_frame']:8.2f} ms/frame "
+            f"{result['surfaces_allocated']:4d} surfaces "
+            f"{result['bytes_allocated'] / 2 ** 20:9.1f} MiB allocated "
+            f"{result['page_faults_per_frame']:9.1f} page faults/frame"
+        )
+    saved = (
+        results["unpooled"]["bytes_allocated"] - results["pooled"]["bytes_allocated"]
+    )
+    print(f"Surface pooling saved {saved / 2 ** 20:.1f} MiB of allocations.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import unittest
+
+from tests.benchmarks.bench_bots import compare_results
+
+
+def results(fps, peak_rss_kb, success=True):
+    return {
+        "workloads": {
+            "rects": {"success": success, "fps": fps, "peak_rss_kb": peak_rss_kb}
+        }
+    }
+
+
+class TestCompareResults(unittest.TestCase):
+    def test_within_threshold(self):
+        baseline = results(100.0, 1000)
+        self.assertEqual(compare_results(results(95.0, 1050), baseline, 0.1), [])
+
+    def test_regressions(self):
+        """Slower frame rates, more memory and failures are reported."""
+        baseline = results(100.0, 1000)
+        self.assertEqual(len(compare_results(results(80.0, 1200), baseline, 0.1)), 2)
+        self.assertEqual(
+            compare_results(results(0.0, 0, success=False), baseline),
+            ["rects: failed to run"],
+        )
+
+    def test_new_workloads_ignored(self):
+        self.assertEqual(compare_results(results(1.0, 1000), {"workloads": {}}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
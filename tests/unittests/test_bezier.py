@@ -1,18 +1,23 @@
 import random
 import unittest
+from unittest import mock
 
 from parameterized import parameterized
 
 from shoebot.core import CairoCanvas
 from shoebot.core import CairoImageSink
+from shoebot.core.backend import cairo
 from shoebot.data import BezierPath
 from shoebot.data import CLOSE
+from shoebot.data import CURVETO
+from shoebot.data.bezier import EVENODD
 from shoebot.data import LINETO
 from shoebot.data import MOVETO
 from shoebot.data import PathElement
 from shoebot.data import RLINETO
 from shoebot.data import RMOVETO
 from shoebot.grammar import NodeBot
+from shoebot.util import get_numpy
 
 
 class TestBezier(unittest.TestCase):
@@ -36,6 +41,186 @@ class TestBezier(unittest.TestCase):
         self.assertIsNot(path, copied_path)
         self.assertCountEqual(path, copied_path)
 
+    def test_elements(self):
+        """
+        Elements stored in the path's arrays are returned as PathElements,
+        the same PathElement each time.
+        """
+        path = BezierPath(self.bot)
+        path.moveto(1, 2)
+        path.curveto(3, 4, 5, 6, 7, 8)
+        path.append(PathElement(LINETO, 9, 10))
+        path.closepath()
+
+        self.assertEqual(
+            list(path),
+            [
+                PathElement(MOVETO, 1, 2),
+                PathElement(CURVETO, 3, 4, 5, 6, 7, 8),
+                PathElement(LINETO, 9, 10),
+                PathElement(CLOSE, 1, 2),
+            ],
+        )
+        self.assertEqual(path[-1], PathElement(CLOSE, 1, 2))
+        self.assertEqual(path[1:3], list(path)[1:3])
+        self.assertIs(path[1], path[1])
+        self.assertEqual(len(path), 4)
+
+    def test_point(self):
+        """
+        point returns the point at a fraction of the length of the path,
+        including elements added after the path was measured.
+        """
+        path = BezierPath(self.bot)
+        path.moveto(0, 0)
+        path.lineto(10, 0)
+        path.lineto(10, 10)
+
+        self.assertEqual((path.point(0.25).x, path.point(0.25).y), (5.0, 0.0))
+        self.assertEqual((path.point(0.75).x, path.point(0.75).y), (10.0, 5.0))
+
+        path.lineto(0, 10)
+
+        self.assertEqual((path.point(0.5).x, path.point(0.5).y), (10.0, 5.0))
+        self.assertEqual(
+            [(point.x, point.y) for point in path.points(4)],
+            [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)],
+        )
+
+    @parameterized.expand([("numpy",), ("python",)])
+    def test_points(self, implementation):
+        """
+        points evaluates the same elements as point, with or without numpy.
+        """
+        if implementation == "numpy" and get_numpy() is None:
+            self.skipTest("numpy is not installed")
+        path = BezierPath(self.bot)
+        path.moveto(10, 10)
+        path.curveto(0, 60, 110, 60, 100, 10)
+        path.lineto(100, 100)
+        path.lineto(100, 100)
+        path.closepath()
+        path.moveto(200, 200)
+        path.arc(250, 250, 30, 0.5, 2.0)
+        path.lineto(300, 200)
+
+        expected = [tuple(path.point(i / 20.0)) for i in range(21)]
+        with mock.patch(
+            "shoebot.data.bezier.get_numpy",
+            get_numpy if implementation == "numpy" else lambda: None,
+        ):
+            points = [tuple(point) for point in path.points(21)]
+
+        for point, expected_point in zip(points, expected):
+            self.assertEqual(point[0], expected_point[0])
+            for value, expected_value in zip(point[1:], expected_point[1:]):
+                self.assertAlmostEqual(value, expected_value)
+        self.assertEqual(len(points), 21)
+
+    def test_bounds(self):
+        """
+        Bounds computed from the path elements match the extents cairo
+        reports for the same path, and follow changes to the path.
+        """
+        path = BezierPath(self.bot)
+        path.moveto(10, 10)
+        path.curveto(0, 60, 110, 60, 100, 10)
+        path.rellineto(0, -20)
+        path.arc(50, 50, 30, 0.5, 2.0)
+        path.closepath()
+        path.ellipse(-20, 0, 10, 40)
+
+        surface = cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA, None)
+        ctx = cairo.Context(surface)
+        path._traverse(ctx)
+        for bound, extent in zip(path.bounds, ctx.path_extents()):
+            self.assertAlmostEqual(bound, extent, delta=0.1)
+
+        path.lineto(200, 200)
+        self.assertEqual(path.bounds[2:], (200.0, 200.0))
+
+    @parameterized.expand(
+        [
+            (None, True, "numpy"),
+            (EVENODD, False, "numpy"),
+            (None, True, "python"),
+            (EVENODD, False, "python"),
+        ]
+    )
+    def test_contains(self, fillrule, inside_hole, implementation):
+        """
+        contains follows the fill rule of the path, for a single point or
+        sequences of points, with or without numpy.
+        """
+        if implementation == "numpy" and get_numpy() is None:
+            self.skipTest("numpy is not installed")
+        path = BezierPath(self.bot, fillrule=fillrule)
+        path.rect(0, 0, 100, 100)
+        path.ellipse(25, 25, 50, 50)
+
+        self.assertIs(path.contains(10, 10), True)
+        self.assertIs(path.contains(50, 50), inside_hole)
+        self.assertIs(path.contains(150, 50), False)
+        with mock.patch(
+            "shoebot.data.bezier.get_numpy",
+            get_numpy if implementation == "numpy" else lambda: None,
+        ):
+            self.assertEqual(
+                path.contains([10, 50, 150, 99], [10, 50, 50, 1]),
+                [True, inside_hole, False, True],
+            )
+
+    def test_traverse(self):
+        """
+        Traversing a path issues its elements on the cairo context.
+        """
+        path = BezierPath(self.bot)
+        path.moveto(1, 2)
+        path.lineto(3, 4)
+        path.curveto(5, 6, 7, 8, 9, 10)
+        path.closepath()
+
+        surface = cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA, None)
+        ctx = cairo.Context(surface)
+        path._traverse(ctx)
+
+        self.assertEqual(
+            list(ctx.copy_path()),
+            [
+                (cairo.PATH_MOVE_TO, (1.0, 2.0)),
+                (cairo.PATH_LINE_TO, (3.0, 4.0)),
+                (cairo.PATH_CURVE_TO, (5.0, 6.0, 7.0, 8.0, 9.0, 10.0)),
+                (cairo.PATH_CLOSE_PATH, ()),
+                (cairo.PATH_MOVE_TO, (1.0, 2.0)),
+            ],
+        )
+
+    def test_append_to(self):
+        """
+        A path drawn again is appended from a cached cairo path, shared with
+        its copies, until it changes.
+        """
+        path = BezierPath(self.bot)
+        path.moveto(1, 2)
+        path.curveto(5, 6, 7, 8, 9, 10)
+        transform = cairo.Matrix(2, 0, 0, 2, 10, 20)
+
+        surface = cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA, None)
+        ctx = cairo.Context(surface)
+        path._traverse(ctx)
+        expected = list(ctx.copy_path())
+
+        for draw in range(3):
+            ctx.new_path()
+            path._append_to(ctx, transform)
+            ctx.set_matrix(transform)
+            self.assertEqual(list(ctx.copy_path()), expected)
+        self.assertIsNotNone(path._cairo_path[1])
+        self.assertIs(path.copy()._cairo_path, path._cairo_path)
+
+        path.lineto(0, 0)
+        self.assertEqual(path._cairo_path, [None, None])
+
 
 class TestPathElement(unittest.TestCase):
     # Test the Bezier API directly.
@@ -0,0 +1,44 @@
+import tempfile
+import unittest
+
+from shoebot import create_bot
+
+
+class TestDrawStats(unittest.TestCase):
+    def run_bot(self, code, iterations=1):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bot = create_bot(outputfile=f"{tmpdir}/output.png", iterations=iterations)
+            bot.run(code, max_iterations=iterations, verbose=True)
+        return bot._canvas.stats()
+
+    def test_counts_grobs_and_path_elements(self):
+        """Grobs are counted by type, along with the path elements they render."""
+        stats = self.run_bot(
+            "size(50, 50)\n"
+            "rect(0, 0, 10, 10)\n"
+            "stroke(0)\n"
+            "line(0, 0, 10, 10)\n"
+            "beginclip(ellipse(0, 0, 20, 20, draw=False))\n"
+            "endclip()\n"
+        )
+
+        self.assertEqual(stats["frame"], 1)
+        self.assertEqual(stats["grobs"], {"BezierPath": 2, "ClippingPath": 1})
+        self.assertEqual(stats["set_source"], 3)
+        self.assertGreater(stats["path_elements"], 0)
+        self.assertEqual(stats["estimated"], ["path_elements", "set_matrix"])
+
+    def test_counts_per_frame(self):
+        """Only the last frame that was flushed is reported."""
+        stats = self.run_bot(
+            "def draw():\n"
+            "    for i in range(FRAME):\n"
+            "        rect(i, i, 10, 10)\n",
+            iterations=3,
+        )
+        self.assertEqual(stats["frame"], 3)
+        self.assertEqual(stats["grobs"], {"BezierPath": 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
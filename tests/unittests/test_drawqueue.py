@@ -0,0 +1,242 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from parameterized import parameterized
+
+from shoebot.core import CairoCanvas
+from shoebot.core import CairoImageSink
+from shoebot.core import CommandDrawQueue
+from shoebot.core import DrawQueue
+from shoebot.core import RetainedDrawQueue
+from shoebot.core.backend import cairo
+from shoebot.core.retained_drawqueue import RetainedFrame
+from shoebot.data import MITER
+from shoebot.data import SQUARE
+from shoebot.grammar import NodeBot
+
+
+def draw_shapes(bot):
+    bot.background(0.2)
+    bot.fill(1, 0, 0)
+    bot.stroke(0, 0, 1)
+    bot.strokewidth(3)
+    bot.strokedash([2, 4], 1)
+    bot.rect(10, 10, 50, 40)
+    bot.rect(10, 10, 50, 40, roundness=0.5)
+    bot.nostroke()
+    bot.ellipse(20, 30, 40, 60)
+    bot.rotate(30)
+    bot.arc(100, 100, 40, 0, 90)
+    bot.blendmode("multiply")
+    bot.beginpath(5, 5)
+    bot.curveto(10, 20, 30, 40, 50, 60)
+    bot.rellineto(10, 10)
+    bot.endpath()
+
+
+class TestCommandDrawQueue(unittest.TestCase):
+    def create_bot(self, drawqueue_class):
+        sink = CairoImageSink("output-drawqueue.png")
+        canvas = CairoCanvas(sink, drawqueue_class=drawqueue_class)
+        return NodeBot(canvas=canvas)
+
+    @parameterized.expand([("corner",), ("center",)])
+    def test_render_calls_match_drawqueue(self, transform_mode):
+        """
+        Rendering the same shapes with CommandDrawQueue and DrawQueue
+        makes the same calls on the cairo context.
+        """
+        expected_ctx = Mock()
+        actual_ctx = Mock()
+        bot = self.create_bot(DrawQueue)
+        bot.transform(transform_mode)
+        draw_shapes(bot)
+        command_bot = self.create_bot(CommandDrawQueue)
+        command_bot.transform(transform_mode)
+        draw_shapes(command_bot)
+
+        bot._canvas._drawqueue.render(expected_ctx)
+        command_bot._canvas._drawqueue.render(actual_ctx)
+
+        self.assertEqual(expected_ctx.mock_calls, actual_ctx.mock_calls)
+
+    def test_records_without_render_funcs(self):
+        """
+        Shapes drawn on a CommandDrawQueue are recorded as opcodes,
+        only the background is stored as a render function.
+        """
+        bot = self.create_bot(CommandDrawQueue)
+
+        bot.rect(0, 0, 10, 10)
+        drawqueue = bot._canvas._drawqueue
+
+        self.assertEqual(len(drawqueue.operands), 1)
+        self.assertGreater(len(drawqueue.opcodes), 1)
+
+
+class TestRetainedDrawQueue(unittest.TestCase):
+    def draw_frame(self, retained_frame, x):
+        sink = CairoImageSink("output-drawqueue.png")
+        canvas = CairoCanvas(sink)
+        canvas._drawqueue = RetainedDrawQueue(retained_frame)
+        bot = NodeBot(canvas=canvas)
+        bot.background(1)
+        bot.fill(0)
+        bot.rect(10, 10, 20, 20)
+        bot.rect(x, 50, 20, 20)
+        return canvas._drawqueue
+
+    def test_unchanged_frame_has_same_keys(self):
+        """Drawing the same frame twice produces identical segment keys."""
+        retained_frame = RetainedFrame()
+        first = self.draw_frame(retained_frame, 10)
+        second = self.draw_frame(retained_frame, 10)
+
+        self.assertEqual(first._segment_keys(), second._segment_keys())
+
+    def test_damage_covers_only_moved_shape(self):
+        """Only the area of the shape that moved is damaged."""
+        retained_frame = RetainedFrame()
+        first = self.draw_frame(retained_frame, 10)
+        retained_frame.drawqueue = first
+        retained_frame.keys = first._segment_keys()
+        second = self.draw_frame(retained_frame, 60)
+
+        damage = second._damage(second._segment_keys(), (100, 100))
+
+        self.assertTrue(damage)
+        for x1, y1, x2, y2 in damage:
+            self.assertGreaterEqual(y1, 40)
+
+    def test_damage_falls_back_to_whole_frame(self):
+        """When most of the frame changed, the whole frame is damaged."""
+        retained_frame = RetainedFrame()
+        drawqueues = []
+        for offset in (0, 1):
+            canvas = CairoCanvas(CairoImageSink("output-drawqueue.png"))
+            canvas._drawqueue = RetainedDrawQueue(retained_frame)
+            bot = NodeBot(canvas=canvas)
+            for i in range(100):
+                bot.rect(i, offset, 1, 1)
+            drawqueues.append(canvas._drawqueue)
+        first, second = drawqueues
+        retained_frame.drawqueue = first
+        retained_frame.keys = first._segment_keys()
+
+        damage = second._damage(second._segment_keys(), (100, 100))
+
+        self.assertEqual(damage, [(0, 0, 100, 100)])
+
+    def test_render_reports_damage(self):
+        """
+        render sets damage to the whole frame at first, then to
+        nothing when the frame did not change.
+        """
+        retained_frame = RetainedFrame()
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 100, 100)
+
+        first = self.draw_frame(retained_frame, 10)
+        first.render(cairo.Context(surface))
+        second = self.draw_frame(retained_frame, 10)
+        second.render(cairo.Context(surface))
+
+        self.assertEqual(first.damage, [(0, 0, 100, 100)])
+        self.assertEqual(second.damage, [])
+
+    def draw_stroke_frame(self, retained_frame, attribute, value, x):
+        canvas = CairoCanvas(CairoImageSink("output-drawqueue.png"))
+        canvas._drawqueue = RetainedDrawQueue(retained_frame)
+        bot = NodeBot(canvas=canvas)
+        bot.background(1)
+        bot.nofill()
+        bot.stroke(0)
+        bot.strokewidth(8)
+        # The style is set by this path and inherited by the next one.
+        bot.line(5, 5, 10, 5, **{attribute: value})
+        bot.beginpath(x, 80)
+        bot.lineto(x + 10, 40)
+        bot.lineto(x + 20, 80)
+        bot.endpath()
+        return canvas._drawqueue
+
+    @parameterized.expand([("strokecap", SQUARE), ("strokejoin", MITER)])
+    def test_repaint_covers_stroke_style(self, attribute, value):
+        """
+        The damaged area covers every pixel that changed, including square
+        caps and miter joins that reach past the path, and repainting it
+        gives the same pixels as drawing the frame from scratch.
+        """
+        retained_frame = RetainedFrame()
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 100, 100)
+        frames = []
+        for x in (20, 50):
+            drawqueue = self.draw_stroke_frame(retained_frame, attribute, value, x)
+            drawqueue.render(cairo.Context(surface))
+            expected = cairo.ImageSurface(cairo.FORMAT_ARGB32, 100, 100)
+            drawqueue.render_commands(cairo.Context(expected))
+            expected.flush()
+            frames.append(bytes(expected.get_data()))
+        retained_frame.surface.flush()
+
+        self.assertEqual(bytes(retained_frame.surface.get_data()), frames[1])
+        self.assertNotEqual(drawqueue.damage, [(0, 0, 100, 100)])
+        stride = surface.get_stride()
+        for y in range(100):
+            for x in range(100):
+                offset = y * stride + x * 4
+                if frames[0][offset : offset + 4] != frames[1][offset : offset + 4]:
+                    self.assertTrue(
+                        any(
+                            x1 <= x < x2 and y1 <= y < y2
+                            for x1, y1, x2, y2 in drawqueue.damage
+                        ),
+                        f"{x}, {y} changed outside the damaged area",
+                    )
+
+    def test_bbox_inherits_line_cap(self):
+        """
+        Segments are measured with the line cap they inherit from the
+        segments drawn before them.
+        """
+        canvas = CairoCanvas(CairoImageSink("output-drawqueue.png"))
+        canvas._drawqueue = RetainedDrawQueue(RetainedFrame())
+        bot = NodeBot(canvas=canvas)
+        bot.nofill()
+        bot.stroke(0)
+        bot.strokewidth(10)
+        bot.line(10, 10, 20, 10, strokecap=SQUARE)
+        bot.line(50, 10, 80, 10)
+
+        drawqueue = canvas._drawqueue
+        x1, y1, x2, y2 = drawqueue.segment_bbox(len(drawqueue.segments) - 1, (100, 100))
+
+        self.assertLessEqual(x1, 45)
+        self.assertGreaterEqual(x2, 85)
+
+    def test_image_render_key(self):
+        """
+        Images are keyed by the file they were loaded from, so a changed
+        file is drawn again, surfaces passed as data are never kept.
+        """
+        bot = NodeBot(canvas=CairoCanvas(CairoImageSink("output-drawqueue.png")))
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 4, 4)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "image.png")
+            surface.write_to_png(path)
+            first = bot.image(path, 0, 0)._render_key()
+            same = bot.image(path, 0, 0)._render_key()
+
+            cairo.ImageSurface(cairo.FORMAT_ARGB32, 4, 8).write_to_png(path)
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            changed = bot.image(path, 0, 0)._render_key()
+
+        self.assertEqual(first, same)
+        self.assertNotEqual(first, changed)
+        self.assertIsNone(bot.image(None, 0, 0, data=surface)._render_key())
+
+
+if __name__ == "__main__":
+    unittest.main()
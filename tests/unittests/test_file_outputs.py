@@ -2,8 +2,11 @@
 Check if shoebot can create files in it's supported output formats
 and that none are zero bytes long.
 """
+import filecmp
+import shutil
 import tempfile
 import unittest
+from pathlib import Path
 
 from parameterized import parameterized
 from parameterized import parameterized_class
@@ -12,6 +15,10 @@ from tests.unittests.helpers import shoebot_named_testclass
 from tests.unittests.helpers import shoebot_named_testfunction
 from tests.unittests.helpers import ShoebotTestCase
 
+from shoebot import create_bot
+from shoebot import render_batch
+from shoebot import run
+
 
 @parameterized_class(
     [{"windowed": False}, {"windowed": True}], class_name_func=shoebot_named_testclass
@@ -35,5 +42,166 @@ class TestOutputFormats(ShoebotTestCase):
             self.assertFileSize(f.name)
 
 
+class TestParallelOutput(unittest.TestCase):
+    code = "size(20, 20)\ndef draw():\n    rect(FRAME, FRAME, 5, 5)"
+
+    @parameterized.expand(
+        [({},), ({"pipeline_depth": 2, "png_writers": 2, "png_compression": 9},)]
+    )
+    def test_parallel_output_matches_serial(self, options):
+        """
+        Rendering frames with jobs=2 outputs the same numbered files as a serial run.
+        """
+        with tempfile.TemporaryDirectory() as serial_dir:
+            with tempfile.TemporaryDirectory() as parallel_dir:
+                run(
+                    self.code,
+                    outputfile=f"{serial_dir}/out.png",
+                    max_iterations=5,
+                    window=False,
+                    background_thread=False,
+                    **options,
+                )
+                run(
+                    self.code,
+                    outputfile=f"{parallel_dir}/out.png",
+                    max_iterations=5,
+                    window=False,
+                    jobs=2,
+                    **options,
+                )
+
+                filenames = sorted(path.name for path in Path(serial_dir).iterdir())
+                self.assertEqual(
+                    filenames, [f"out_{frame:03d}.png" for frame in range(1, 6)]
+                )
+                match, mismatch, errors = filecmp.cmpfiles(
+                    serial_dir, parallel_dir, filenames, shallow=False
+                )
+                self.assertEqual(match, filenames)
+
+
+class TestPipelinedOutput(unittest.TestCase):
+    def test_frames_before_error_are_written(self):
+        """
+        Frames rendered on the pipeline thread before the bot fails are written.
+        """
+        code = (
+            "size(20, 20)\n"
+            "def draw():\n"
+            "    if FRAME == 4:\n"
+            "        raise ValueError(FRAME)\n"
+            "    rect(FRAME, FRAME, 5, 5)"
+        )
+        with tempfile.TemporaryDirectory() as output_dir:
+            bot = create_bot(
+                outputfile=f"{output_dir}/out.png", iterations=5, pipeline_depth=4
+            )
+            self.assertFalse(bot.run(code, max_iterations=5))
+
+            filenames = sorted(path.name for path in Path(output_dir).iterdir())
+            self.assertEqual(filenames, [f"out_{frame:03d}.png" for frame in (1, 2, 3)])
+
+
+class TestBatchOutput(unittest.TestCase):
+    code = 'var("width", NUMBER, 5, 1, 20)\nsize(20, 20)\nrect(0, 0, width, 5)'
+
+    @parameterized.expand([(1,), (2,)])
+    def test_batch_output_matches_run(self, jobs):
+        """
+        Each set of variables renders the same file as a separate run.
+        """
+        var_sets = [{"width": width} for width in (2, 10, 15)]
+        with tempfile.TemporaryDirectory() as run_dir:
+            with tempfile.TemporaryDirectory() as batch_dir:
+                for vars in var_sets:
+                    run(
+                        self.code,
+                        outputfile=f"{run_dir}/width_{vars['width']}.png",
+                        window=False,
+                        background_thread=False,
+                        vars=dict(vars),
+                    )
+                results = render_batch(
+                    self.code, var_sets, f"{batch_dir}/width_{{width}}.png", jobs=jobs
+                )
+
+                self.assertEqual(
+                    sorted(results),
+                    [
+                        (index, f"{batch_dir}/width_{vars['width']}.png")
+                        for index, vars in enumerate(var_sets)
+                    ],
+                )
+                filenames = sorted(path.name for path in Path(run_dir).iterdir())
+                match, mismatch, errors = filecmp.cmpfiles(
+                    run_dir, batch_dir, filenames, shallow=False
+                )
+                self.assertEqual(match, filenames)
+
+    @parameterized.expand([(1,), (2,)])
+    def test_concurrent_batches(self, jobs):
+        """
+        Batches rendered at the same time each render with their own bot.
+        """
+        oval_code = self.code.replace("rect", "oval")
+        var_sets = [{"width": 10}, {"width": 10}]
+        with tempfile.TemporaryDirectory() as output_dir:
+            rects = render_batch(
+                self.code, var_sets, f"{output_dir}/rect_{{index}}.png", jobs=jobs
+            )
+            ovals = render_batch(
+                oval_code, var_sets, f"{output_dir}/oval_{{index}}.png", jobs=jobs
+            )
+            for results in zip(rects, ovals):
+                pass
+
+            self.assertTrue(
+                filecmp.cmp(f"{output_dir}/rect_0.png", f"{output_dir}/rect_1.png")
+            )
+            self.assertTrue(
+                filecmp.cmp(f"{output_dir}/oval_0.png", f"{output_dir}/oval_1.png")
+            )
+            self.assertFalse(
+                filecmp.cmp(f"{output_dir}/rect_0.png", f"{output_dir}/oval_0.png")
+            )
+
+
+class TestVideoOutput(ShoebotTestCase):
+    @parameterized.expand(["mp4", "gif"], name_func=shoebot_named_testfunction)
+    def test_video_output(self, file_format):
+        """
+        Render an animated bot to a video file using ffmpeg.
+        """
+        if shutil.which("ffmpeg") is None:
+            self.skipTest("ffmpeg is not installed.")
+
+        code = "size(31, 20)\ndef draw():\n    rect(FRAME, FRAME, 5, 5)"
+        with tempfile.NamedTemporaryFile(suffix=f".{file_format}") as f:
+            run(code, outputfile=f.name, max_iterations=10, window=False)
+
+            self.assertFileSize(f.name)
+
+    def test_video_output_after_error(self):
+        """
+        The frames drawn before a bot fails are written as a complete video.
+        """
+        if shutil.which("ffmpeg") is None:
+            self.skipTest("ffmpeg is not installed.")
+
+        code = (
+            "size(31, 20)\n"
+            "def draw():\n"
+            "    if FRAME == 5:\n"
+            "        raise ValueError(FRAME)\n"
+            "    rect(FRAME, FRAME, 5, 5)"
+        )
+        with tempfile.NamedTemporaryFile(suffix=".mp4") as f:
+            success = run(code, outputfile=f.name, max_iterations=10, window=False)
+
+            self.assertFalse(success)
+            self.assertFileSize(f.name)
+
+
 if __name__ == "__main__":
     unittest.main(buffer=False)
@@ -0,0 +1,71 @@
+import subprocess
+import sys
+import unittest
+
+from parameterized import parameterized
+
+from shoebot.core.backend import LazyImport
+
+
+class TestLazyImports(unittest.TestCase):
+    @parameterized.expand(
+        [
+            "gi.repository.Pango",
+            "gi.repository.Rsvg",
+            "gi.repository.Gtk",
+            "PIL",
+            "difflib",
+            "multiprocessing.shared_memory",
+            "shoebot.core.tiled_sink",
+        ]
+    )
+    def test_headless_bot_does_not_import(self, module):
+        """
+        Modules only needed for text, images, the GUI or other sinks are
+        imported on use.
+        """
+        code = (
+            "import sys, shoebot\n"
+            "shoebot.create_bot(outputfile='output.png')\n"
+            f"print({module!r} in sys.modules)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+    def test_import_gui(self):
+        """The GUI imports with gi loaded on first use."""
+        try:
+            import gi
+
+            gi.require_version("Gtk", "3.0")
+            from gi.repository import Gtk  # noqa: F401
+        except (ImportError, ValueError):
+            self.skipTest("Gtk is not installed.")
+
+        result = subprocess.run(
+            [sys.executable, "-c", "import shoebot.gui"],
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_lazy_import(self):
+        imports = []
+
+        def import_module():
+            imports.append(True)
+            import json
+
+            return json
+
+        json = LazyImport(import_module)
+        self.assertEqual(imports, [])
+        self.assertEqual(json.dumps([1]), "[1]")
+        json.dumps([2])
+        self.assertEqual(imports, [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
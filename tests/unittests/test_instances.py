@@ -0,0 +1,140 @@
+import filecmp
+import tempfile
+import unittest
+
+from parameterized import parameterized
+
+from shoebot import create_bot
+from shoebot import run
+from shoebot.core import CairoCanvas
+from shoebot.core import CairoImageSink
+from shoebot.grammar import NodeBot
+from shoebot.util import get_numpy
+
+INSTANCES = """
+size(50, 50)
+transform(CORNER)
+shape = rect(0, 0, 10, 5, draw=False)
+instances(
+    shape,
+    [5, 20, 35],
+    [10, 20, 30],
+    angles=[0, 90, 180],
+    scales=[1, 2, 0.5],
+    fills=[(1, 0, 0), None, "#0000ff"],
+)
+"""
+
+SEPARATE_PATHS = """
+size(50, 50)
+transform(CORNER)
+shape = rect(0, 0, 10, 5, draw=False)
+for x, y, angle, s, color in [
+    (5, 10, 0, 1, (1, 0, 0)),
+    (20, 20, 90, 2, None),
+    (35, 30, 180, 0.5, "#0000ff"),
+]:
+    push()
+    translate(x, y)
+    rotate(angle)
+    scale(s)
+    if color is None:
+        nofill()
+    else:
+        fill(color)
+    drawpath(shape)
+    pop()
+"""
+
+# The same colors as lists of numbers.
+INSTANCES_LIST_FILLS = INSTANCES.replace(
+    'fills=[(1, 0, 0), None, "#0000ff"]', "fills=[[1, 0, 0], None, [0, 0, 1, 1]]"
+)
+
+# A transparent fill draws nothing, like no fill.
+INSTANCES_NUMPY_FILLS = "import numpy\n" + INSTANCES.replace(
+    'fills=[(1, 0, 0), None, "#0000ff"]',
+    "fills=numpy.array([[1, 0, 0, 1], [0, 0, 0, 0], [0, 0, 1, 1]])",
+)
+
+# The path is changed after the instances are drawn.
+INSTANCES_THEN_CHANGE_PATH = INSTANCES + "shape.lineto(50, 50)\n"
+
+
+class TestInstances(unittest.TestCase):
+    @parameterized.expand(
+        [
+            ("separate_paths", SEPARATE_PATHS),
+            ("path_changed", INSTANCES_THEN_CHANGE_PATH),
+            ("list_fills", SEPARATE_PATHS, INSTANCES_LIST_FILLS),
+            ("numpy_fills", SEPARATE_PATHS, INSTANCES_NUMPY_FILLS),
+        ]
+    )
+    def test_instances_match(self, case, other_code, instances_code=INSTANCES):
+        """
+        Drawing instances of a path outputs the same image as drawing the
+        path at each position, and as it was when the instances were drawn.
+        """
+        if "numpy" in instances_code and get_numpy() is None:
+            self.skipTest("numpy is not installed")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, code in (("a", instances_code), ("b", other_code)):
+                run(
+                    code,
+                    outputfile=f"{tmpdir}/{name}.png",
+                    window=False,
+                    background_thread=False,
+                )
+            self.assertTrue(
+                filecmp.cmp(f"{tmpdir}/a.png", f"{tmpdir}/b.png", shallow=False)
+            )
+
+    def test_render_key(self):
+        """Instances drawn the same way have the same render key."""
+        bot = NodeBot(canvas=CairoCanvas(CairoImageSink("output-instances.png")))
+        shape = bot.rect(0, 0, 10, 5, draw=False)
+
+        first = bot.instances(shape, [1, 2], [3, 4], fills=[(1, 0, 0), None])
+        second = bot.instances(shape, [1, 2], [3, 4], fills=[(1, 0, 0), None])
+        moved = bot.instances(shape, [1, 2], [3, 5], fills=[(1, 0, 0), None])
+
+        self.assertEqual(first._render_key(), second._render_key())
+        self.assertNotEqual(first._render_key(), moved._render_key())
+
+    def test_picked(self):
+        """Instances are found by picked inside any instance of the path."""
+        code = (
+            "size(50, 50)\n"
+            "query(0, 0, 50, 50)\n"
+            "def draw():\n"
+            "    global inside, between\n"
+            "    inside = picked(22, 22)\n"
+            "    between = picked(12, 22)\n"
+            "    shape = rect(0, 0, 5, 5, draw=False)\n"
+            "    instances(shape, [0, 20], [0, 20])\n"
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bot = create_bot(outputfile=f"{tmpdir}/output.png", iterations=2)
+            self.assertTrue(bot.run(code, max_iterations=2, verbose=True))
+
+        self.assertEqual(len(bot._namespace["inside"]), 1)
+        self.assertEqual(bot._namespace["between"], [])
+
+    def test_lengths_must_match(self):
+        """
+        All the sequences of instance parameters must be the same length.
+        """
+        code = "instances(rect(0, 0, 10, 10, draw=False), [1, 2], [1])"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.assertFalse(
+                run(
+                    code,
+                    outputfile=f"{tmpdir}/output.png",
+                    window=False,
+                    background_thread=False,
+                )
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
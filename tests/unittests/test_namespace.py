@@ -0,0 +1,45 @@
+import unittest
+
+from shoebot import create_bot
+from shoebot import data
+
+
+def scan_namespace(bot):
+    """Namespace as it was built before templates, by scanning dir()."""
+    namespace = {}
+    for name in dir(data):
+        namespace[name] = getattr(data, name)
+    for name in dir(bot):
+        if name[0] != "_":
+            namespace[name] = getattr(bot, name)
+    return namespace
+
+
+class TestNamespaceTemplate(unittest.TestCase):
+    def test_same_as_scanning_dir(self):
+        """The template gives bots the same namespace as scanning dir(bot)."""
+        bot = create_bot(outputfile="output.png")
+        namespace = {}
+        bot._load_namespace(namespace, "test.bot")
+
+        expected = scan_namespace(bot)
+        expected["_ctx"] = bot
+        expected["__file__"] = "test.bot"
+        self.assertEqual(set(namespace), set(expected))
+        for name, value in expected.items():
+            # Bound methods are created for each namespace.
+            self.assertEqual(namespace[name], value, name)
+
+    def test_methods_bound_to_each_bot(self):
+        first = create_bot(outputfile="output.png")
+        second = create_bot(outputfile="output.png")
+        first_ns, second_ns = {}, {}
+        first._load_namespace(first_ns)
+        second._load_namespace(second_ns)
+
+        self.assertIs(first_ns["rect"].__self__, first)
+        self.assertIs(second_ns["rect"].__self__, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
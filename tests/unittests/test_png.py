@@ -0,0 +1,113 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from parameterized import parameterized
+from PIL import Image
+from PIL import ImageChops
+
+from shoebot.core.backend import cairo
+from shoebot.core.png import argb32_to_rgba
+from shoebot.core.png import PNGWriterPool
+from shoebot.core.png import write_surface_to_png
+
+
+def create_surface():
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 30, 20)
+    ctx = cairo.Context(surface)
+    ctx.set_source_rgba(1, 0.5, 0, 0.5)
+    ctx.rectangle(5, 5, 20, 10)
+    ctx.fill()
+    ctx.set_source_rgb(0, 0, 1)
+    ctx.arc(15, 10, 5, 0, 6.3)
+    ctx.fill()
+    return surface
+
+
+class TestPNG(unittest.TestCase):
+    def assertPNGsEqual(self, file1, file2):
+        with Image.open(file1) as img1, Image.open(file2) as img2:
+            self.assertIsNone(ImageChops.difference(img1, img2).getbbox())
+
+    @parameterized.expand([(1,), (100,)])
+    def test_argb32_to_rgba(self, translucent_percent):
+        """Pixels are unpremultiplied however many of them are translucent."""
+        pixels = []
+        for i in range(400):
+            alpha = (i % 254 + 1) if i % 100 < translucent_percent else 255
+            pixels.append(((i * 7) % (alpha + 1), i % (alpha + 1), 0, alpha))
+        # Native endian ARGB32
+        data = b"".join(
+            ((a << 24) | (r << 16) | (g << 8) | b).to_bytes(4, sys.byteorder)
+            for r, g, b, a in pixels
+        )
+
+        expected = bytes(
+            value
+            for r, g, b, a in pixels
+            for value in [min(255, (c * 255 + a // 2) // a) for c in (r, g, b)]
+            + [a]
+        )
+        self.assertEqual(argb32_to_rgba(data), expected)
+
+    @parameterized.expand([(0,), (1,), (9,)])
+    def test_write_surface_matches_cairo(self, compression):
+        """PNGs written with any compression level have the same pixels as cairo's."""
+        with tempfile.TemporaryDirectory() as output_dir:
+            expected = f"{output_dir}/expected.png"
+            actual = f"{output_dir}/actual.png"
+            surface = create_surface()
+            surface.write_to_png(expected)
+
+            write_surface_to_png(surface, actual, compression)
+
+            self.assertPNGsEqual(expected, actual)
+
+    @parameterized.expand([(None,), (1,), (9,)])
+    def test_writer_pool_writes_all_files(self, compression):
+        """Every surface queued on a PNGWriterPool is written by the time wait returns."""
+        with tempfile.TemporaryDirectory() as output_dir:
+            expected = f"{output_dir}/expected.png"
+            create_surface().write_to_png(expected)
+            pool = PNGWriterPool(writers=2, max_pending=2, compression=compression)
+
+            for frame in range(8):
+                pool.write(create_surface(), f"{output_dir}/frame_{frame:03d}.png")
+            pool.wait()
+
+            for frame in range(8):
+                self.assertPNGsEqual(expected, f"{output_dir}/frame_{frame:03d}.png")
+            self.assertEqual(len(list(Path(output_dir).glob("frame_*.png"))), 8)
+
+    @parameterized.expand([(None,), (1,)])
+    def test_writer_pool_releases_on_error(self, compression):
+        """Surfaces are released even when they can't be written."""
+        released = []
+        with tempfile.TemporaryDirectory() as output_dir:
+            pool = PNGWriterPool(
+                writers=1, compression=compression, release=released.append
+            )
+            surface = create_surface()
+            pool.write(surface, f"{output_dir}/missing/frame_001.png")
+
+            with self.assertRaises(OSError):
+                pool.finish()
+
+        self.assertEqual(released, [surface])
+
+    def test_writer_pool_finish(self):
+        """finish stops the writer threads, later writes start them again."""
+        with tempfile.TemporaryDirectory() as output_dir:
+            pool = PNGWriterPool(writers=1, compression=1)
+            pool.write(create_surface(), f"{output_dir}/frame_001.png")
+            pool.finish()
+            self.assertIsNone(pool.executor)
+
+            pool.write(create_surface(), f"{output_dir}/frame_002.png")
+            pool.finish()
+            self.assertEqual(len(list(Path(output_dir).glob("frame_*.png"))), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
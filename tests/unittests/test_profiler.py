@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+from time import time
+
+from shoebot.core import CairoCanvas, CairoImageSink
+from shoebot.core import DrawQueue, DrawQueueSink, FrameProfiler
+from shoebot.core.profiler import percentile
+from shoebot.grammar import NodeBot
+
+
+class TestFrameProfiler(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 90), 3)
+
+    def test_report(self):
+        """Times for a frame and stage add up, stages are summarised over frames."""
+        profiler = FrameProfiler()
+        profiler.add(1, "draw", 0.001)
+        profiler.add(1, "draw", 0.002)
+        profiler.add(2, "draw", 0.005)
+        profiler.add(2, "flush", 0.010)
+
+        report = profiler.report()
+
+        self.assertEqual([frame["frame"] for frame in report["frames"]], [1, 2])
+        self.assertAlmostEqual(report["frames"][0]["draw"], 3.0)
+        self.assertEqual(list(report["stages"]), ["draw", "flush"])
+        self.assertEqual(report["stages"]["draw"]["count"], 2)
+        self.assertAlmostEqual(report["stages"]["draw"]["mean"], 4.0)
+        self.assertAlmostEqual(report["stages"]["draw"]["max"], 5.0)
+
+    def test_sink_times_render_and_output(self):
+        """DrawQueueSink.render times the drawqueue and output separately."""
+        profiler = FrameProfiler()
+        sink = DrawQueueSink()
+        sink.profiler = profiler
+
+        sink.render((10, 10), 7, DrawQueue())
+
+        self.assertEqual(set(profiler.frames[7]), {"render", "output"})
+
+    def test_waiting_for_next_frame_is_idle(self):
+        """Waiting for the next frame is timed as idle, not as handling events."""
+        profiler = FrameProfiler()
+        bot = NodeBot(canvas=CairoCanvas(CairoImageSink("output-profiler.png")))
+
+        bot._handle_events(0, False, time() + 0.05, profiler.timer)
+
+        timings = profiler.frames[bot._frame]
+        self.assertGreaterEqual(timings["idle"], 0.04)
+        self.assertLess(timings["events"], timings["idle"])
+
+    def test_finish_writes_report(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "report.json")
+            profiler = FrameProfiler(filename)
+            profiler.add(1, "draw", 0.001)
+
+            profiler.finish()
+
+            with open(filename) as f:
+                self.assertEqual(json.load(f)["stages"]["draw"]["count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
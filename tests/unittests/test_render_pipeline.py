@@ -0,0 +1,63 @@
+import threading
+import unittest
+
+from shoebot.core import DrawQueueSink
+from shoebot.core import RenderPipeline
+
+
+class RecordingSink(DrawQueueSink):
+    def __init__(self, fail_on_frame=None):
+        DrawQueueSink.__init__(self)
+        self.frames = []
+        self.threads = set()
+        self.fail_on_frame = fail_on_frame
+
+    def render(self, size, frame, drawqueue):
+        self.threads.add(threading.current_thread())
+        if frame == self.fail_on_frame:
+            raise ValueError(f"Failed on frame {frame}")
+        self.frames.append(frame)
+
+
+class TestRenderPipeline(unittest.TestCase):
+    def test_frames_rendered_in_order_on_render_thread(self):
+        """Submitted frames are all rendered in order on a separate thread."""
+        sink = RecordingSink()
+        pipeline = RenderPipeline(sink, depth=2)
+
+        for frame in range(1, 11):
+            pipeline.submit((10, 10), frame, None)
+        pipeline.wait()
+
+        self.assertEqual(sink.frames, list(range(1, 11)))
+        self.assertNotIn(threading.current_thread(), sink.threads)
+
+    def test_render_error_raised_in_bot_thread(self):
+        """An exception raised while rendering is raised again in the bot thread."""
+        sink = RecordingSink(fail_on_frame=2)
+        pipeline = RenderPipeline(sink, depth=2)
+
+        with self.assertRaises(ValueError):
+            for frame in range(1, 4):
+                pipeline.submit((10, 10), frame, None)
+            pipeline.wait()
+        self.assertEqual(sink.frames, [1])
+
+    def test_stop(self):
+        """stop renders the remaining frames, submit starts a new thread."""
+        sink = RecordingSink()
+        pipeline = RenderPipeline(sink, depth=2)
+
+        pipeline.submit((10, 10), 1, None)
+        thread = pipeline.thread
+        pipeline.stop()
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(pipeline.thread)
+
+        pipeline.submit((10, 10), 2, None)
+        pipeline.stop()
+        self.assertEqual(sink.frames, [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
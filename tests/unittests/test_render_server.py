@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+
+from shoebot.sbio.render_server import RenderServer, WarmBot
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+STATIC_BOT = """
+var("radius", NUMBER, 10, 1, 100)
+size(50, 40)
+ellipse(0, 0, radius, radius)
+"""
+
+ANIMATED_BOT = """
+def setup():
+    global count
+    count = 0
+
+def draw():
+    global count
+    count += 1
+    rect(0, 0, 10, 10)
+"""
+
+# Counts the renders that share its globals.
+COUNTING_BOT = """
+size(20, 20)
+renders = globals().get("renders", 0) + 1
+"""
+
+
+class TestWarmBot(unittest.TestCase):
+    def test_static_bot_renders_each_request(self):
+        """Non animated bots run from the cached code on every request."""
+        bot = WarmBot(STATIC_BOT, "<string>")
+
+        first = bot.render(format="png", vars={"radius": 20})
+        second = bot.render(format="png", size=(20, 30))
+
+        self.assertTrue(first.startswith(PNG_SIGNATURE))
+        self.assertTrue(second.startswith(PNG_SIGNATURE))
+        self.assertEqual(bot.bot._namespace["radius"], 10)
+        self.assertEqual(bot.bot._canvas.size, (20, 30))
+
+    def test_static_bot_globals_reset(self):
+        """Globals set by a non animated bot don't carry over to the next request."""
+        bot = WarmBot(COUNTING_BOT, "<string>")
+
+        bot.render(format="png")
+        bot.render(format="png")
+
+        self.assertEqual(bot.bot._namespace["renders"], 1)
+
+    def test_animated_bot_keeps_state(self):
+        """Animated bots run setup() once, then draw() for each request."""
+        bot = WarmBot(ANIMATED_BOT, "<string>")
+
+        bot.render(format="png")
+        svg = bot.render(format="svg", frame=5)
+
+        self.assertIn(b"<svg", svg)
+        self.assertEqual(bot.bot._namespace["count"], 2)
+        self.assertEqual(bot.bot._namespace["FRAME"], 5)
+
+    def test_sink_reused(self):
+        """Requests in the same format render with the same sink and its surfaces."""
+        bot = WarmBot(STATIC_BOT, "<string>")
+
+        bot.render(format="png")
+        sink = bot.bot._canvas.sink
+        bot.render(format="svg")
+        second = bot.render(format="png")
+
+        self.assertIs(bot.bot._canvas.sink, sink)
+        self.assertTrue(second.startswith(PNG_SIGNATURE))
+
+
+class TestRenderServerCache(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.server = RenderServer(os.path.join(tmpdir.name, "sock"), max_bots=1)
+        self.addCleanup(self.server.server_close)
+
+    def test_bots_cached_by_source(self):
+        """Requests for the same source reuse a bot, least recently used are dropped."""
+        bot = self.server.get_bot(STATIC_BOT, "<string>")
+        self.assertIs(self.server.get_bot(STATIC_BOT, "<string>"), bot)
+
+        self.server.get_bot(ANIMATED_BOT, "<string>")
+        self.assertIsNot(self.server.get_bot(STATIC_BOT, "<string>"), bot)
+
+    def test_render_request(self):
+        """Requests with source return image data in the requested format."""
+        data = self.server.render({"source": STATIC_BOT, "format": "png"})
+        self.assertTrue(data.startswith(PNG_SIGNATURE))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import sys
+import unittest
+
+from shoebot.core import DrawQueue
+from shoebot.core import SharedMemoryFrameReader
+from shoebot.core import SharedMemorySink
+
+
+def fill_drawqueue(red):
+    drawqueue = DrawQueue()
+
+    def render(ctx):
+        ctx.set_source_rgb(red, 0, 0)
+        ctx.paint()
+
+    drawqueue.append(render)
+    return drawqueue
+
+
+class TestSharedMemorySink(unittest.TestCase):
+    def setUp(self):
+        self.sink = SharedMemorySink(slots=2)
+        self.addCleanup(self.sink.finish)
+
+    def render_frames(self, count):
+        for frame in range(1, count + 1):
+            self.sink.render((4, 3), frame, fill_drawqueue(frame / count))
+
+    def test_reader_gets_latest_frame(self):
+        """Readers attached by name see the most recent frame and its metadata."""
+        self.render_frames(3)
+        reader = SharedMemoryFrameReader(self.sink.name)
+        self.addCleanup(reader.close)
+
+        frame, width, height, stride, pixels = reader.read()
+
+        self.assertEqual((frame, width, height, stride), (3, 4, 3, 16))
+        red = pixels[2] if sys.byteorder == "little" else pixels[1]
+        self.assertEqual(red, 255)
+
+    def test_overwritten_frame_not_returned(self):
+        """Frames whose slot was reused by a newer frame are not returned."""
+        self.render_frames(3)
+        reader = SharedMemoryFrameReader(self.sink.name)
+        self.addCleanup(reader.close)
+
+        self.assertEqual(reader.latest_sequence(), 3)
+        self.assertIsNone(reader.read(1))
+        self.assertEqual(reader.read(2)[0], 2)
+
+    def test_view_is_checked_after_use(self):
+        """
+        Frames viewed in place are valid until a newer frame reuses their slot.
+        """
+        self.render_frames(2)
+        reader = SharedMemoryFrameReader(self.sink.name)
+        self.addCleanup(reader.close)
+
+        sequence, frame, width, height, stride, pixels = reader.view()
+        self.assertIsInstance(pixels, memoryview)
+        self.assertEqual((sequence, frame), (2, 2))
+        self.assertEqual(pixels.tobytes(), reader.read()[4])
+        self.assertTrue(reader.is_valid(sequence))
+
+        self.sink.render((4, 3), 3, fill_drawqueue(0))
+        self.sink.render((4, 3), 4, fill_drawqueue(0))
+        self.assertFalse(reader.is_valid(sequence))
+        pixels.release()
+
+    def test_finish_while_rendering(self):
+        """The segment is removed even if the last frame was not finished."""
+        self.sink.create_rcontext((4, 3), 1)
+        name = self.sink.name
+
+        self.sink.finish()
+
+        with self.assertRaises(FileNotFoundError):
+            SharedMemoryFrameReader(name)
+
+
+if __name__ == "__main__":
+    unittest.main()
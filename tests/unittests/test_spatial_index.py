@@ -0,0 +1,85 @@
+import tempfile
+import unittest
+
+from tests.unittests.helpers import TEST_INPUT_DIR
+
+from shoebot import create_bot
+from shoebot.core.spatial_index import FrameIndex
+from shoebot.core.spatial_index import SpatialIndex
+
+IDENTITY = (1, 0, 0, 1, 0, 0)
+SVG_IMAGE = str(TEST_INPUT_DIR / "input-image-svg.svg")
+
+
+class TestFrameIndex(unittest.TestCase):
+    def test_query(self):
+        """Grobs whose bounds overlap the rect are returned in drawing order."""
+        index = FrameIndex(cell_size=10)
+        index.add("a", (0, 0, 5, 5), IDENTITY)
+        index.add("b", (20, 20, 40, 40), IDENTITY)
+        index.add("c", (-1e9, -1e9, 1e9, 1e9), IDENTITY)
+
+        self.assertEqual(index.query(0, 0, 30, 30), ["a", "b", "c"])
+        self.assertEqual(index.query(100, 100, 5, 5), ["c"])
+
+    def test_picked_is_transformed(self):
+        """Points are tested against the bounds of grobs after their transform."""
+        index = FrameIndex(cell_size=10)
+        # Scaled by 2 and moved by 100, 0
+        index.add("a", (0, 0, 10, 10), (2, 0, 0, 2, 100, 0))
+        index.add("b", (105, 5, 110, 10), IDENTITY)
+
+        self.assertEqual(index.picked(5, 5), [])
+        self.assertEqual(index.picked(106, 6), ["b", "a"])
+        self.assertEqual(index.picked(119, 19), ["a"])
+
+    def test_queries_last_frame(self):
+        """Queries answer for the last frame once one is finished."""
+        spatial_index = SpatialIndex()
+        spatial_index.add("a", (0, 0, 10, 10), IDENTITY)
+        self.assertEqual(spatial_index.picked(5, 5), ["a"])
+
+        spatial_index.end_frame(1)
+        spatial_index.add("b", (0, 0, 10, 10), IDENTITY)
+        self.assertEqual(spatial_index.picked(5, 5), ["a"])
+
+
+class TestPicking(unittest.TestCase):
+    def test_picked(self):
+        """Bots can find the shapes under a point, tested with their outline."""
+        code = (
+            "size(100, 100)\n"
+            "query(0, 0, 100, 100)\n"
+            "def draw():\n"
+            "    global picked_shapes\n"
+            "    picked_shapes = picked(22, 22)\n"
+            "    square = rect(0, 0, 30, 30)\n"
+            "    circle = oval(20, 20, 40, 40)\n"
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bot = create_bot(outputfile=f"{tmpdir}/output.png", iterations=2)
+            bot.run(code, max_iterations=2, verbose=True)
+
+        picked = bot._namespace["picked_shapes"]
+        self.assertEqual(len(picked), 1)
+        self.assertEqual(picked[0].bounds, (0.0, 0.0, 30.0, 30.0))
+
+    def test_picked_svg_image(self):
+        """Svg images, drawn from recording surfaces, can be picked."""
+        code = (
+            "size(100, 100)\n"
+            "query(0, 0, 100, 100)\n"
+            "def draw():\n"
+            "    global picked_shapes\n"
+            "    picked_shapes = picked(25, 25)\n"
+            f"    image({SVG_IMAGE!r}, 0, 0, 50, 50)\n"
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bot = create_bot(outputfile=f"{tmpdir}/output.png", iterations=2)
+            self.assertTrue(bot.run(code, max_iterations=2, verbose=True))
+
+        self.assertEqual(len(bot._namespace["picked_shapes"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
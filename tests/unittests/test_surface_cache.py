@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from shoebot.core import ImageSurfaceCache
+from shoebot.core.backend import cairo
+
+# Bytes used by each 8x8 ARGB surface in these tests.
+SURFACE_BYTES = 8 * 8 * 4
+
+
+class TestImageSurfaceCache(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(tmpdir.name, f"{i}.png")
+            with open(path, "wb") as f:
+                f.write(b"image")
+            self.paths.append(path)
+
+    def surface(self):
+        return cairo.ImageSurface(cairo.FORMAT_ARGB32, 8, 8)
+
+    def test_hit_and_miss(self):
+        cache = ImageSurfaceCache()
+        surface = self.surface()
+
+        self.assertIsNone(cache.get(self.paths[0]))
+        cache.put(self.paths[0], surface)
+
+        self.assertIs(cache.get(self.paths[0]), surface)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["cached_bytes"], SURFACE_BYTES)
+
+    def test_changed_file_is_invalidated(self):
+        """Surfaces are loaded again after their file is written to."""
+        cache = ImageSurfaceCache()
+        cache.put(self.paths[0], self.surface())
+        with open(self.paths[0], "ab") as f:
+            f.write(b" changed")
+
+        self.assertIsNone(cache.get(self.paths[0]))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+        self.assertEqual(cache.stats()["cached_bytes"], 0)
+
+    def test_least_recently_used_evicted(self):
+        """Over the byte budget, least recently used surfaces are dropped."""
+        cache = ImageSurfaceCache(max_bytes=2 * SURFACE_BYTES)
+        cache.put(self.paths[0], self.surface())
+        cache.put(self.paths[1], self.surface())
+        cache.get(self.paths[0])
+        cache.put(self.paths[2], self.surface())
+
+        self.assertIsNotNone(cache.get(self.paths[0]))
+        self.assertIsNone(cache.get(self.paths[1]))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_pinned_surface_not_evicted(self):
+        cache = ImageSurfaceCache(max_bytes=SURFACE_BYTES)
+        cache.pin(self.paths[0])
+        cache.put(self.paths[0], self.surface())
+        cache.put(self.paths[1], self.surface())
+
+        self.assertIsNotNone(cache.get(self.paths[0]))
+        self.assertIsNone(cache.get(self.paths[1]))
+
+        cache.clear()
+        self.assertIsNone(cache.get(self.paths[0]))
+        self.assertEqual(cache.stats()["pinned"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from shoebot.core import SurfacePool
+from shoebot.core.backend import cairo
+
+
+class TestSurfacePool(unittest.TestCase):
+    def test_released_surface_is_reused_and_cleared(self):
+        """A released surface of the same size is handed out again, cleared."""
+        pool = SurfacePool()
+        surface = pool.acquire(cairo.FORMAT_ARGB32, (8, 8))
+        ctx = cairo.Context(surface)
+        ctx.set_source_rgb(1, 0, 0)
+        ctx.paint()
+        pool.release(surface)
+
+        reused = pool.acquire(cairo.FORMAT_ARGB32, (8, 8))
+        reused.flush()
+
+        self.assertIs(reused, surface)
+        self.assertEqual(set(bytes(reused.get_data())), {0})
+        self.assertEqual(pool.stats()["allocated"], 1)
+        self.assertEqual(pool.stats()["reused"], 1)
+
+    def test_different_size_is_not_reused(self):
+        """Surfaces are only reused for the same format and size."""
+        pool = SurfacePool()
+        surface = pool.acquire(cairo.FORMAT_ARGB32, (8, 8))
+        pool.release(surface)
+
+        other = pool.acquire(cairo.FORMAT_ARGB32, (16, 8))
+
+        self.assertIsNot(other, surface)
+        self.assertEqual(pool.stats()["allocated"], 2)
+
+    def test_memory_cap(self):
+        """Surfaces released once the pool is full are discarded."""
+        pool = SurfacePool(max_bytes=8 * 8 * 4)
+        first = pool.acquire(cairo.FORMAT_ARGB32, (8, 8))
+        second = pool.acquire(cairo.FORMAT_ARGB32, (8, 8))
+
+        pool.release(first)
+        pool.release(second)
+
+        self.assertEqual(pool.stats()["pooled_bytes"], 8 * 8 * 4)
+        self.assertEqual(pool.stats()["discarded"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import sys
+import tempfile
+import unittest
+from random import seed
+
+from parameterized import parameterized
+
+from shoebot import create_bot
+from shoebot.core.png import argb32_to_rgba
+from tests.unittests.helpers import ShoebotTestCase
+
+CODE = """
+size(250, 170)
+background(0.2, 0.4, 0.6)
+fill(1, 0, 0, 0.5)
+rotate(20)
+ellipse(30, 20, 160, 120)
+stroke(0)
+strokewidth(4)
+line(0, 0, WIDTH, HEIGHT)
+"""
+
+
+class TestArgb32ToRgba(unittest.TestCase):
+    @parameterized.expand(
+        [
+            ("opaque", (255, 10, 20, 30), (10, 20, 30, 255)),
+            ("transparent", (0, 0, 0, 0), (0, 0, 0, 0)),
+            ("half", (128, 64, 0, 128), (128, 0, 255, 128)),
+        ]
+    )
+    def test_unpremultiplies(self, name, argb, expected_rgba):
+        """Premultiplied native endian ARGB pixels are converted to straight RGBA."""
+        a, r, g, b = argb
+        pixel = bytes((b, g, r, a)) if sys.byteorder == "little" else bytes(argb)
+
+        self.assertEqual(argb32_to_rgba(pixel * 2), bytes(expected_rgba) * 2)
+
+
+class TestTiledImageSink(ShoebotTestCase):
+    @parameterized.expand([(64,), (100,), (1000,)])
+    def test_tiled_output_matches_untiled(self, tile_size):
+        """
+        Images rendered in tiles look the same as those rendered
+        in one piece, including tiles at the edges that are smaller.
+        """
+        with tempfile.NamedTemporaryFile(
+            suffix=".png"
+        ) as expected, tempfile.NamedTemporaryFile(suffix=".png") as actual:
+            self.run_code(CODE, outputfile=expected.name)
+            bot = create_bot(outputfile=actual.name, tile_size=tile_size, jobs=2)
+            seed(0)
+            bot.run(CODE)
+
+            self.assertImagesAlmostEqual(expected.name, actual.name, error=0.01)
+
+    def test_threads_kept_until_finish(self):
+        """The tile threads render every frame and are stopped by finish."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bot = create_bot(
+                outputfile=f"{tmpdir}/frame.png", iterations=2, tile_size=64, jobs=2
+            )
+            sink = bot._canvas.sink
+            pools = []
+            render_png = sink._render_png
+
+            def record_pool(*args):
+                render_png(*args)
+                pools.append(sink.pool)
+
+            sink._render_png = record_pool
+            code = CODE + "def draw():\n    line(0, FRAME, WIDTH, FRAME)\n"
+            bot.run(code, max_iterations=2)
+
+        self.assertEqual(len(pools), 2)
+        self.assertIsNotNone(pools[0])
+        self.assertIs(pools[0], pools[1])
+        self.assertIsNone(sink.pool)
+
+
+if __name__ == "__main__":
+    unittest.main()